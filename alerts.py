@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+alerts.py - Contains the alert rule engine of the Simple Usage Monitor application.
+
+Rules from settings.ALERT_RULES are evaluated against rolling aggregates
+(last value, mean, min or max over a window of seconds) that are updated
+incrementally with every sample. An alert is raised when its aggregate
+reaches the threshold and cleared once it drops below the lower clear
+value, so usage hovering around a threshold does not make the alert
+flicker. Several alerts can be active at once, ordered by priority.
+"""
+
+from collections import deque, namedtuple
+from datetime import datetime
+
+import settings  # Import settings
+import strings  # Import externalized strings
+
+# Alert colors ordered by severity, used where alerts need a number
+ALERT_LEVELS = {
+    "green": 0,
+    "orange": 1,
+    "red": 2,
+}
+
+# Values a rule can watch, see ALERT_RULES in settings.py
+METRICS = ('cpu', 'memory_percent', 'memory_gb')
+AGGREGATES = ('last', 'mean', 'min', 'max')
+
+AlertRule = namedtuple('AlertRule', ['name', 'metric', 'aggregate', 'window', 'threshold', 'clear',
+                                     'level', 'priority'])
+
+# An active alert: the rule, the aggregate value that raised it and the time it was raised
+Alert = namedtuple('Alert', ['rule', 'value', 'raised_at'])
+
+
+def load_rules(rule_settings=None):
+    """Return the rules from settings.ALERT_RULES, highest priority first"""
+    rules = []
+    for rule_setting in settings.ALERT_RULES if rule_settings is None else rule_settings:
+        rule_setting = dict(rule_setting)
+        rule_setting.setdefault('aggregate', 'last')
+        rule_setting.setdefault('window', 1)
+        rule_setting.setdefault('clear', rule_setting.get('threshold'))
+        rule_setting.setdefault('priority', 0)
+        try:
+            rule = AlertRule(**rule_setting)
+        except TypeError as e:
+            raise ValueError(strings.ERROR_ALERT_RULE.format(rule_setting.get('name'), e))
+        if (rule.metric not in METRICS or rule.aggregate not in AGGREGATES or rule.window < 1 or
+                rule.level not in ALERT_LEVELS or rule.clear > rule.threshold):
+            raise ValueError(strings.ERROR_ALERT_RULE.format(rule.name, rule_setting))
+        rules.append(rule)
+    return sorted(rules, key=lambda rule: rule.priority, reverse=True)
+
+
+def format_window(seconds):
+    if seconds % 60 == 0:
+        return strings.ALERT_WINDOW_MINUTES.format(seconds // 60)
+    return strings.ALERT_WINDOW_SECONDS.format(seconds)
+
+
+class RollingWindow:
+    """Mean, min and max of the last `size` values, each push costs O(1) amortized.
+
+    The sum is kept as a running total, min and max as monotonic queues of
+    (index, value) pairs whose first entry is the current min or max.
+    min and max cover the values pushed so far until the window is full.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.minima = deque()  # Increasing values
+        self.maxima = deque()  # Decreasing values
+        self.count = 0
+
+    def push(self, value):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        index = self.count
+        self.count += 1
+        if index % self.size == 0:
+            # Rounding errors of the running total add up, start over from the values now and then
+            self.total = sum(self.values)
+
+        while self.minima and self.minima[-1][1] >= value:
+            self.minima.pop()
+        self.minima.append((index, value))
+        if self.minima[0][0] <= index - self.size:
+            self.minima.popleft()
+
+        while self.maxima and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        self.maxima.append((index, value))
+        if self.maxima[0][0] <= index - self.size:
+            self.maxima.popleft()
+
+    def full(self):
+        return len(self.values) == self.size
+
+    def aggregate(self, name):
+        if name == 'last':
+            return self.values[-1]
+        if name == 'mean':
+            # Until the window has filled, missing seconds count as 0,
+            # so a single spike right after startup does not raise an alert
+            return self.total / self.size
+        if name == 'min':
+            return self.minima[0][1]
+        return self.maxima[0][1]
+
+
+class AlertEngine:
+    """Evaluates alert rules against rolling windows of one user's usage"""
+
+    def __init__(self, rules=None):
+        self.rules = load_rules() if rules is None else rules
+        # Rules watching the same metric over the same window share one RollingWindow
+        self.windows = {}
+        for rule in self.rules:
+            self.windows.setdefault((rule.metric, rule.window), RollingWindow(rule.window))
+        self.max_window = max((rule.window for rule in self.rules), default=1)
+        # Active alerts by rule name
+        self.active = {}
+        # Time of the previous sample
+        self.last_timestamp = None
+
+    def update(self, metrics, timestamp=None, current_time=None):
+        """Add a sample taken at `timestamp` (seconds) and re-evaluate every rule.
+
+        `metrics` maps every name in METRICS to its value. Windows hold one
+        value per second, a sample fills the seconds since the previous one,
+        so a window spans the same time however often samples are taken.
+        Without a timestamp a sample stands for one second.
+        """
+        if not self.rules:
+            return
+        slots = 1
+        if timestamp is not None:
+            if self.last_timestamp is not None:
+                slots = max(1, round(timestamp - self.last_timestamp))
+            self.last_timestamp = timestamp
+        for (metric, _), window in self.windows.items():
+            value = metrics[metric]
+            for _ in range(min(slots, window.size)):
+                window.push(value)
+
+        for rule in self.rules:
+            window = self.windows[(rule.metric, rule.window)]
+            # "min" means the whole window stayed above the threshold, so it needs a full window
+            if rule.aggregate == 'min' and not window.full():
+                self.active.pop(rule.name, None)
+                continue
+            value = window.aggregate(rule.aggregate)
+            alert = self.active.get(rule.name)
+            if alert is None:
+                if value >= rule.threshold:
+                    raised_at = current_time or datetime.now().strftime('%H:%M')
+                    self.active[rule.name] = Alert(rule, value, raised_at)
+            elif value < rule.clear:
+                del self.active[rule.name]
+            else:
+                self.active[rule.name] = alert._replace(value=value)
+
+    def near_thresholds(self, fraction):
+        """Return (metric, value) pairs, usage at or above a value is within `fraction` of a rule's threshold.
+
+        Rules never change, so the pairs can be used on another thread.
+        """
+        return tuple((rule.metric, rule.threshold * fraction) for rule in self.rules)
+
+    def active_alerts(self):
+        """Return the active alerts, highest priority first"""
+        return [self.active[rule.name] for rule in self.rules if rule.name in self.active]
+
+    def level(self):
+        """Return the color of the most severe active alert, "green" without alerts"""
+        return max((alert.rule.level for alert in self.active.values()),
+                   key=ALERT_LEVELS.__getitem__, default="green")
+
+    def state(self):
+        """Return (alert_color, alert_message), one line per active alert"""
+        messages = []
+        for alert in self.active_alerts():
+            message = strings.ALERT_MESSAGES.get(alert.rule.name, strings.ALERT_MESSAGE_DEFAULT)
+            messages.append(message.format(alert.raised_at, alert.value, alert.rule.threshold,
+                                           format_window(alert.rule.window), alert.rule.name))
+        return self.level(), '\n'.join(messages)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+render_benchmark.py - Rendering micro-benchmark for the Simple Usage Monitor charts.
+
+Pushes synthetic samples through the chart update path and reports the
+time per frame and the Python allocations per frame, for the current
+implementation ("reuse", plot items are created once and updated with
+setData, fill areas are built once per frame) and for the previous one
+("legacy", new PlotCurveItems for the fill areas on every tick).
+
+Frame times are the median of each repetition after warm-up frames, the
+report gives the median over the repetitions and their range. Frame
+times on a shared machine vary by about a millisecond between runs,
+compare the ranges rather than single numbers.
+
+Run from the repository root:
+    python3 benchmarks/render_benchmark.py [--frames 500] [--repeats 5] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Render without a display unless one was requested explicitly
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtWidgets import QApplication
+
+import gui
+
+
+def legacy_update_plot_data(plot_dict, user_data, stacked_data, times):
+    """The chart update as it was before plot items were reused"""
+    plot_dict['user_fill'].setCurves(
+        curve1=pg.PlotCurveItem(times, user_data, pen='b'),
+        curve2=pg.PlotCurveItem(times, [0] * len(times), pen='b')
+    )
+    plot_dict['others_fill'].setCurves(
+        curve1=pg.PlotCurveItem(times, stacked_data, pen='r'),
+        curve2=pg.PlotCurveItem(times, user_data, pen='r')
+    )
+    plot_dict['user_curve'].setData(times, user_data)
+    plot_dict['others_curve'].setData(times, stacked_data)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Chart:
+    """One chart rendered with one implementation"""
+
+    def __init__(self, window, mode, rng):
+        self.mode = mode
+        self.plot = window.setup_plot(mode, '%')
+        self.plot['widget'].resize(500, 400)
+        self.plot['widget'].show()
+        self.update = legacy_update_plot_data if mode == 'legacy' else window.update_plot_data
+        self.history = window.history
+        self.rng = rng
+        self.app = QApplication.instance()
+
+    def frame(self):
+        self.history.append(self.rng.uniform(0, 50, 4))
+        self.update(self.plot, self.history.series('user_cpu'), self.history.stacked('cpu'), self.history.times)
+        self.plot['widget'].viewport().repaint()
+        self.app.processEvents()
+
+    def time_frames(self, frames, warmup):
+        """Return the times of `frames` frames in seconds, after `warmup` frames that are not measured"""
+        for _ in range(warmup):
+            self.frame()
+        frame_times = np.empty(frames)
+        for i in range(frames):
+            start_time = time.perf_counter()
+            self.frame()
+            frame_times[i] = time.perf_counter() - start_time
+        return frame_times
+
+    def allocations(self, frames, warmup):
+        """Return (mean peak KiB allocated per frame, memory blocks still allocated per frame)"""
+        for _ in range(warmup):
+            self.frame()
+        # Preallocated, so the measurement itself keeps nothing per frame
+        peak_bytes = np.empty(frames)
+        tracemalloc.start()
+        gc.collect()
+        blocks_before = sys.getallocatedblocks()
+        for i in range(frames):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            self.frame()
+            peak_bytes[i] = tracemalloc.get_traced_memory()[1] - baseline
+        # Only what outlives the frames counts, not garbage waiting for a collection
+        gc.collect()
+        retained_blocks = sys.getallocatedblocks() - blocks_before
+        tracemalloc.stop()
+        return peak_bytes.mean() / 1024, retained_blocks / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendering micro-benchmark for the usage charts")
+    parser.add_argument('--frames', type=int, default=500, help="Frames to render per repetition (default: %(default)s)")
+    parser.add_argument('--warmup', type=int, default=100,
+                        help="Frames rendered before each measurement (default: %(default)s)")
+    parser.add_argument('--repeats', type=int, default=5, help="Repetitions per mode (default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    app = QApplication([sys.argv[0]])
+    pg.setConfigOption('background', 'w')
+    pg.setConfigOption('foreground', 'k')
+    window = gui.SystemMonitor()
+    # Only the synthetic samples should reach the charts
+    window.stop_sampling()
+
+    rng = np.random.default_rng(0)
+    charts = [Chart(window, mode, rng) for mode in ('legacy', 'reuse')]
+    # Median frame time of every repetition. The modes take turns, and
+    # which goes first alternates, so drift of the machine hits both alike.
+    medians = {chart.mode: [] for chart in charts}
+    p95s = {chart.mode: [] for chart in charts}
+    for repeat in range(args.repeats):
+        for chart in charts if repeat % 2 == 0 else reversed(charts):
+            frame_times = chart.time_frames(args.frames, args.warmup)
+            medians[chart.mode].append(float(np.median(frame_times)) * 1000)
+            p95s[chart.mode].append(percentile(frame_times, 0.95) * 1000)
+
+    results = []
+    for chart in charts:
+        alloc_peak_kib, retained_blocks = chart.allocations(args.frames, args.warmup)
+        results.append({
+            'mode': chart.mode,
+            'frames': args.frames,
+            'repeats': args.repeats,
+            'frame_ms_p50': statistics.median(medians[chart.mode]),
+            'frame_ms_p50_min': min(medians[chart.mode]),
+            'frame_ms_p50_max': max(medians[chart.mode]),
+            'frame_ms_p95': statistics.median(p95s[chart.mode]),
+            'alloc_peak_kib_per_frame': alloc_peak_kib,
+            'retained_blocks_per_frame': retained_blocks,
+            'scene_items': len(chart.plot['widget'].scene().items()),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = list(results[0].keys())
+    print('  '.join(f'{column:>25}' for column in columns))
+    for result in results:
+        print('  '.join(f'{value:>25.3f}' if isinstance(value, float) else f'{value:>25}'
+                        for value in result.values()))
+
+
+if __name__ == '__main__':
+    main()
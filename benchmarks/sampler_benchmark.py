@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+sampler_benchmark.py - Sampler benchmark for the Simple Usage Monitor application.
+
+Generates synthetic fixtures of a busy node, a /proc tree, a cgroup v2
+hierarchy and canned `top` output, with a configurable number of processes,
+users and churn, and runs the sampler backends against them. Reports the
+latency percentiles, CPU time and peak RSS per sample as JSON.
+
+Every case runs in its own Python process, so the peak RSS of one backend
+is not hidden by a larger case that ran before it. The "top" backend only
+parses canned output, the cost of running top itself is not included. The
+"collector" backend costs one "proc" scan per node and a socket read per
+monitor, so it is not benchmarked separately.
+
+Run from the repository root:
+    python3 benchmarks/sampler_benchmark.py [--processes 100 1000 10000 50000] [--output results.json]
+    python3 benchmarks/sampler_benchmark.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sampler
+
+BACKENDS = ('proc', 'cgroup', 'top')
+# UID of the user running the monitor in the fixtures, other users follow it
+FIRST_UID = 10000
+# Fixture clock: one sample per second, 100 ticks per second
+CLOCK_TICKS = 100
+PAGE_SIZE = 4096
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def current_rss_kib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class ProcFixture:
+    """A /proc-style tree with stat and status files for every process.
+
+    On every advance(), `active` of the processes use CPU and `churn` of
+    them exit and are replaced by new processes with new PIDs.
+    """
+
+    def __init__(self, root, processes, users, churn, active, rng):
+        self.root = root
+        self.users = users
+        self.churn = churn
+        self.active = active
+        self.rng = rng
+        self.uptime = 100000.0
+        self.next_pid = 1
+        self.processes = {}  # pid: [uid, cpu_ticks, starttime, rss_pages]
+        for _ in range(processes):
+            self.add_process(starttime=self.rng.randrange(int(self.uptime * CLOCK_TICKS)))
+        self.write_uptime()
+
+    def add_process(self, starttime):
+        pid = self.next_pid
+        self.next_pid += 1
+        uid = FIRST_UID + self.rng.randrange(self.users)
+        self.processes[pid] = [uid, self.rng.randrange(100000), starttime, self.rng.randrange(1000, 100000)]
+        os.mkdir(f'{self.root}/{pid}')
+        with open(f'{self.root}/{pid}/status', 'w') as f:
+            f.write(f'Name:\tworker{pid}\nUmask:\t0022\nState:\tS (sleeping)\nTgid:\t{pid}\n'
+                    f'Ngid:\t0\nPid:\t{pid}\nPPid:\t1\nTracerPid:\t0\n'
+                    f'Uid:\t{uid}\t{uid}\t{uid}\t{uid}\nGid:\t{uid}\t{uid}\t{uid}\t{uid}\n'
+                    f'FDSize:\t64\nGroups:\t{uid}\nVmPeak:\t  123456 kB\nVmSize:\t  123456 kB\n')
+        self.write_stat(pid)
+
+    def write_stat(self, pid):
+        uid, cpu_ticks, starttime, rss_pages = self.processes[pid]
+        # Fields after the command name, fields[0] is field 3 (state) of proc(5)
+        fields = ['S', '1', str(pid), str(pid), '0', '-1', '4194560', '100', '0', '0', '0',
+                  str(cpu_ticks // 2), str(cpu_ticks - cpu_ticks // 2), '0', '0', '20', '0', '1', '0',
+                  str(starttime), '123456789', str(rss_pages)] + ['0'] * 30
+        with open(f'{self.root}/{pid}/stat', 'w') as f:
+            f.write(f'{pid} (worker {pid}) {" ".join(fields)}\n')
+
+    def write_uptime(self):
+        with open(f'{self.root}/uptime', 'w') as f:
+            f.write(f'{self.uptime:.2f} {self.uptime * 4:.2f}\n')
+
+    def advance(self, seconds=1.0):
+        self.uptime += seconds
+        pids = list(self.processes)
+        for pid in self.rng.sample(pids, int(len(pids) * self.churn)):
+            del self.processes[pid]
+            shutil.rmtree(f'{self.root}/{pid}')
+            self.add_process(starttime=int(self.uptime * CLOCK_TICKS))
+        pids = list(self.processes)
+        for pid in self.rng.sample(pids, int(len(pids) * self.active)):
+            self.processes[pid][1] += self.rng.randrange(int(seconds * CLOCK_TICKS) + 1)
+            self.write_stat(pid)
+        self.write_uptime()
+
+
+class CgroupFixture:
+    """A cgroup v2 hierarchy with one systemd user slice per user"""
+
+    def __init__(self, root, users, rng):
+        self.root = root
+        self.rng = rng
+        self.usage = {}  # cgroup path: [usage_usec, memory_bytes]
+        for name in ('system.slice', 'init.scope'):
+            self.add_cgroup(f'{root}/{name}')
+        for uid in range(FIRST_UID, FIRST_UID + users):
+            self.add_cgroup(f'{root}/user.slice/user-{uid}.slice')
+        self.write()
+
+    def add_cgroup(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.usage[path] = [self.rng.randrange(10 ** 9), self.rng.randrange(10 ** 6, 10 ** 9)]
+
+    def write(self):
+        total = [0, 0]
+        for path, (usage_usec, memory_bytes) in self.usage.items():
+            self.write_cgroup(path, usage_usec, memory_bytes)
+            if '/user.slice/' in path:
+                total[0] += usage_usec
+                total[1] += memory_bytes
+        self.write_cgroup(f'{self.root}/user.slice', *total)
+
+    @staticmethod
+    def write_cgroup(path, usage_usec, memory_bytes):
+        with open(f'{path}/cpu.stat', 'w') as f:
+            f.write(f'usage_usec {usage_usec}\nuser_usec {usage_usec // 2}\n'
+                    f'system_usec {usage_usec - usage_usec // 2}\n')
+        with open(f'{path}/memory.current', 'w') as f:
+            f.write(f'{memory_bytes}\n')
+
+    def advance(self, seconds=1.0):
+        for values in self.usage.values():
+            values[0] += self.rng.randrange(int(seconds * 1000000) + 1)
+        self.write()
+
+
+def top_output(processes, users, rng):
+    """Return canned `top -b -n 1` output with one line per process"""
+    lines = [
+        'top - 12:00:00 up 10 days,  1:00,  5 users,  load average: 8.00, 8.00, 8.00',
+        f'Tasks: {processes} total,   8 running, {processes - 8} sleeping,   0 stopped,   0 zombie',
+        '%Cpu(s):  6.2 us,  1.0 sy,  0.0 ni, 92.7 id,  0.0 wa,  0.0 hi,  0.1 si,  0.0 st',
+        'MiB Mem : 515000.0 total, 400000.0 free, 100000.0 used,  15000.0 buff/cache',
+        'MiB Swap:      0.0 total,      0.0 free,      0.0 used. 410000.0 avail Mem',
+        '',
+        '    PID USER      PR  NI    VIRT    RES    SHR S  %CPU  %MEM     TIME+ COMMAND',
+    ]
+    for pid in range(1, processes + 1):
+        user = f'user{rng.randrange(users)}'
+        lines.append(f'{pid:>7} {user:<9} 20   0  123456  45678  12345 S '
+                     f'{rng.random() * 10:>5.1f} {rng.random() / 10:>5.1f}   1:23.45 worker')
+    return '\n'.join(lines) + '\n'
+
+
+def run_case(args):
+    """Run one backend against a fresh fixture and return its statistics"""
+    rng = random.Random(args.seed)
+    users = max(1, min(args.users, args.processes))
+    workdir = tempfile.mkdtemp(prefix='sampler-benchmark-', dir=args.tmpdir)
+    try:
+        setup_start = time.perf_counter()
+        if args.case == 'proc':
+            fixture = ProcFixture(workdir, args.processes, users, args.churn, args.active, rng)
+            backend = sampler.ProcSampler(uid=FIRST_UID, proc_root=workdir)
+            take_sample = backend.sample
+        elif args.case == 'cgroup':
+            fixture = CgroupFixture(workdir, users, rng)
+            backend = sampler.CgroupSampler(uid=FIRST_UID, cgroup_root=workdir)
+            take_sample = backend.sample
+        else:
+            fixture = None
+            output = top_output(args.processes, users, rng)
+            backend = sampler.TopSampler()
+            backend.current_user = 'user0'
+            take_sample = lambda: backend.parse(output)
+        setup_seconds = time.perf_counter() - setup_start
+
+        baseline_rss = current_rss_kib()
+        # The first sample of the proc backend reads every status file,
+        # report it separately from the steady state
+        start_time = time.perf_counter()
+        take_sample()
+        first_sample_seconds = time.perf_counter() - start_time
+
+        latencies = []
+        cpu_times = []
+        for _ in range(args.samples):
+            if fixture is not None:
+                fixture.advance()
+            start_time = time.perf_counter()
+            start_cpu = time.process_time()
+            take_sample()
+            cpu_times.append(time.process_time() - start_cpu)
+            latencies.append(time.perf_counter() - start_time)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'backend': args.case,
+        'processes': args.processes,
+        'users': users,
+        'churn': args.churn,
+        'active': args.active,
+        'samples': args.samples,
+        'fixture_setup_s': setup_seconds,
+        'first_sample_ms': first_sample_seconds * 1000,
+        'latency_ms_p50': percentile(latencies, 0.50) * 1000,
+        'latency_ms_p95': percentile(latencies, 0.95) * 1000,
+        'latency_ms_p99': percentile(latencies, 0.99) * 1000,
+        'latency_ms_max': max(latencies) * 1000,
+        'cpu_ms_mean': sum(cpu_times) / len(cpu_times) * 1000,
+        'peak_rss_kib': peak_rss,
+        'rss_growth_kib': max(0, peak_rss - baseline_rss),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the latency change against an earlier run, return True if any case regressed"""
+    with open(baseline_path) as f:
+        baseline = {(r['backend'], r['processes'], r['users']): r for r in json.load(f)['results']}
+    regressed = False
+    for result in results:
+        before = baseline.get((result['backend'], result['processes'], result['users']))
+        if before is None:
+            continue
+        for key in ('latency_ms_p50', 'latency_ms_p95', 'cpu_ms_mean'):
+            ratio = result[key] / before[key] if before[key] else 1.0
+            if ratio > 1 + tolerance:
+                regressed = True
+                print(f"REGRESSION {result['backend']} {result['processes']} processes: "
+                      f"{key} {before[key]:.3f} -> {result[key]:.3f} ({ratio:.2f}x)", file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sampler benchmark over synthetic /proc, cgroup and top fixtures")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS),
+                        help="Backends to run (default: all)")
+    parser.add_argument('--processes', nargs='+', type=int, default=[100, 1000, 10000, 50000],
+                        help="Process counts to run (default: %(default)s)")
+    parser.add_argument('--users', type=int, default=100,
+                        help="Users owning the processes (default: %(default)s)")
+    parser.add_argument('--churn', type=float, default=0.01,
+                        help="Fraction of processes replaced between samples (default: %(default)s)")
+    parser.add_argument('--active', type=float, default=0.1,
+                        help="Fraction of processes using CPU between samples (default: %(default)s)")
+    parser.add_argument('--samples', type=int, default=20,
+                        help="Samples per case (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the fixtures (default: %(default)s)")
+    parser.add_argument('--tmpdir', default=None,
+                        help="Directory for the fixtures, a tmpfs like /dev/shm keeps disk I/O out of the results")
+    parser.add_argument('--output', default=None, help="Write the results to this file instead of stdout")
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help="Exit with status 1 if a case is slower than in this earlier output")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown against the baseline (default: %(default)s)")
+    parser.add_argument('--case', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # Child process running a single case
+        args.processes = args.processes[0]
+        print(json.dumps(run_case(args)))
+        return
+
+    results = []
+    for backend in args.backends:
+        for processes in args.processes:
+            cmd = [sys.executable, os.path.abspath(__file__), '--case', backend,
+                   '--processes', str(processes), '--users', str(args.users),
+                   '--churn', str(args.churn), '--active', str(args.active),
+                   '--samples', str(args.samples), '--seed', str(args.seed)]
+            if args.tmpdir:
+                cmd += ['--tmpdir', args.tmpdir]
+            print(f"{backend} {processes} processes ...", file=sys.stderr)
+            results.append(json.loads(subprocess.check_output(cmd)))
+
+    document = {
+        'benchmark': 'sampler',
+        'format_version': 1,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
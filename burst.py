@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+burst.py - Burst sampling of the Simple Usage Monitor application.
+
+A sample per second averages away short CPU bursts and memory spikes, a
+spike can get a process killed by the OOM killer without ever showing in
+the charts. With --burst, your own CPU and memory are read BURST_RATE_HZ
+times a second on a thread of its own, from sources that cost a few file
+reads: your cgroup, or the /proc stat files of your processes, kept open
+between reads. The reads are folded into the min, mean and max of every
+second, and each sample gets those of the last full second, which the
+charts show as a band around your usage.
+
+The thread measures all the CPU time it used since it started, opening
+the source included, and never reads before that time is within
+BURST_CPU_BUDGET_PERCENT of one CPU over the time it has been running.
+Qt is never imported here.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psutil
+
+import sampler  # Import sampler backends
+import settings  # Import settings
+import strings  # Import externalized strings
+
+# Largest error of a CPU read caused by the unit of the source's CPU counter,
+# as a fraction of one CPU. Coarser counters are read over a longer span.
+CPU_ERROR = 0.05
+# Length of the windows the reads are folded into
+WINDOW_SECONDS = 1.0
+
+
+class CgroupSource:
+    """CPU and memory of your systemd user slice, two small files per read"""
+
+    cpu_resolution = 0.000001  # cpu.stat counts microseconds
+
+    def __init__(self, uid=None, cgroup_root=None):
+        path = sampler.user_slice_path(os.getuid() if uid is None else uid,
+                                       cgroup_root or settings.CGROUP_ROOT)
+        # Read again from the start of the open files, instead of opening them every read
+        self.cpu_fd = os.open(f'{path}/cpu.stat', os.O_RDONLY)
+        self.memory_fd = os.open(f'{path}/memory.current', os.O_RDONLY)
+
+    def read(self):
+        """Return (CPU seconds used so far, memory bytes)"""
+        cpu_seconds = 0.0
+        for line in os.pread(self.cpu_fd, 4096, 0).splitlines():
+            if line.startswith(b'usage_usec '):
+                cpu_seconds = int(line.split()[1]) / 1000000
+                break
+        return cpu_seconds, int(os.pread(self.memory_fd, 64, 0))
+
+    def close(self):
+        os.close(self.cpu_fd)
+        os.close(self.memory_fd)
+
+
+class PidSource:
+    """CPU and RSS of your processes, read from their /proc/[pid]/stat.
+
+    The stat file of every process stays open, the set of processes is
+    looked up again every BURST_PID_REFRESH_SECONDS. An open stat file
+    belongs to one process, so a reused PID is never mistaken for it.
+    """
+
+    def __init__(self, uid=None, proc_root='/proc'):
+        self.uid = os.getuid() if uid is None else uid
+        self.proc_root = proc_root
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        # stat counts clock ticks, usually 10 ms
+        self.cpu_resolution = 1.0 / self.clock_ticks
+        # PID: [open stat file, CPU ticks at the previous read]
+        self.processes = {}
+        self.next_refresh = 0.0
+        # CPU ticks of all processes so far, exited ones included
+        self.total_ticks = 0
+
+    def refresh(self):
+        """Open the stat files of processes started since the last refresh"""
+        for name in os.listdir(self.proc_root):
+            if not name.isdigit() or int(name) in self.processes:
+                continue
+            try:
+                # /proc/[pid] is owned by the effective UID of the process
+                if os.stat(f'{self.proc_root}/{name}').st_uid != self.uid:
+                    continue
+                fd = os.open(f'{self.proc_root}/{name}/stat', os.O_RDONLY)
+            except OSError:
+                continue
+            # Ticks used before the process was found are not counted in this interval
+            self.processes[int(name)] = [fd, None]
+
+    def read(self):
+        """Return (CPU seconds used so far, RSS bytes)"""
+        now = time.monotonic()
+        if now >= self.next_refresh:
+            self.refresh()
+            self.next_refresh = now + settings.BURST_PID_REFRESH_SECONDS
+
+        rss_pages = 0
+        exited = []
+        for pid, process in self.processes.items():
+            try:
+                data = os.pread(process[0], 1024, 0)
+                # Fields after the command name, fields[0] is field 3 (state) of proc(5)
+                fields = data[data.rindex(b')') + 2:].split()
+                ticks = int(fields[11]) + int(fields[12])  # utime + stime
+                rss_pages += int(fields[21])
+            except (OSError, ValueError, IndexError):
+                # The process exited
+                exited.append(pid)
+                continue
+            if process[1] is not None:
+                self.total_ticks += max(0, ticks - process[1])
+            process[1] = ticks
+        for pid in exited:
+            os.close(self.processes.pop(pid)[0])
+        return self.total_ticks / self.clock_ticks, rss_pages * self.page_size
+
+    def close(self):
+        for fd, _ in self.processes.values():
+            os.close(fd)
+        self.processes = {}
+
+
+def create_source(memory_metric):
+    """Return the cheapest source whose memory matches `memory_metric` best"""
+    if memory_metric == 'cgroup' and sampler.CgroupSampler.is_available():
+        return CgroupSource()
+    # RSS, and the closest that can be read this often for PSS and USS
+    return PidSource()
+
+
+class BurstSampler:
+    """Reads a source at up to `rate_hz` on a thread of its own.
+
+    `create_source` is called on the thread, so opening the source counts
+    against the budget too. Reads are folded into the min, sum and max of
+    windows of WINDOW_SECONDS, the same length however often the app
+    samples, take() returns the last complete one. The CPU time
+    the thread spends is measured with time.thread_time(), a read waits
+    until the thread's total CPU time is within the budget.
+    """
+
+    def __init__(self, create_source, rate_hz=None, budget_percent=None):
+        self.create_source = create_source
+        self.source = None
+        self.rate_hz = rate_hz or settings.BURST_RATE_HZ
+        self.budget = (budget_percent or settings.BURST_CPU_BUDGET_PERCENT) / 100
+        self.cpu_count = psutil.cpu_count()
+        self.total_memory = psutil.virtual_memory().total
+        # Count, sum, min and max of CPU and memory percent of the current window, and when it started
+        self.window = None
+        self.window_start = None
+        # The last complete window, and when it ended
+        self.complete_window = None
+        self.complete_time = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        # Measured over the last second: reads per second and CPU use of the thread in percent of one CPU
+        self.measured_rate_hz = 0.0
+        self.measured_cpu_percent = 0.0
+        self.throttled = False
+        # Reads and CPU seconds of the thread since it started, when it started and stopped
+        self.reads = 0
+        self.cpu_seconds = 0.0
+        self.start_time = None
+        self.stop_time = None
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        if self.source is not None:
+            self.source.close()
+
+    def run(self):
+        try:
+            self.run_reads()
+        finally:
+            self.stop_time = time.monotonic()
+
+    def run_reads(self):
+        self.start_time = time.monotonic()
+        start_cpu = time.thread_time()
+        try:
+            self.source = self.create_source()
+            cpu_seconds, _ = self.source.read()
+        except (OSError, ValueError) as e:
+            print(strings.ERROR_BURST_SOURCE.format(e))
+            return
+        # Recent (time, CPU seconds) reads, CPU use is measured from the oldest one
+        reads = deque([(time.monotonic(), cpu_seconds)])
+        # A CPU counter with a coarse unit needs a longer span to measure a rate
+        cpu_span = self.source.cpu_resolution / CPU_ERROR
+        interval = 1.0 / self.rate_hz
+        next_read = reads[0][0] + interval
+        # Start of the current measurement, and thread CPU time and reads at it
+        measure_time, measure_cpu, measure_reads = self.start_time, start_cpu, 0
+        throttled_reads = 0
+        previous_cpu = time.thread_time()
+
+        while not self.stop_event.wait(max(0.0, next_read - time.monotonic())):
+            try:
+                cpu_seconds, memory_bytes = self.source.read()
+            except (OSError, ValueError) as e:
+                print(strings.ERROR_BURST_SOURCE.format(e))
+                return
+            now = time.monotonic()
+            while len(reads) > 1 and now - reads[1][0] >= cpu_span:
+                reads.popleft()
+            span = now - reads[0][0]
+            cpu_percent = max(0.0, cpu_seconds - reads[0][1]) * 100 / (span * self.cpu_count) if span > 0 else 0.0
+            reads.append((now, cpu_seconds))
+            self.add(now, sampler.clamp_percent(cpu_percent),
+                     sampler.clamp_percent(memory_bytes * 100 / self.total_memory))
+
+            cpu_end = time.thread_time()
+            self.reads += 1
+            self.cpu_seconds = cpu_end - start_cpu
+            # All CPU time used so far, the source's setup and refreshes included, and the
+            # next read, costing about as much as this one, may only be the budget's share
+            # of the time since the start: wait until then
+            budget_time = self.start_time + (self.cpu_seconds + cpu_end - previous_cpu) / self.budget
+            previous_cpu = cpu_end
+            # After a stall, continue from now instead of catching up
+            scheduled = max(next_read + interval, now)
+            next_read = max(scheduled, budget_time)
+            throttled_reads += budget_time > scheduled
+
+            measure_reads += 1
+            if now - measure_time >= 1.0:
+                self.measured_rate_hz = measure_reads / (now - measure_time)
+                self.measured_cpu_percent = (cpu_end - measure_cpu) * 100 / (now - measure_time)
+                throttled = throttled_reads > 0
+                if throttled and not self.throttled:
+                    print(strings.WARNING_BURST_THROTTLED.format(self.rate_hz, self.budget * 100,
+                                                                 self.measured_rate_hz))
+                self.throttled = throttled
+                measure_time, measure_cpu, measure_reads, throttled_reads = now, cpu_end, 0, 0
+
+    def summary(self):
+        """Return (reads per second, percent of one CPU) from the start of the thread until it stopped, or now"""
+        if self.start_time is None:
+            return 0.0, 0.0
+        end = time.monotonic() if self.stop_time is None else self.stop_time
+        elapsed = max(1e-9, end - self.start_time)
+        return self.reads / elapsed, self.cpu_seconds * 100 / elapsed
+
+    def add(self, now, cpu, mem):
+        """Fold a read at `now` (time.monotonic) into its window"""
+        with self.lock:
+            window = self.window
+            if window is None or now - self.window_start >= WINDOW_SECONDS:
+                if window is None or now - self.window_start >= 2 * WINDOW_SECONDS:
+                    # The first read, or reads paused for longer than a window
+                    next_start = now
+                else:
+                    # Windows follow each other on one grid
+                    next_start = self.window_start + WINDOW_SECONDS
+                if window is not None:
+                    self.complete_window = window
+                    self.complete_time = self.window_start + WINDOW_SECONDS
+                self.window_start = next_start
+                self.window = [1, cpu, cpu, cpu, mem, mem, mem]
+                return
+            window[0] += 1
+            window[1] += cpu
+            window[2] = min(window[2], cpu)
+            window[3] = max(window[3], cpu)
+            window[4] += mem
+            window[5] = min(window[5], mem)
+            window[6] = max(window[6], mem)
+
+    def take(self, now=None):
+        """Return (cpu_min, cpu_mean, cpu_max, mem_min, mem_mean, mem_max) of the last complete window.
+
+        Returns None before the first window is complete, or if reads
+        stopped and the last window ended more than a window ago.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            window = self.complete_window
+            if window is None or now - self.complete_time > WINDOW_SECONDS:
+                return None
+        count, cpu_sum, cpu_min, cpu_max, mem_sum, mem_min, mem_max = window
+        return cpu_min, cpu_sum / count, cpu_max, mem_min, mem_sum / count, mem_max
+
+
+def spike_band(sample, window):
+    """Return (cpu_min, cpu_max, mem_min, mem_max) around the values of `sample`.
+
+    The sampler backend may measure differently than the burst source (top,
+    PSS, a collector), so the band keeps the spread of the burst reads
+    around their mean and is moved to the sample's own values.
+    """
+    cpu_min, cpu_mean, cpu_max, mem_min, mem_mean, mem_max = window
+    user_cpu, user_mem = sample.user_cpu, sample.user_mem
+    return (sampler.clamp_percent(min(user_cpu, user_cpu + cpu_min - cpu_mean)),
+            sampler.clamp_percent(max(user_cpu, user_cpu + cpu_max - cpu_mean)),
+            sampler.clamp_percent(min(user_mem, user_mem + mem_min - mem_mean)),
+            sampler.clamp_percent(max(user_mem, user_mem + mem_max - mem_mean)))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+collector.py - Node-wide collector for the Simple Usage Monitor application.
+
+Scans the process table once per interval and publishes per-UID usage on a
+Unix domain socket. Monitors with SAMPLER_BACKEND = "collector" read their
+own row and the total of all other users from it, instead of every monitor
+scanning the whole process table on its own.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import sampler  # Import sampler backends
+import settings  # Import settings
+import strings  # Import externalized strings
+
+
+class Collector:
+    """Samples all users on a background thread and keeps the latest snapshot"""
+
+    def __init__(self, interval=settings.SAMPLING_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.sampler = sampler.ProcSampler()
+        # Latest snapshot, kept encoded so serving a client only costs a send
+        self.snapshot = self.encode(self.sampler.usage_by_uid())
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def encode(self, usage):
+        return json.dumps({
+            'timestamp': time.time(),
+            'interval': self.interval,
+            'memory_metric': self.sampler.memory_metric,
+            'usage': usage,
+        }).encode()
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        next_sample = time.monotonic()
+        while True:
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # We fell behind, start counting from now instead of catching up
+                next_sample = time.monotonic()
+            try:
+                self.snapshot = self.encode(self.sampler.usage_by_uid())
+            except Exception as e:
+                print(strings.ERROR_SYSTEM_USAGE.format(e))
+
+
+class SnapshotHandler(socketserver.BaseRequestHandler):
+    """Send the latest snapshot to a client and close the connection"""
+
+    def handle(self):
+        self.request.sendall(self.server.collector.snapshot)
+
+
+class CollectorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, collector):
+        self.collector = collector
+        super().__init__(socket_path, SnapshotHandler)
+
+
+def socket_in_use(socket_path):
+    """Return True if another collector is answering on socket_path"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+            return True
+        except OSError:
+            return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--socket', default=settings.COLLECTOR_SOCKET,
+                        help="Unix socket to publish on (default: %(default)s)")
+    parser.add_argument('--interval', type=float, default=settings.SAMPLING_INTERVAL_MS / 1000,
+                        help="Seconds between scans (default: %(default)s)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.socket):
+        if socket_in_use(args.socket):
+            sys.exit(strings.ERROR_COLLECTOR_SOCKET_IN_USE.format(args.socket))
+        # Left behind by a collector that did not shut down cleanly
+        os.remove(args.socket)
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+
+    collector = Collector(args.interval)
+    server = CollectorServer(args.socket, collector)
+    # Every user on the node needs to be able to read from the socket
+    os.chmod(args.socket, 0o666)
+
+    # Remove the socket when stopped by systemd or kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    collector.start()
+    print(strings.COLLECTOR_LISTENING.format(args.socket, args.interval))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+core.py - Qt-free core of the Simple Usage Monitor application.
+
+Holds the sampler, the alert rules and the usage history, so usage
+can be monitored from scripts, cron or SSH sessions without a display.
+Nothing in here may import Qt.
+"""
+
+import os
+import time
+
+import psutil
+
+import alerts  # Import alert rules
+import burst  # Import burst sampling
+import history  # Import usage history
+import history_store  # Import long-term usage history
+import instrumentation  # Import per-phase timers
+import profiling  # Import profiling mode
+import recording  # Import sample recordings
+import sampler  # Import sampler backends
+import settings  # Import settings
+import strings  # Import externalized strings
+
+
+def alert_metrics(sample, total_memory):
+    """Return the values alert rules can watch for a sample"""
+    user_cpu, _, user_mem = sample[:3]
+    return {
+        'cpu': user_cpu,
+        'memory_percent': user_mem,
+        'memory_gb': (user_mem / 100.0) * total_memory / (1024 * 1024 * 1024),
+    }
+
+
+class AdaptiveInterval:
+    """Chooses the time until the next sample from the latest usage.
+
+    The interval doubles after every sample while usage is stable and well
+    below the thresholds of the alert rules, and drops back to the base
+    interval as soon as usage changes or gets close to a threshold.
+    It runs on the sampling thread, so it keeps copies of the thresholds
+    instead of looking at the alert engine, which the GUI thread updates.
+    """
+
+    def __init__(self, monitor, base_ms=settings.SAMPLING_INTERVAL_MS):
+        self.near_thresholds = monitor.alerts.near_thresholds(settings.ADAPTIVE_NEAR_THRESHOLD)
+        self.total_memory = monitor.total_memory
+        self.base_ms = base_ms
+        self.interval_ms = base_ms
+        self.previous_sample = None
+
+    def reset(self):
+        self.interval_ms = self.base_ms
+
+    def next_interval(self, sample, hidden=False):
+        """Return the interval in milliseconds to wait after `sample`"""
+        metrics = alert_metrics(sample, self.total_memory)
+        near_alert = any(metrics[metric] >= value for metric, value in self.near_thresholds)
+        stable = self.previous_sample is not None and all(
+            abs(value - previous) <= settings.ADAPTIVE_STABLE_CHANGE
+            for value, previous in zip(sample[:4], self.previous_sample[:4]))
+        self.previous_sample = sample
+
+        if near_alert or not stable:
+            self.interval_ms = self.base_ms
+        else:
+            max_ms = settings.ADAPTIVE_HIDDEN_MAX_INTERVAL_MS if hidden else settings.ADAPTIVE_MAX_INTERVAL_MS
+            self.interval_ms = min(max_ms, self.interval_ms * 2)
+        return self.interval_ms
+
+
+class UsageMonitor:
+    """Samples usage, checks it against the alert rules and keeps its history"""
+
+    def __init__(self, backend=None, history_points=60, use_history_store=True,
+                 sample_source=None, record_path=None, burst_rate=None):
+        # A sample source, such as a recording replay, takes the place of the sampler backend
+        self.sampler = sample_source or sampler.create_sampler(backend)
+        # What the memory values measure, one of strings.MEMORY_METRIC_NAMES
+        self.memory_metric = getattr(self.sampler, 'memory_metric', 'rss')
+        # Reads your own usage many times a second for the spike band, not for replays
+        self.burst_sampler = None
+        if burst_rate and sample_source is None:
+            # The source is opened on the burst thread, which reports if that fails
+            self.burst_sampler = burst.BurstSampler(lambda: burst.create_source(self.memory_metric), burst_rate)
+            self.burst_sampler.start()
+        # Write every sample to a recording for later replay
+        self.recorder = recording.RecordingWriter(record_path) if record_path else None
+        self.history = history.UsageHistory(history_points)
+        self.top_users = history.TopUsersHistory(history_points)
+
+        # Store total system memory and memory limit
+        self.total_memory = psutil.virtual_memory().total
+        # Prefer the real limit of the user's cgroup over the configured one
+        cgroup_memory_limit = sampler.read_memory_limit()
+        if cgroup_memory_limit is not None:
+            self.memory_limit = cgroup_memory_limit
+            self.memory_limit_gb = round(cgroup_memory_limit / (1024 * 1024 * 1024), 1)
+        else:
+            self.memory_limit = settings.MEMORY_LIMIT_GB * 1024 * 1024 * 1024  # Convert GB to bytes
+            self.memory_limit_gb = settings.MEMORY_LIMIT_GB
+        self.max_memory_percent = min(100, (self.memory_limit / self.total_memory) * 100)
+
+        self.alerts = alerts.AlertEngine()
+        # Process table for the process view when the sampler does not keep one
+        self.process_table = None
+
+        # Open the long-term history and restore the last samples from it
+        self.history_store = None
+        if use_history_store:
+            try:
+                self.history_store = history_store.HistoryStore()
+                now = time.time()
+                records = self.history_store.read('raw', since=now - max(history_points, self.alerts.max_window))
+                self.history.restore(records, now)
+                # Fill the alert windows too, so a restart does not forget an ongoing alert
+                for record in records:
+                    self.alerts.update(self.alert_metrics((record['user_cpu'], 0.0, record['user_mem'])),
+                                       float(record['timestamp']))
+            except OSError as e:
+                print(strings.ERROR_HISTORY_STORE.format(e))
+
+    def get_system_usage(self):
+        """Get CPU and memory usage from the configured sampler backend."""
+        try:
+            with instrumentation.phase('sample'):
+                sample = self.sampler.sample()
+            if self.burst_sampler is not None:
+                # The min and max of the burst reads of the last second are the sample's spike band
+                window = self.burst_sampler.take()
+                if window is not None:
+                    sample = sample._replace(burst=burst.spike_band(sample, window))
+            if self.recorder is not None:
+                self.recorder.write(time.time(), sample)
+            return sample
+        except Exception as e:
+            print(strings.ERROR_SYSTEM_USAGE.format(e))
+            # Return zeros in case of error
+            return sampler.Sample(0.0, 0.0, 0.0, 0.0)
+
+    def record(self, sample, timestamp=None):
+        """Add a sample to the in-memory and the long-term history and check the alert rules.
+
+        `timestamp` is when the sample was taken. Samples are stored once,
+        at their own time, also after a stretched interval. Without a
+        timestamp (replays in the app) a sample is placed one second after
+        the previous one.
+        """
+        with instrumentation.phase('record'):
+            self.history.append(sample, timestamp)
+            self.top_users.append(sample.top_others)
+            if self.history_store is not None:
+                self.history_store.append(time.time() if timestamp is None else timestamp, sample)
+        with instrumentation.phase('alert'):
+            self.alerts.update(self.alert_metrics(sample), timestamp)
+        instrumentation.tick()
+        profiling.tick()
+
+    def memory_gb(self, mem_percent):
+        """Convert a memory percentage to GB"""
+        return (mem_percent / 100.0) * self.total_memory / (1024 * 1024 * 1024)
+
+    def process_rows(self):
+        """Return (uptime, rows), a row of (key, pid, name, cpu_percent, memory_bytes, start_seconds) per user process.
+
+        The "proc" backend already reads every process for its sample, so its
+        process table is reused. Other backends get a table of their own, which
+        is only updated while this is called (while the process view is open).
+        CPU is in percent of one CPU, like top. Processes and the uptime are
+        in seconds since boot, so the runtime of a process is uptime - start.
+        """
+        smaps = getattr(self.sampler, 'smaps', None)
+        table = getattr(self.sampler, 'table', None)
+        if table is None:
+            local_sampler = getattr(self.sampler, 'local_sampler', None)
+            if local_sampler is not None:
+                # The collector backend sampling locally
+                smaps = local_sampler.smaps
+                table = local_sampler.table
+            else:
+                if self.process_table is None:
+                    self.process_table = sampler.ProcessTable()
+                table = self.process_table
+                table.update()
+
+        uid = os.getuid()
+        uptime = table.previous_uptime or 0.0
+        rows = []
+        for key, entry in list(table.entries.items()):
+            if entry.uid != uid:
+                continue
+            memory_bytes = entry.rss_bytes if smaps is None else smaps.memory_bytes(entry)
+            rows.append((key, entry.pid, entry.name, entry.cpu_percent, memory_bytes,
+                         entry.starttime / table.clock_ticks))
+        return uptime, rows
+
+    def alert_metrics(self, sample):
+        """Return the values alert rules can watch for a sample"""
+        return alert_metrics(sample, self.total_memory)
+
+    def alert_state(self):
+        """Return (alert_color, alert_message) of the active alerts, "green" and "" without an alert"""
+        return self.alerts.state()
+
+    def close(self):
+        """Stop burst sampling, flush and close the long-term history and the recording"""
+        if self.burst_sampler is not None:
+            self.burst_sampler.stop()
+            self.burst_sampler = None
+        if self.history_store is not None:
+            self.history_store.close()
+            self.history_store = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+decimation.py - Min/max envelopes for the long chart windows of the Simple Usage Monitor application.
+
+An hour holds 3600 samples, far more than a chart is wide in pixels. Each
+series is reduced to the minimum and maximum of every pixel column, so
+drawing costs depend on the width of the chart instead of the length of the
+window, and a spike shorter than a column still shows. Columns are aligned
+to fixed time boundaries, so new samples only change the newest column and
+the older ones are kept from tick to tick.
+Qt is never imported here.
+"""
+
+import numpy as np
+
+
+class EnvelopeDecimator:
+    """Per-column minimum and maximum of several series over a sliding time window.
+
+    The window of `length` seconds is split into `columns` columns, one more
+    column holds the newest, partially filled one.
+    """
+
+    def __init__(self, length, columns, names):
+        self.length = length
+        self.width = length / columns
+        self.names = names
+        self.size = columns + 1
+        # Empty columns have an infinite minimum and are not drawn
+        self.lows = np.full((len(names), self.size), np.inf)
+        self.highs = np.full((len(names), self.size), -np.inf)
+        # Absolute index (timestamp // width) of the last column, None until data arrives
+        self.newest = None
+        # Timestamp of the newest record added
+        self.last_timestamp = None
+
+    def since(self, now):
+        """Return the timestamp to read new records from"""
+        if self.last_timestamp is None:
+            return now - self.length
+        # Reading is inclusive, skip the record added last
+        return np.nextafter(self.last_timestamp, np.inf)
+
+    def add(self, timestamps, lows, highs):
+        """Fold records, oldest first, into their columns.
+
+        `lows` and `highs` hold one array per name. Samples are their own
+        minimum and maximum, rollups pass their min and max fields.
+        """
+        if not len(timestamps):
+            return
+        buckets = np.floor(timestamps / self.width).astype(np.int64)
+        newest = int(buckets[-1])
+        if self.newest is None:
+            self.newest = newest
+        shift = newest - self.newest
+        if shift > 0:
+            # Columns leaving the window are dropped, new ones start empty
+            shift = min(shift, self.size)
+            for bounds, empty in ((self.lows, np.inf), (self.highs, -np.inf)):
+                bounds[:, :self.size - shift] = bounds[:, shift:]
+                bounds[:, self.size - shift:] = empty
+            self.newest = newest
+
+        slots = buckets - (self.newest - self.size + 1)
+        first = np.searchsorted(slots, 0)
+        slots = slots[first:]
+        if len(slots):
+            # Timestamps are increasing, so each column is one run of records
+            starts = np.flatnonzero(np.diff(slots, prepend=-1))
+            columns = slots[starts]
+            for row in range(len(self.names)):
+                self.lows[row, columns] = np.minimum(self.lows[row, columns],
+                                                     np.minimum.reduceat(lows[row][first:], starts))
+                self.highs[row, columns] = np.maximum(self.highs[row, columns],
+                                                      np.maximum.reduceat(highs[row][first:], starts))
+        self.last_timestamp = float(timestamps[-1])
+
+    def envelope(self, now, unit):
+        """Return (x values, {name: y values}) with the minimum and then the maximum of each column with data.
+
+        X values are the middle of the column, relative to `now` in `unit` seconds.
+        """
+        if self.newest is None:
+            return np.zeros(0), {name: np.zeros(0) for name in self.names}
+        columns = np.flatnonzero(np.isfinite(self.lows[0]))
+        middles = (self.newest - self.size + 1 + columns + 0.5) * self.width
+        # The newest column may reach past now
+        times = np.repeat(np.minimum(middles - now, 0.0) / unit, 2)
+        values = {}
+        for row, name in enumerate(self.names):
+            points = np.empty(2 * len(columns))
+            points[0::2] = self.lows[row, columns]
+            points[1::2] = self.highs[row, columns]
+            values[name] = points
+        return times, values
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+export.py - Exports usage history of the Simple Usage Monitor application.
+
+Writes a time range of your and everybody else's CPU and memory to CSV, to
+attach to a ticket or to open in a spreadsheet, or to a compact columnar
+binary file. Records are streamed from the long-term history in chunks that
+are views into its files, so exporting a week of 1 second samples costs no
+more memory than exporting a minute. The last minute can also be exported
+from the in-memory history.
+Qt is never imported here.
+"""
+
+import os
+import re
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+
+import history_store  # Import the on-disk record formats
+import strings  # Import externalized strings
+
+FORMATS = ('csv', 'columnar')
+# File name extension of each format
+EXTENSIONS = {'csv': '.csv', 'columnar': '.sumc'}
+
+# Columnar file: a header with the columns, then blocks of records. Each
+# block is its record count followed by the values of every column in turn.
+HEADER = struct.Struct('<4sIH')  # Magic, format version, column count
+COLUMN = struct.Struct('<16s8s')  # Column name, NumPy dtype string
+BLOCK = struct.Struct('<I')  # Records in the block
+MAGIC = b'SUMC'
+VERSION = 1
+
+# Relative times, e.g. "90m" for 90 minutes ago
+RELATIVE_TIME = re.compile(r'^(\d+(?:\.\d+)?)([smhd])$')
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 24 * 3600}
+
+
+def parse_time(text, now=None):
+    """Return the timestamp of a local date and time in ISO format, or of a relative time ago like "6h" """
+    now = time.time() if now is None else now
+    match = RELATIVE_TIME.match(text.strip())
+    if match:
+        return now - float(match.group(1)) * UNIT_SECONDS[match.group(2)]
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(strings.ERROR_EXPORT_TIME.format(text)) from None
+
+
+def format_for_path(path):
+    """Return the format matching the extension of `path`, CSV for anything unknown"""
+    for name, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return name
+    return 'csv'
+
+
+class CsvWriter:
+    """Writes records as CSV lines, with the local time next to the timestamp"""
+
+    def __init__(self, file, dtype):
+        self.file = file
+        self.names = dtype.names
+        self.file.write(','.join(('timestamp', 'time') + self.names[1:]) + '\n')
+        formats = ['{:.3f}', '{}']
+        for name in self.names[1:]:
+            formats.append('{:d}' if dtype[name].kind == 'u' else '{:.3f}')
+        self.row_format = ','.join(formats) + '\n'
+
+    def write(self, chunk):
+        timestamps = chunk['timestamp']
+        local_times = np.datetime_as_string((timestamps * 1000).astype('datetime64[ms]'),
+                                            unit='s', timezone='local')
+        # One list per column, formatting a chunk is then a single pass
+        columns = [timestamps.tolist(), local_times.tolist()]
+        columns.extend(chunk[name].tolist() for name in self.names[1:])
+        self.file.write(''.join(self.row_format.format(*row) for row in zip(*columns)))
+
+
+class ColumnarWriter:
+    """Writes records in blocks of columns, in the dtypes of the long-term history"""
+
+    def __init__(self, file, dtype):
+        self.file = file
+        self.dtype = dtype
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(dtype.names)))
+        for name in dtype.names:
+            self.file.write(COLUMN.pack(name.encode(), dtype[name].str.encode()))
+
+    def write(self, chunk):
+        self.file.write(BLOCK.pack(len(chunk)))
+        for name in self.dtype.names:
+            # A field of a chunk is strided, make it contiguous one column at a time
+            self.file.write(np.ascontiguousarray(chunk[name]).tobytes())
+
+
+WRITERS = {'csv': CsvWriter, 'columnar': ColumnarWriter}
+
+
+def write(path, chunks, dtype, file_format=None):
+    """Write chunks of records to `path` and return how many were written.
+
+    The file is written under a temporary name first, so a failed export
+    never leaves a file that looks complete.
+    """
+    file_format = file_format or format_for_path(path)
+    temporary = f'{path}.part'
+    count = 0
+    try:
+        with open(temporary, 'w' if file_format == 'csv' else 'wb') as f:
+            writer = WRITERS[file_format](f, dtype)
+            for chunk in chunks:
+                if len(chunk):
+                    writer.write(chunk)
+                    count += len(chunk)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return count
+
+
+def export_store(store, tier, path, since=None, until=None, file_format=None):
+    """Export a time range of a tier of the long-term history, return the number of records"""
+    dtype = history_store.RAW_DTYPE if tier == 'raw' else history_store.ROLLUP_DTYPE
+    return write(path, store.read_chunks(tier, since, until), dtype, file_format)
+
+
+def history_records(history, seconds=None):
+    """Return a copy of the samples in the in-memory history as records, at the time they were taken.
+
+    With `seconds`, only the samples of the last `seconds` up to the newest
+    sample, the span the live chart shows.
+    """
+    timestamps = history.timestamps()
+    first = 0
+    if seconds is not None and len(timestamps):
+        first = np.searchsorted(timestamps, timestamps[-1] - seconds)
+    records = np.zeros(len(timestamps) - first, dtype=history_store.RAW_DTYPE)
+    records['timestamp'] = timestamps[first:]
+    for name in history.COLUMNS:
+        records[name] = history.series(name)[history.capacity - len(timestamps) + first:]
+    return records
+
+
+def export_history(history, path, seconds=None, file_format=None):
+    """Export the last `seconds` of the in-memory history, all of it if None, return the number of records"""
+    return write(path, [history_records(history, seconds)], history_store.RAW_DTYPE, file_format)
+
+
+def read_columnar(path):
+    """Return {column name: array} of a columnar export"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, column_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(strings.ERROR_EXPORT_FORMAT.format(path))
+    offset = HEADER.size
+    columns = []
+    for _ in range(column_count):
+        name, dtype = COLUMN.unpack_from(data, offset)
+        columns.append((name.rstrip(b'\0').decode(), np.dtype(dtype.rstrip(b'\0').decode())))
+        offset += COLUMN.size
+    blocks = {name: [] for name, _ in columns}
+    while offset < len(data):
+        count, = BLOCK.unpack_from(data, offset)
+        offset += BLOCK.size
+        for name, dtype in columns:
+            blocks[name].append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+    return {name: np.concatenate(blocks[name]) if blocks[name] else np.zeros(0, dtype=dtype)
+            for name, dtype in columns}
+
+
+def run(args):
+    """Export the long-term history for `SimpleUsageMonitor.py --export`"""
+    now = time.time()
+    try:
+        since = parse_time(args.since, now) if args.since else None
+        until = parse_time(args.until, now) if args.until else None
+        # Opened read-only, a running monitor keeps writing to it
+        store = history_store.HistoryStore(read_only=True)
+        try:
+            count = export_store(store, args.resolution, args.export, since, until, args.export_format)
+        finally:
+            store.close()
+    except (OSError, ValueError) as e:
+        print(e)
+        return
+    print(strings.EXPORT_DONE.format(count, args.export))
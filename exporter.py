@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+exporter.py - Prometheus/OpenMetrics exporter for the Simple Usage Monitor application.
+
+Serves per-user CPU and memory usage of this node, and each user's alert
+state, as gauges in the Prometheus text format. Usage is sampled on a
+background thread and every scrape is answered from the latest sample,
+so scrapes never trigger a scan.
+"""
+
+import http.server
+import os
+import pwd
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import psutil
+
+import alerts  # Import alert rules
+import collector  # Import the check for a live socket
+import instrumentation  # Import per-phase timers
+import profiling  # Import profiling mode
+import sampler  # Import sampler backends
+import settings  # Import settings
+import strings  # Import externalized strings
+
+# Metric name, help text and the index of its value in a row built by Exporter.metric_rows
+METRICS = [
+    ('simple_usage_monitor_cpu_percent', "CPU usage of a user in percent of all CPUs of the node", 0),
+    ('simple_usage_monitor_memory_percent', "Memory usage of a user in percent of the node's memory", 1),
+    ('simple_usage_monitor_memory_bytes', "Memory usage of a user in bytes", 2),
+    ('simple_usage_monitor_alert_level', "Alert state of a user: 0 green, 1 orange, 2 red", 3),
+]
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Exporter:
+    """Samples all users on a background thread and keeps the latest response body"""
+
+    def __init__(self, backend=None, interval=settings.SAMPLING_INTERVAL_MS / 1000):
+        self.sampler = sampler.create_sampler(backend)
+        if not hasattr(self.sampler, 'usage_by_uid'):
+            raise ValueError(strings.ERROR_EXPORTER_BACKEND.format(type(self.sampler).__name__))
+        self.interval = interval
+        self.node = socket.gethostname()
+        self.total_memory = psutil.virtual_memory().total
+        self.usernames = {}
+        # One alert engine per user, the rules look at the same windows as in the app
+        self.alert_engines = {}
+        self.alert_rules = alerts.load_rules()
+        # Latest response body, kept encoded so a scrape only costs a send
+        self.body = self.encode({}, time.time())
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def username(self, uid):
+        """Return the name of a user, cached since user names rarely change"""
+        name = self.usernames.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self.usernames[uid] = name
+        return name
+
+    def metric_rows(self, usage, timestamp):
+        """Return (user, cpu_percent, memory_percent, memory_bytes, alert_level) for every user"""
+        rows = []
+        alert_engines = {}
+        for uid, (cpu, mem) in sorted(usage.items()):
+            memory_bytes = round(mem / 100.0 * self.total_memory)
+            engine = self.alert_engines.get(uid) or alerts.AlertEngine(self.alert_rules)
+            engine.update({
+                'cpu': cpu,
+                'memory_percent': mem,
+                'memory_gb': memory_bytes / (1024 * 1024 * 1024),
+            }, timestamp)
+            alert_engines[uid] = engine
+            rows.append((self.username(uid), cpu, mem, memory_bytes, alerts.ALERT_LEVELS[engine.level()]))
+        # Users without processes are dropped along with their alerts
+        self.alert_engines = alert_engines
+        return rows
+
+    def encode(self, usage, timestamp):
+        lines = []
+        rows = self.metric_rows(usage, timestamp)
+        node = escape_label(self.node)
+        for name, help_text, index in METRICS:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for row in rows:
+                lines.append(f'{name}{{node="{node}",user="{escape_label(row[0])}"}} {float(row[index + 1])!r}')
+        lines.append('# HELP simple_usage_monitor_sample_timestamp_seconds Time the served sample was taken')
+        lines.append('# TYPE simple_usage_monitor_sample_timestamp_seconds gauge')
+        lines.append(f'simple_usage_monitor_sample_timestamp_seconds{{node="{node}"}} {timestamp:.3f}')
+        if instrumentation.enabled:
+            lines.extend(instrumentation.prometheus_lines())
+        return ('\n'.join(lines) + '\n').encode()
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        profiling.attach('sampler')
+        next_sample = time.monotonic()
+        while True:
+            try:
+                with instrumentation.phase('sample'):
+                    usage = self.sampler.usage_by_uid()
+                with instrumentation.phase('encode'):
+                    self.body = self.encode(usage, time.time())
+            except Exception as e:
+                print(strings.ERROR_SYSTEM_USAGE.format(e))
+            instrumentation.tick()
+            profiling.tick('sampler')
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # We fell behind, start counting from now instead of catching up
+                next_sample = time.monotonic()
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Answer GET /metrics with the latest response body"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.exporter.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes arrive every few seconds, do not log each one
+        pass
+
+
+class TCPMetricsServer(http.server.ThreadingHTTPServer):
+    def __init__(self, address, exporter):
+        self.exporter = exporter
+        super().__init__(address, MetricsHandler)
+
+
+class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, exporter):
+        self.exporter = exporter
+        super().__init__(path, MetricsHandler)
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+
+def run(args):
+    """Serve metrics on args.listen, either HOST:PORT or unix:PATH"""
+    exporter = Exporter(args.backend, args.interval)
+    listen = args.listen
+    socket_path = None
+    if listen.startswith('unix:'):
+        socket_path = listen[len('unix:'):]
+        if os.path.exists(socket_path):
+            if collector.socket_in_use(socket_path):
+                sys.exit(strings.ERROR_EXPORTER_SOCKET_IN_USE.format(socket_path))
+            # Left behind by an exporter that did not shut down cleanly
+            os.remove(socket_path)
+        server = UnixMetricsServer(socket_path, exporter)
+    else:
+        host, _, port = listen.rpartition(':')
+        server = TCPMetricsServer((host or '127.0.0.1', int(port)), exporter)
+
+    # Remove the socket when stopped by systemd or kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    exporter.start()
+    print(strings.EXPORTER_LISTENING.format(listen, args.interval))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path:
+            os.remove(socket_path)
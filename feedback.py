@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+feedback.py - Background mail queue for the feedback of the Simple Usage Monitor application.
+
+Feedback is written to a spool directory and sent with the `mail` command
+on a worker thread, so a slow mail server never freezes the app. A send
+that fails stays in the spool and is retried later, also after a restart,
+until it succeeds or FEEDBACK_MAX_ATTEMPTS is reached. Entries that were
+never sent are then moved to the failed/ subdirectory of the spool.
+Qt is never imported here, screenshots arrive as functions that write them.
+"""
+
+import fcntl
+import getpass
+import json
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import settings  # Import settings
+import strings  # Import externalized strings
+
+MESSAGE_FILE = 'message.json'
+FAILED_DIR = 'failed'
+
+
+def mail_command(subject, attachment_paths):
+    """Return the mail command line for a message"""
+    # Get user's email from .forward file if it exists
+    forward_file = Path.home() / '.forward'
+    from_email = None
+    if forward_file.exists():
+        with open(forward_file, 'r') as f:
+            from_email = f.read().strip()
+
+    mail_cmd = ['mail']
+    if from_email:
+        mail_cmd.extend(['-r', from_email])
+    for path in attachment_paths:
+        mail_cmd.extend(['-a', path])
+    mail_cmd.extend(['-s', subject, settings.FEEDBACK_EMAIL])  # Use externalized email from settings
+    return mail_cmd
+
+
+class FeedbackQueue:
+    """Spools feedback and sends it on a worker thread.
+
+    `on_result(sent, error, retrying)` is called on the worker thread after
+    every attempt on feedback submitted to this queue, with the error
+    message of a failed one. Results of entries left by earlier sessions are
+    only logged, their user is not waiting for them.
+    """
+
+    def __init__(self, on_result=None, spool_dir=None):
+        self.spool_dir = os.path.expanduser(spool_dir or settings.FEEDBACK_SPOOL_DIR)
+        self.on_result = on_result
+        self.session = uuid.uuid4().hex
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, message, attachments=()):
+        """Queue feedback and return right away.
+
+        `attachments` are (file name, write function, note) tuples, the
+        function is called with a path on the worker thread and the note is
+        added to the message if the file could be written.
+        """
+        self.queue.put((message, attachments))
+
+    def run(self):
+        while True:
+            try:
+                submission = self.queue.get(timeout=self.seconds_until_retry())
+            except queue.Empty:
+                submission = None
+            if submission is not None:
+                entry = self.spool(*submission)
+                if entry is not None:
+                    self.send(entry)
+            # Sends that failed earlier, including those of earlier sessions
+            now = time.time()
+            for entry, state in self.pending():
+                if state['next_attempt'] <= now:
+                    self.send(entry)
+
+    def spool(self, message, attachments):
+        """Write a submission to a new spool entry and return its directory"""
+        username = getpass.getuser()
+        hostname = socket.gethostname()
+        content = strings.FEEDBACK_EMAIL_CONTENT.format(username, hostname, message)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        # Written under a temporary name first, so a crash never leaves half an entry to send
+        temporary = os.path.join(self.spool_dir, '.' + name)
+        entry = os.path.join(self.spool_dir, name)
+        try:
+            # Screenshots may show anything on the user's desktop
+            os.makedirs(temporary, mode=0o700)
+            attachment_names = []
+            for file_name, write, note in attachments:
+                try:
+                    write(os.path.join(temporary, file_name))
+                except Exception as e:
+                    print(strings.ERROR_SCREENSHOT_SAVE.format(file_name, e))
+                    continue
+                attachment_names.append(file_name)
+                content += note
+            with open(os.path.join(temporary, MESSAGE_FILE), 'w') as f:
+                json.dump({
+                    'subject': strings.FEEDBACK_EMAIL_SUBJECT.format(username, hostname),
+                    'content': content,
+                    'attachments': attachment_names,
+                    'session': self.session,
+                    'attempts': 0,
+                    'next_attempt': 0.0,
+                    'error': None,
+                }, f)
+            os.rename(temporary, entry)
+        except OSError as e:
+            print(strings.ERROR_SEND_FEEDBACK.format(e))
+            shutil.rmtree(temporary, ignore_errors=True)
+            self.report(False, str(e), False)
+            return None
+        return entry
+
+    def pending(self):
+        """Return (entry, state) of every spooled submission that is still to be sent"""
+        entries = []
+        try:
+            names = sorted(os.listdir(self.spool_dir))
+        except OSError:
+            return entries
+        for name in names:
+            if name.startswith('.') or name == FAILED_DIR:
+                continue
+            entry = os.path.join(self.spool_dir, name)
+            try:
+                with open(os.path.join(entry, MESSAGE_FILE)) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if state['attempts'] < settings.FEEDBACK_MAX_ATTEMPTS:
+                entries.append((entry, state))
+        return entries
+
+    def seconds_until_retry(self):
+        """Return the time until the next retry is due, None if nothing is waiting"""
+        next_attempts = [state['next_attempt'] for _, state in self.pending()]
+        if not next_attempts:
+            return None
+        return max(0.0, min(next_attempts) - time.time())
+
+    def send(self, entry):
+        """Try to send a spooled submission, remove it once sent"""
+        state_path = os.path.join(entry, MESSAGE_FILE)
+        try:
+            lock_file = open(os.path.join(entry, '.lock'), 'w')
+        except OSError:
+            return
+        with lock_file:
+            try:
+                # Another instance of the app may be sending the same entry
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                # Sent and removed by another instance in the meantime
+                return
+
+            error = None
+            try:
+                result = subprocess.run(
+                    mail_command(state['subject'], [os.path.join(entry, name) for name in state['attachments']]),
+                    input=state['content'], text=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                    timeout=settings.FEEDBACK_SEND_TIMEOUT_SECONDS)
+                if result.returncode != 0:
+                    error = result.stderr.strip() or strings.ERROR_MAIL_EXIT.format(result.returncode)
+            except (OSError, subprocess.SubprocessError) as e:
+                error = str(e)
+
+            own = state.get('session') == self.session
+            if error is None:
+                shutil.rmtree(entry, ignore_errors=True)
+                if own:
+                    self.report(True, '', False)
+                else:
+                    print(strings.FEEDBACK_EARLIER_SENT.format(os.path.basename(entry)))
+                return
+
+            print(strings.ERROR_SEND_FEEDBACK.format(error))
+            state['attempts'] += 1
+            state['error'] = error
+            # Wait longer after every failed attempt
+            state['next_attempt'] = time.time() + min(
+                settings.FEEDBACK_RETRY_SECONDS * 2 ** (state['attempts'] - 1), 24 * 3600)
+            try:
+                with open(state_path, 'w') as f:
+                    json.dump(state, f)
+            except OSError as e:
+                print(strings.ERROR_SEND_FEEDBACK.format(e))
+            retrying = state['attempts'] < settings.FEEDBACK_MAX_ATTEMPTS
+            if not retrying:
+                self.give_up(entry)
+            if own:
+                self.report(False, error, retrying)
+
+    def give_up(self, entry):
+        """Move an entry out of the spool after its last attempt, so it is not listed again"""
+        failed_dir = os.path.join(self.spool_dir, FAILED_DIR)
+        failed_entry = os.path.join(failed_dir, os.path.basename(entry))
+        try:
+            os.makedirs(failed_dir, mode=0o700, exist_ok=True)
+            os.rename(entry, failed_entry)
+        except OSError as e:
+            print(strings.ERROR_SEND_FEEDBACK.format(e))
+            return
+        print(strings.FEEDBACK_GAVE_UP.format(settings.FEEDBACK_MAX_ATTEMPTS, failed_entry))
+
+    def report(self, sent, error, retrying):
+        if self.on_result is not None:
+            self.on_result(sent, error, retrying)
@@ -0,0 +1,1389 @@
+#!/usr/bin/env python3
+"""
+gui.py - Contains the Qt user interface of the Simple Usage Monitor application.
+"""
+import sys
+import os
+import time
+import shutil
+import threading
+import strings  # Import externalized strings
+import settings  # Import settings
+import core  # Import Qt-free monitoring core
+import decimation  # Import min/max envelopes of the long time windows
+import export  # Import history export
+import feedback  # Import the background feedback mail queue
+import history_store  # Import the long-term history
+import instrumentation  # Import per-phase timers
+import profiling  # Import profiling mode
+import recording  # Import sample recordings
+import sampler  # Import sampler backends
+import single_instance  # Import single instance coordination
+import process_view  # Import the per-process view
+
+# Now import the rest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QIcon, QPixmap, QColor
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtWidgets import QMainWindow, QComboBox, QHBoxLayout, QVBoxLayout, QWidget, QLabel, QDialog, QTextEdit, QPushButton, QVBoxLayout, QSpacerItem, QSizePolicy, QCheckBox, QSystemTrayIcon, QMenu, QMessageBox
+from PyQt5.QtCore import QTimer, QSettings, Qt, QObject, QThread, QMetaObject, QEvent, Q_ARG, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QAction, QShortcut
+from PyQt5.QtGui import QFontMetrics, QKeySequence
+
+# Chart time windows: label, length in seconds, history tier the data is
+# read from (None for the live in-memory data), x axis unit in seconds and x axis label
+TIME_WINDOWS = [
+    (strings.TIME_WINDOW_MINUTE, 60, None, 1, strings.TIME_AXIS_LABEL),
+    (strings.TIME_WINDOW_HOUR, 3600, 'raw', 60, strings.TIME_AXIS_LABEL_MINUTES),
+    (strings.TIME_WINDOW_DAY, 24 * 3600, 'minute', 3600, strings.TIME_AXIS_LABEL_HOURS),
+    (strings.TIME_WINDOW_WEEK, 7 * 24 * 3600, 'hour', 24 * 3600, strings.TIME_AXIS_LABEL_DAYS),
+]
+
+# Series of the long time windows, reduced to min/max envelopes
+ENVELOPE_SERIES = ('user_cpu', 'stacked_cpu', 'user_mem', 'stacked_mem')
+# Columns of the envelopes while the charts are narrower than this
+MIN_ENVELOPE_COLUMNS = 100
+
+# Seconds the result of sending feedback or of an export is shown
+NOTICE_SECONDS = 10
+
+# Colors of the bands of the largest other users, used in order and repeated
+TOP_USER_COLORS = [(255, 140, 0), (0, 150, 0), (150, 0, 200), (0, 160, 160), (160, 110, 50)]
+
+class FeedbackDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(strings.FEEDBACK_DIALOG_TITLE)
+        self.setMinimumWidth(500)
+        self.setMinimumHeight(300)
+        self.parent = parent
+        
+        # Create layout
+        layout = QVBoxLayout(self)
+        
+        # Add instructions
+        instructions = QLabel(strings.FEEDBACK_INSTRUCTIONS)
+        instructions.setStyleSheet("font-weight: bold;")
+        layout.addWidget(instructions)
+        
+        # Add text edit for feedback
+        self.feedback_text = QTextEdit()
+        layout.addWidget(self.feedback_text)
+        
+        # Add screenshot checkboxes - both unchecked by default
+        self.app_screenshot_checkbox = QCheckBox(strings.FEEDBACK_ATTACH_APP)
+        self.app_screenshot_checkbox.setChecked(False)  # Default to unchecked
+        layout.addWidget(self.app_screenshot_checkbox)
+        
+        self.screen_screenshot_checkbox = QCheckBox(strings.FEEDBACK_ATTACH_SCREEN)
+        self.screen_screenshot_checkbox.setChecked(False)  # Default to unchecked
+        layout.addWidget(self.screen_screenshot_checkbox)
+        
+        # Add buttons
+        button_layout = QHBoxLayout()
+        
+        # Add spacer to push buttons to the right
+        button_layout.addItem(QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
+        
+        # Add Cancel button
+        self.cancel_button = QPushButton(strings.FEEDBACK_CANCEL)
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_button)
+        
+        # Add Send button
+        self.send_button = QPushButton(strings.FEEDBACK_SEND)
+        self.send_button.clicked.connect(self.accept)
+        self.send_button.setDefault(True)
+        button_layout.addWidget(self.send_button)
+        
+        layout.addLayout(button_layout)
+
+class SamplingWorker(QObject):
+    """Collects usage samples on a background thread.
+
+    Finished samples are delivered through the sample_ready signal, so the
+    GUI thread never blocks on collection. With adaptive sampling the
+    interval is stretched while usage is stable, each sample comes with
+    the time it was taken.
+    """
+    # Emitted with the sample and the time.time() it was taken at
+    sample_ready = pyqtSignal(object, float)
+    # Emitted with the rows of core.UsageMonitor.process_rows while the process view is open
+    processes_ready = pyqtSignal(object)
+    # Emitted with the sample duration in seconds when a sample took longer than the interval
+    overrun = pyqtSignal(float)
+
+    def __init__(self, monitor, interval_ms=settings.SAMPLING_INTERVAL_MS, adaptive=False, top_users=False,
+                 replay_speed=None):
+        super().__init__()
+        # Only the sampler of the monitor is used on the worker thread
+        self.monitor = monitor
+        self.interval_ms = interval_ms
+        self.overrun_count = 0
+        self.timer = None
+        self.adaptive_interval = core.AdaptiveInterval(monitor, interval_ms) if adaptive else None
+        # Set by the GUI thread, allows longer intervals while the window is hidden
+        self.hidden = False
+        # Set by the GUI thread while the process view is open
+        self.want_processes = False
+        # Applied on this thread once it starts, later through set_top_users
+        self.top_users = top_users
+        # Replays are paced by the recorded time of every sample, divided by the speed
+        self.replay_speed = replay_speed
+        self.replay_start = None
+
+    @pyqtSlot()
+    def start(self):
+        """Start sampling, called in the worker thread"""
+        profiling.attach('sampler')
+        self.timer = QTimer()
+        # Fast replays use intervals of a few milliseconds, keep them accurate
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.collect_sample)
+        self.set_top_users(self.top_users)
+        if self.replay_speed:
+            self.replay_start = time.monotonic()
+            self.timer.start(self.replay_interval_ms())
+        else:
+            self.timer.start(self.interval_ms)
+
+    @pyqtSlot()
+    def stop(self):
+        """Stop sampling, called in the worker thread"""
+        if self.timer is not None:
+            self.timer.stop()
+        # Only this thread may stop its profile
+        profiling.detach('sampler')
+
+    @pyqtSlot(bool)
+    def set_top_users(self, enabled):
+        """Find the largest other users only while their bands are shown, called in the worker thread"""
+        self.top_users = enabled
+        # Replays have no sampler that finds them
+        user_labels = getattr(self.monitor.sampler, 'user_labels', None)
+        if user_labels is not None:
+            user_labels.enabled = enabled
+
+    @pyqtSlot()
+    def wake(self):
+        """Return to the base interval and sample right away, called in the worker thread"""
+        if self.adaptive_interval is None or self.timer is None:
+            return
+        if self.adaptive_interval.interval_ms != self.interval_ms:
+            self.adaptive_interval.reset()
+            self.timer.start(self.interval_ms)
+            self.collect_sample()
+
+    def replay_interval_ms(self):
+        """Return the milliseconds until the next replayed sample is due"""
+        due = self.replay_start + self.monitor.sampler.next_offset() / self.replay_speed
+        return max(0, round((due - time.monotonic()) * 1000))
+
+    def collect_sample(self):
+        timestamp = time.time()
+        start_time = time.monotonic()
+        sample = self.monitor.get_system_usage()
+        duration = time.monotonic() - start_time
+        if self.replay_speed is not None:
+            # Replays keep the times of the recording, however fast they run
+            timestamp = self.monitor.sampler.timestamp
+
+        # Report samples that did not finish within the sampling interval
+        if duration * 1000 > self.interval_ms:
+            self.overrun_count += 1
+            print(strings.WARNING_SAMPLER_OVERRUN.format(duration * 1000, self.interval_ms, self.overrun_count))
+            self.overrun.emit(duration)
+
+        if self.adaptive_interval is not None:
+            self.timer.setInterval(self.adaptive_interval.next_interval(sample, self.hidden))
+        elif self.replay_speed:
+            self.timer.setInterval(self.replay_interval_ms())
+
+        self.sample_ready.emit(sample, timestamp)
+        if self.want_processes:
+            # Read on this thread, right after the sampler updated its process table
+            self.processes_ready.emit(self.monitor.process_rows())
+        profiling.tick('sampler')
+
+class ViewState:
+    """Remembers what was last shown in the window and the tray.
+
+    Setting widget text, stylesheets and icons makes Qt restyle and relayout,
+    so every update first checks here whether the shown value changed.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def changed(self, key, value):
+        """Store `value` for `key` and return True if it differs from the stored one"""
+        if key in self.values and self.values[key] == value:
+            return False
+        self.values[key] = value
+        return True
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class CurveFill(pg.FillBetweenItem):
+    """A FillBetweenItem that rebuilds its path on refresh() instead of on every curve change.
+
+    FillBetweenItem rebuilds its path whenever one of its curves changes, so
+    a fill between two curves that both change every tick was built twice,
+    and fills sharing a curve with a hidden fill built that one too. Here a
+    change only marks the fill stale, refresh() rebuilds it once all curves
+    of the frame have their data, and a hidden fill waits until it is shown.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.stale = False
+        super().__init__(*args, **kwargs)
+
+    def curveChanged(self):
+        self.stale = True
+
+    def setCurves(self, curve1, curve2):
+        # New curves are drawn right away, as by FillBetweenItem
+        super().setCurves(curve1, curve2)
+        self.refresh()
+
+    def refresh(self):
+        if self.stale and self.isVisible():
+            self.stale = False
+            self.updatePath()
+
+    def setVisible(self, visible):
+        super().setVisible(visible)
+        self.refresh()
+
+
+class SystemMonitor(QMainWindow):
+    def __init__(self, backend=None, record=None, replay=None, speed=1.0, burst_rate=None, shared=None):
+        super().__init__()
+        # Last shown label texts, alert and tray color, to skip unchanged updates
+        self.view_state = ViewState()
+        # Tray icons are painted once per color
+        self.tray_icons = {}
+        # Sampler of the running instance when this window is a view of it (--new-view)
+        self.shared = shared
+        self.setWindowTitle(strings.MAIN_WINDOW_TITLE)
+        self.setWindowIcon(QIcon(settings.APP_ICON))  # Set window icon
+        
+        # Setup system tray icon
+        self.setup_system_tray()
+               
+        # Store window size
+        self.window_width = 1000
+        self.window_height = 600
+        
+        # Initialize settings
+        self.settings = QSettings(settings.ORGANIZATION_NAME, settings.APPLICATION_NAME)
+        
+        # Set default geometry (will be overridden by restore_settings if saved settings exist)
+        self.setGeometry(100, 100, self.window_width, self.window_height)
+        
+        # Create toolbar and buttons
+        toolbar = self.addToolBar('Controls')
+        
+        # Add Toggle Legend button
+        self.toggle_button = QAction(strings.TOGGLE_LEGEND_BUTTON, self)
+        self.toggle_button.setCheckable(True)
+        self.toggle_button.setChecked(True)  # Default to legend visible
+        self.toggle_button.triggered.connect(self.toggle_legend)
+        toolbar.addAction(self.toggle_button)
+        
+        # Add Minimal mode button
+        self.minimal_button = QAction(strings.MINIMAL_VIEW_BUTTON, self)
+        self.minimal_button.setCheckable(True)
+        self.minimal_button.setChecked(False)
+        self.minimal_button.triggered.connect(self.toggle_minimal)
+        toolbar.addAction(self.minimal_button)
+        
+        # Add Toggle Other Users button
+        self.toggle_others_button = QAction(strings.TOGGLE_OTHERS_BUTTON, self)
+        self.toggle_others_button.setCheckable(True)
+        self.toggle_others_button.setChecked(False)  # Default to off
+        self.toggle_others_button.triggered.connect(self.toggle_other_users)
+        toolbar.addAction(self.toggle_others_button)
+        
+        # Add Top Users button, splits the other users' area into the largest users
+        self.top_users_button = QAction(strings.TOP_USERS_BUTTON, self)
+        self.top_users_button.setCheckable(True)
+        self.top_users_button.setChecked(False)
+        self.top_users_button.setEnabled(settings.TOP_USERS_COUNT > 0)
+        self.top_users_button.triggered.connect(self.toggle_top_users)
+        toolbar.addAction(self.top_users_button)
+        
+        # Add time window selection
+        self.time_window_combo = QComboBox()
+        for time_window in TIME_WINDOWS:
+            self.time_window_combo.addItem(time_window[0])
+        self.time_window_combo.currentIndexChanged.connect(self.change_time_window)
+        toolbar.addWidget(self.time_window_combo)
+        
+        # Add process view button
+        self.processes_button = QAction(strings.PROCESSES_BUTTON, self)
+        self.processes_button.triggered.connect(self.show_process_dialog)
+        toolbar.addAction(self.processes_button)
+        self.process_dialog = None
+        
+        # Add export button, exports the shown time window on a worker thread
+        self.export_button = QAction(strings.EXPORT_BUTTON, self)
+        self.export_button.triggered.connect(self.show_export_dialog)
+        toolbar.addAction(self.export_button)
+        self.export_notifier = ExportNotifier()
+        self.export_notifier.result.connect(self.on_export_result)
+        
+        # Add spacer to push feedback button to the right
+        spacer = QWidget()
+        spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        toolbar.addWidget(spacer)
+        
+        # Add Feedback button (right-aligned)
+        self.feedback_button = QAction(strings.SEND_FEEDBACK_BUTTON, self)
+        self.feedback_button.triggered.connect(self.show_feedback_dialog)
+        toolbar.addAction(self.feedback_button)
+        
+        # Feedback is sent on a worker thread, results come back through the notifier
+        self.feedback_notifier = FeedbackNotifier()
+        self.feedback_notifier.result.connect(self.on_feedback_result)
+        self.feedback_queue = feedback.FeedbackQueue(self.feedback_notifier.result.emit)
+        # Message, color and expiry (time.monotonic, None for no expiry) of the feedback or export notice
+        self.notice = None
+        if settings.FEEDBACK_EMAIL != "your-email@your-domain.something" and shutil.which('mail'):
+            # Send what an earlier session could not send
+            self.feedback_queue.start()
+        
+        # Create central widget and layout
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+        self.main_layout = QVBoxLayout(self.central_widget)
+        self.main_layout.setSpacing(10)  # Add some spacing between elements
+        
+        # Create charts layout with equal spacing
+        charts_layout = QHBoxLayout()
+        charts_layout.setSpacing(10)  # Add spacing between charts
+        self.main_layout.addLayout(charts_layout)
+        
+        # Create vertical layouts for each chart and its label
+        cpu_layout = QVBoxLayout()
+        mem_layout = QVBoxLayout()
+        charts_layout.addLayout(cpu_layout, stretch=1)  # Add stretch factor
+        charts_layout.addLayout(mem_layout, stretch=1)  # Add stretch factor
+        
+        # Initialize data structures with zeros
+        self.max_points = 60  # 1 minute of data (60 seconds)
+        # The monitor samples usage, checks thresholds and keeps the history.
+        # It also restores the last minute from the long-term history.
+        # A replay takes the place of the sampler and stays out of the long-term history.
+        # A view shows the samples of the running instance, its history is read-only.
+        self.replay = replay
+        self.replay_speed = speed
+        self.monitor = core.UsageMonitor(backend, history_points=self.max_points,
+                                         use_history_store=replay is None,
+                                         sample_source=replay or shared, record_path=record, burst_rate=burst_rate)
+        self.history = self.monitor.history
+        # Tier position the long time windows were last drawn at, to skip unchanged redraws
+        self.drawn_tier_position = None
+        # Envelopes of the long time window shown, rebuilt when it or the chart width changes
+        self.decimator = None
+        # Set once sampling starts, the charts are not drawn while the window is hidden
+        self.sampling_worker = None
+        self.charts_stale = False
+        
+        # Create and setup CPU plot and label
+        self.cpu_plot = self.setup_plot(strings.CPU_PLOT_TITLE, strings.CPU_PLOT_Y_LABEL)
+        self.cpu_label = QLabel('My CPU Usage: 0% (Should not exceed 20%)')
+        self.cpu_label.setStyleSheet('font-size: 14px; font-weight: bold; color: blue;')
+        cpu_layout.addWidget(self.cpu_plot['widget'])
+        cpu_layout.addWidget(self.cpu_label)
+        
+        # Store the full text versions for labels
+        self.cpu_full_text = strings.CPU_LABEL_FULL
+        self.cpu_compact_text = strings.CPU_LABEL_COMPACT
+        
+        # Store total system memory and memory limit
+        self.total_memory = self.monitor.total_memory
+        self.memory_limit = self.monitor.memory_limit
+        self.memory_limit_gb = self.monitor.memory_limit_gb
+        self.max_memory_percent = self.monitor.max_memory_percent
+        
+        # Create and setup Memory plot and label
+        # Titles and labels name the memory metric (RSS, PSS, ...) the sampler measures
+        memory_metric_name = strings.MEMORY_METRIC_NAMES[self.monitor.memory_metric]
+        self.mem_plot_title = strings.MEM_PLOT_TITLE.format(memory_metric_name)
+        self.mem_plot = self.setup_plot(self.mem_plot_title, strings.MEM_PLOT_Y_LABEL)
+        self.mem_label = QLabel(f"{strings.MEM_LABEL_FULL.format(memory_metric_name).format(0, self.max_memory_percent)} ({self.memory_limit_gb:g}GB)")
+        self.mem_label.setStyleSheet('font-size: 14px; font-weight: bold; color: blue;')
+        mem_layout.addWidget(self.mem_plot['widget'])
+        mem_layout.addWidget(self.mem_label)
+        
+        # Add memory limit line if enabled
+        if settings.DRAW_MEMORY_LINE:
+            # Calculate label position based on text width
+            label_text = f'{self.memory_limit_gb:g}GB limit'
+            font_metrics = QFontMetrics(self.mem_plot['widget'].font())
+            label_width = font_metrics.horizontalAdvance(label_text)
+            # Add some padding (20 pixels) to ensure label doesn't touch the edge
+            padding = 0
+            # Calculate position: use plot width estimation or fallback to safe value
+            plot_width = self.window_width // 2  # Half window width for each plot
+            # Position is fraction from 0 to 1, calculate so label ends before right edge
+            label_position = max(0.1, 1.0 - (label_width + padding) / plot_width)
+            
+            memory_limit_line = pg.InfiniteLine(
+                pos=self.max_memory_percent,
+                angle=0,
+                pen=pg.mkPen('k', width=2, style=Qt.DashLine),
+                label=label_text,
+                labelOpts={'position': label_position, 'color': (0, 0, 0), 'fill': (200, 200, 200, 100)}
+            )
+            self.mem_plot['widget'].addItem(memory_limit_line)
+        
+        # Store the full text versions for memory label
+        self.mem_full_text = strings.MEM_LABEL_FULL.format(memory_metric_name) + f" ({self.memory_limit_gb:g}GB)"
+        self.mem_compact_text = strings.MEM_LABEL_COMPACT.format(memory_metric_name)
+        
+        # Get current user ID
+        self.current_user = os.getuid()
+        
+        # Add legend at the bottom
+        legend_layout = QHBoxLayout()
+        self.main_layout.addLayout(legend_layout)
+        
+        # Usage Guidelines on the left
+        guidelines_text = strings.GUIDELINES_TEXT.format(self.memory_limit_gb)
+        guidelines_label = QLabel(guidelines_text)
+        guidelines_label.setStyleSheet('font-size: 12px; background-color: #f0f0f0; padding: 10px; border-radius: 5px;')
+        legend_layout.addWidget(guidelines_label)
+        
+        # Chart Legend on the right
+        legend_text = strings.LEGEND_TEXT
+        legend_label = QLabel(legend_text)
+        legend_label.setStyleSheet('font-size: 12px; background-color: #f0f0f0; padding: 10px; border-radius: 5px;')
+        legend_layout.addWidget(legend_label)
+
+        # Store legend widgets for toggling
+        self.legend_layout = legend_layout
+        self.guidelines_label = guidelines_label
+        self.legend_label = legend_label
+
+        # After all UI elements are created, restore settings
+        self.restore_settings()
+        
+        # Create floating status message label (overlay on top of charts)
+        self.status_message = QLabel(self.central_widget)
+        self.status_message.setAlignment(Qt.AlignCenter)
+        self.status_message.setStyleSheet("font-size: 14px; font-weight: bold; padding: 10px; background-color: rgba(255, 255, 255, 200); border-radius: 5px;")
+        self.status_message.setVisible(False)  # Initially hidden
+        self.view_state.changed('status_visible', False)
+        self.status_message.raise_()  # Ensure it's on top
+        
+        # Position the floating message
+        self.position_status_message()
+        
+        # Debug overlay with the timings of every phase, only with --timings
+        self.timings_overlay = None
+        if instrumentation.enabled:
+            self.timings_overlay = QLabel(self.central_widget)
+            self.timings_overlay.setStyleSheet("font-family: monospace; font-size: 11px; padding: 5px; background-color: rgba(255, 255, 255, 220); border: 1px solid gray;")
+            self.timings_overlay.move(10, 10)
+            self.timings_overlay.raise_()
+            # Refreshed once per second, not per sample, so it barely adds to what it measures
+            self.timings_timer = QTimer(self)
+            self.timings_timer.timeout.connect(self.update_timings_overlay)
+            self.timings_timer.start(1000)
+            QShortcut(QKeySequence(Qt.Key_F12), self, self.toggle_timings_overlay)
+            self.update_timings_overlay()
+        
+        # Draw the restored history right away
+        self.update_charts()
+        
+        # Start collecting samples on a background thread
+        self.setup_sampling()
+
+    def setup_system_tray(self):
+        """Setup system tray icon with green color initially"""
+        # Create system tray icon
+        self.tray_icon = QSystemTrayIcon(self)
+        
+        # Create a menu for the tray icon
+        tray_menu = QMenu()
+        show_action = tray_menu.addAction(strings.TRAY_SHOW)
+        show_action.triggered.connect(self.show)
+        hide_action = tray_menu.addAction(strings.TRAY_HIDE)
+        hide_action.triggered.connect(self.hide)
+        
+        # Add separator
+        tray_menu.addSeparator()
+        
+        quit_action = tray_menu.addAction(strings.TRAY_QUIT)
+        quit_action.triggered.connect(QApplication.instance().quit)
+        
+        # Set the menu for the tray icon
+        self.tray_icon.setContextMenu(tray_menu)
+        
+        # Set initial green icon
+        self.set_tray_icon_color("green")
+        
+        # Show the tray icon, the running instance already shows one for views
+        if self.shared is None:
+            self.tray_icon.show()
+    
+    def set_tray_icon_color(self, color):
+        """Set the system tray icon color"""
+        if not self.view_state.changed('tray_color', color):
+            return
+        icon = self.tray_icons.get(color)
+        if icon is None:
+            # Create a colored icon
+            pixmap = QPixmap(16, 16)
+            pixmap.fill(QColor(color))
+            icon = self.tray_icons[color] = QIcon(pixmap)
+        self.tray_icon.setIcon(icon)
+        
+        # Set tooltip based on color
+        if color == "green":
+            self.tray_icon.setToolTip(strings.TRAY_TOOLTIP_NO_ALERTS)
+        elif color == "orange":
+            self.tray_icon.setToolTip(strings.TRAY_TOOLTIP_WARNING)
+        elif color == "red":
+            self.tray_icon.setToolTip(strings.TRAY_TOOLTIP_ALERT)
+        else:
+            self.tray_icon.setToolTip(strings.TRAY_TOOLTIP_DEFAULT)
+
+    def setup_plot(self, title, ylabel):
+        plot_widget = pg.PlotWidget()
+        
+        # Setup plot
+        plot_widget.setBackground('w')
+        plot_widget.setTitle(title, color='k')
+        plot_widget.setLabel('left', ylabel, color='k')
+        plot_widget.setLabel('bottom', strings.TIME_AXIS_LABEL, color='k')
+        plot_widget.showGrid(x=True, y=True)
+        plot_widget.setYRange(0, 100)
+        
+        # Hide the auto-scale button
+        plot_widget.hideButtons()
+        
+        # Disable mouse interaction (panning, zooming, etc.)
+        plot_widget.setMouseEnabled(x=False, y=False)
+        plot_widget.getViewBox().setMenuEnabled(False)
+        
+        # Set initial X range to the live window in seconds, newest sample at 0
+        plot_widget.setXRange(-TIME_WINDOWS[0][1], 0)
+        
+        # Create curves for the lines
+        user_curve = pg.PlotDataItem(pen=pg.mkPen('b', width=2), name='Current User')
+        others_curve = pg.PlotDataItem(pen=pg.mkPen('r', width=2), name='Other Users')
+        # Zero baseline for the user area, it is never drawn itself
+        zero_curve = pg.PlotCurveItem([-(self.max_points - 1), 0], [0, 0])
+        
+        # Create fill areas for the stacked plot. They are created once and
+        # follow the curves above, so each tick only needs to push new data.
+        user_fill = CurveFill(
+            curve1=user_curve,
+            curve2=zero_curve,
+            brush=pg.mkBrush((0, 0, 255, 100))  # Semi-transparent blue
+        )
+        others_fill = CurveFill(
+            curve1=others_curve,
+            curve2=user_curve,
+            brush=pg.mkBrush((255, 0, 0, 100))  # Semi-transparent red
+        )
+        
+        # Bands of the largest other users, stacked on the user's area. Each
+        # band fills up to the band below it, the red area then starts at the
+        # top band. They stay hidden until the Top Users button is checked.
+        band_curves = []
+        band_fills = []
+        below = user_curve
+        for band in range(settings.TOP_USERS_COUNT):
+            color = TOP_USER_COLORS[band % len(TOP_USER_COLORS)]
+            band_curve = pg.PlotDataItem(pen=pg.mkPen(color, width=1))
+            band_fill = CurveFill(curve1=band_curve, curve2=below, brush=pg.mkBrush((*color, 100)))
+            band_curve.setVisible(False)
+            band_fill.setVisible(False)
+            band_curves.append(band_curve)
+            band_fills.append(band_fill)
+            below = band_curve
+        
+        # Add fill areas and curves to plot
+        plot_widget.addItem(user_fill)
+        plot_widget.addItem(others_fill)
+        for band_fill in band_fills:
+            plot_widget.addItem(band_fill)
+        for band_curve in band_curves:
+            plot_widget.addItem(band_curve)
+        plot_widget.addItem(user_curve)
+        plot_widget.addItem(others_curve)
+        
+        # Band of the min and max of burst sampling around the user's line, only with --burst
+        spike_curves = None
+        if self.monitor.burst_sampler is not None:
+            spike_low_curve = pg.PlotDataItem(pen=None)
+            spike_high_curve = pg.PlotDataItem(pen=pg.mkPen((0, 0, 139), width=1))
+            spike_fill = CurveFill(curve1=spike_high_curve, curve2=spike_low_curve,
+                                   brush=pg.mkBrush((0, 0, 139, 90)))
+            plot_widget.addItem(spike_fill)
+            plot_widget.addItem(spike_low_curve)
+            plot_widget.addItem(spike_high_curve)
+            spike_curves = (spike_low_curve, spike_high_curve, spike_fill)
+        
+        # Add legend
+        plot_widget.addLegend()
+        if spike_curves is not None:
+            plot_widget.plotItem.legend.addItem(spike_curves[1], strings.BURST_BAND_LEGEND.format(0, 0))
+        
+        return {
+            'widget': plot_widget,
+            'user_fill': user_fill,
+            'others_fill': others_fill,
+            'user_curve': user_curve,
+            'others_curve': others_curve,
+            'zero_curve': zero_curve,
+            'band_curves': band_curves,
+            'band_fills': band_fills,
+            'spike_curves': spike_curves,
+        }
+
+    def setup_sampling(self):
+        """Start the background sampling worker"""
+        # Most recent sample, rendered by update_plots
+        self.latest_sample = None
+        self.render_pending = False
+        
+        if self.replay is not None:
+            # Replays are paced by the recorded times divided by the speed, 0 means as fast as
+            # possible. A sample may take the typical recorded interval before it is an overrun.
+            interval_ms = round(self.replay.interval * 1000 / self.replay_speed) if self.replay_speed else 0
+            self.replay_start = time.perf_counter()
+            self.samples_received = 0
+            self.frames_rendered = 0
+            QApplication.instance().aboutToQuit.connect(self.print_replay_summary)
+        else:
+            interval_ms = settings.SAMPLING_INTERVAL_MS
+        
+        self.sampling_thread = QThread()
+        self.sampling_worker = SamplingWorker(self.monitor, interval_ms,
+                                              # Burst sampling shows the spikes of every second
+                                              adaptive=(self.replay is None and settings.ADAPTIVE_SAMPLING and
+                                                        self.monitor.burst_sampler is None),
+                                              top_users=self.top_users_button.isChecked(),
+                                              replay_speed=self.replay_speed if self.replay is not None else None)
+        self.sampling_worker.moveToThread(self.sampling_thread)
+        self.sampling_thread.started.connect(self.sampling_worker.start)
+        self.sampling_worker.sample_ready.connect(self.on_sample_ready)
+        self.sampling_worker.processes_ready.connect(self.on_processes_ready)
+        QApplication.instance().aboutToQuit.connect(self.stop_sampling)
+        QApplication.instance().aboutToQuit.connect(self.monitor.close)
+        self.sampling_thread.start()
+
+    def stop_sampling(self):
+        """Stop the background sampling worker and wait for its thread to finish"""
+        QMetaObject.invokeMethod(self.sampling_worker, 'stop', Qt.BlockingQueuedConnection)
+        self.sampling_thread.quit()
+        self.sampling_thread.wait()
+
+    def on_sample_ready(self, sample, timestamp):
+        """Store a new sample and schedule a render of the latest one"""
+        # Replayed samples come with the time they were recorded at
+        self.monitor.record(sample, timestamp)
+        if self.replay is not None:
+            self.samples_received += 1
+        
+        self.latest_sample = sample
+        if self.is_window_hidden():
+            # Nobody can see the charts, only keep the tray icon up to date
+            self.charts_stale = True
+            self.set_tray_icon_color(self.monitor.alerts.level())
+            return
+        
+        # If samples arrive faster than we can render, only the latest one is drawn
+        if not self.render_pending:
+            self.render_pending = True
+            QTimer.singleShot(0, self.update_plots)
+
+    def print_replay_summary(self):
+        """Print how many replayed samples were received and rendered"""
+        elapsed = time.perf_counter() - self.replay_start
+        print(strings.REPLAY_SUMMARY_GUI.format(self.samples_received, self.frames_rendered, elapsed,
+                                                self.frames_rendered / elapsed if elapsed > 0 else 0.0))
+
+    def update_plot_data(self, plot_dict, user_data, stacked_data, times):
+        # Update line plots, then build the fill areas between them once
+        plot_dict['user_curve'].setData(times, user_data)
+        plot_dict['others_curve'].setData(times, stacked_data)
+        plot_dict['user_fill'].refresh()
+        plot_dict['others_fill'].refresh()
+
+   
+    def update_plots(self):
+        # Render the most recent sample
+        self.render_pending = False
+        if self.replay is not None:
+            self.frames_rendered += 1
+        
+        with instrumentation.phase('labels'):
+            # Show the alerts raised by the alert rules, one line each
+            alert_color, alert_message = self.monitor.alert_state()
+            
+            # Set or clear the alert based on current state
+            if alert_message:
+                self.set_status_message(alert_message, alert_color)
+            elif self.notice is not None and (
+                    self.notice[2] is None or time.monotonic() < self.notice[2]):
+                # Without alerts, the result of sent feedback or an export is shown until it expires
+                self.set_status_message(*self.notice[:2])
+            else:
+                # Clear alert once no alert rule is active
+                self.notice = None
+                self.clear_status_message()
+           
+            # Update labels with current usage based on view mode
+            self.update_labels()
+        
+        # Update both plots for the selected time window
+        with instrumentation.phase('render'):
+            self.update_charts()
+
+    def update_labels(self):
+        """Show the latest usage in the CPU and memory labels"""
+        user_cpu, _, user_mem = (self.latest_sample or (0.0, 0.0, 0.0))[:3]
+        # The legend explains the limits, so the labels are compact while it is shown
+        if self.toggle_button.isChecked():
+            self.set_label_text(self.cpu_label, self.cpu_compact_text.format(user_cpu))
+            self.set_label_text(self.mem_label, self.mem_compact_text.format(user_mem))
+        else:
+            self.set_label_text(self.cpu_label, self.cpu_full_text.format(user_cpu))
+            self.set_label_text(self.mem_label, self.mem_full_text.format(user_mem, self.max_memory_percent))
+
+    def set_label_text(self, label, text):
+        """Set the text of a label, unless it already shows it"""
+        if self.view_state.changed(label, text):
+            label.setText(text)
+
+    def update_charts(self):
+        """Draw the selected time window from the live data or the long-term history"""
+        _, length, tier, unit, _ = TIME_WINDOWS[self.time_window_combo.currentIndex()]
+        
+        if tier is None:
+            # Ordered views of the in-memory history, at their time in seconds
+            # before the newest sample. A stretched interval makes the history
+            # reach back further than the last minute, the view clips it.
+            times = self.history.times
+            # Keep the baseline under the oldest sample, the fill slants to its end otherwise
+            if self.view_state.changed('live_baseline', times[0]):
+                for plot in (self.cpu_plot, self.mem_plot):
+                    plot['zero_curve'].setData([times[0], 0], [0, 0])
+            self.update_plot_data(self.cpu_plot,
+                                  self.history.series('user_cpu'),
+                                  self.history.stacked('cpu'),
+                                  times)
+            
+            self.update_plot_data(self.mem_plot,
+                                  self.history.series('user_mem'),
+                                  self.history.stacked('mem'),
+                                  times)
+            self.update_top_user_bands(times)
+            self.update_spike_bands(times)
+        elif self.monitor.history_store is not None:
+            # Only the live data knows the largest users and the spikes
+            self.update_top_user_bands(None)
+            self.update_spike_bands(None)
+            # One envelope column per pixel column of the charts
+            columns = max(MIN_ENVELOPE_COLUMNS, int(self.cpu_plot['widget'].plotItem.vb.width()))
+            # Rollup tiers only change once per bucket, skip redraws in between
+            position = (tier, columns, self.monitor.history_store.tiers[tier].position())
+            if tier != 'raw' and position == self.drawn_tier_position:
+                return
+            self.drawn_tier_position = position
+            
+            now = time.time()
+            if self.decimator is None or self.drawn_decimator != (tier, columns):
+                self.decimator = decimation.EnvelopeDecimator(length, columns, ENVELOPE_SERIES)
+                self.drawn_decimator = (tier, columns)
+            # Only the records added since the last tick are read and folded in
+            records = self.monitor.history_store.read(tier, since=self.decimator.since(now))
+            # Samples are their own minimum and maximum, rollups keep both. The
+            # stacked bounds of a rollup are the sums of the bounds of the two series.
+            lows, highs = [], []
+            for resource in ('cpu', 'mem'):
+                for bounds, suffix in ((lows, '_min'), (highs, '_max')):
+                    if tier == 'raw':
+                        suffix = ''
+                    user_data = records[f'user_{resource}{suffix}'].astype(np.float64)
+                    bounds.extend((user_data, user_data + records[f'others_{resource}{suffix}']))
+            self.decimator.add(records['timestamp'], lows, highs)
+            
+            times, values = self.decimator.envelope(now, unit)
+            # The history may not cover the whole window, keep the baseline under the data
+            baseline = [times[0], times[-1]] if len(times) else []
+            for plot, resource in ((self.cpu_plot, 'cpu'), (self.mem_plot, 'mem')):
+                plot['zero_curve'].setData(baseline, [0] * len(baseline))
+                self.update_plot_data(plot, values[f'user_{resource}'], values[f'stacked_{resource}'], times)
+
+    def update_timings_overlay(self):
+        """Show the timings of every phase so far in the debug overlay"""
+        if self.view_state.get('timings_hidden'):
+            return
+        text = strings.TIMINGS_OVERLAY_TITLE + '\n' + instrumentation.format_summary()
+        if self.view_state.changed('timings_text', text):
+            self.timings_overlay.setText(text)
+            self.timings_overlay.adjustSize()
+
+    def toggle_timings_overlay(self):
+        hidden = self.timings_overlay.isVisible()
+        self.view_state.changed('timings_hidden', hidden)
+        self.timings_overlay.setVisible(not hidden)
+        if not hidden:
+            self.update_timings_overlay()
+            self.timings_overlay.raise_()
+
+    def update_top_user_bands(self, times):
+        """Draw the bands of the largest other users, or hide them if `times` is None"""
+        labels = []
+        if (times is not None and self.top_users_button.isChecked() and
+                self.toggle_others_button.isChecked()):
+            labels, values = self.monitor.top_users.bands(settings.TOP_USERS_COUNT)
+        
+        for plot, resource in ((self.cpu_plot, 'cpu'), (self.mem_plot, 'mem')):
+            if labels:
+                user_data = self.history.series(f'user_{resource}')
+                # Others are clamped to 100%, keep the bands under them
+                stacked_data = self.history.stacked(resource)
+                for band, band_values in enumerate(values[resource]):
+                    band_values += user_data
+                    np.minimum(band_values, stacked_data, out=band_values)
+                    plot['band_curves'][band].setData(times, band_values)
+                for band_fill in plot['band_fills']:
+                    band_fill.refresh()
+                # The red area may start at the top band
+                plot['others_fill'].refresh()
+            
+            # Showing, hiding and relabeling bands only when the shown users change
+            if not self.view_state.changed(('top_users', resource), labels):
+                continue
+            legend = plot['widget'].plotItem.legend
+            for band, (band_curve, band_fill) in enumerate(zip(plot['band_curves'], plot['band_fills'])):
+                visible = band < len(labels)
+                band_curve.setVisible(visible)
+                band_fill.setVisible(visible)
+                legend.removeItem(band_curve)
+                if visible:
+                    legend.addItem(band_curve, labels[band])
+            # The red area holds everybody else, above the top band
+            plot['others_fill'].setCurves(plot['others_curve'],
+                                          plot['band_curves'][len(labels) - 1] if labels else plot['user_curve'])
+
+    def update_spike_bands(self, times):
+        """Draw the spike bands of burst sampling, or hide them if `times` is None"""
+        if self.monitor.burst_sampler is None:
+            return
+        # The legend reports how often burst sampling reads and what it costs
+        burst_sampler = self.monitor.burst_sampler
+        legend_text = strings.BURST_BAND_LEGEND.format(burst_sampler.measured_rate_hz,
+                                                       burst_sampler.measured_cpu_percent)
+        for plot, resource in ((self.cpu_plot, 'cpu'), (self.mem_plot, 'mem')):
+            spike_low_curve, spike_high_curve, spike_fill = plot['spike_curves']
+            if times is not None:
+                low, high = self.history.band(resource)
+                spike_low_curve.setData(times, low)
+                spike_high_curve.setData(times, high)
+                spike_fill.refresh()
+            if self.view_state.changed(('spikes_visible', resource), times is not None):
+                for item in plot['spike_curves']:
+                    item.setVisible(times is not None)
+            if self.view_state.changed(('spikes_legend', resource), legend_text):
+                plot['widget'].plotItem.legend.getLabel(spike_high_curve).setText(legend_text)
+
+    def change_time_window(self):
+        """Switch the charts to the selected time window"""
+        _, length, _, unit, axis_label = TIME_WINDOWS[self.time_window_combo.currentIndex()]
+        x_min = -length / unit
+        
+        for plot in [self.cpu_plot, self.mem_plot]:
+            plot['widget'].setLabel('bottom', axis_label, color='k')
+            plot['widget'].setXRange(x_min, 0)
+        # The long windows draw their own baseline
+        self.view_state.changed('live_baseline', None)
+        
+        # Redraw right away instead of waiting for the next sample
+        self.drawn_tier_position = None
+        self.decimator = None
+        self.update_charts()
+        
+        # Save the new settings
+        self.save_settings()
+
+    def toggle_legend(self):
+        # Toggle visibility of legend section
+        is_visible = self.toggle_button.isChecked()
+        self.guidelines_label.setVisible(is_visible)
+        self.legend_label.setVisible(is_visible)
+        
+        # Update labels to show compact or full text
+        self.update_labels()
+        
+        # Save the new settings
+        self.save_settings()
+
+    def toggle_minimal(self):
+        is_minimal = self.minimal_button.isChecked()
+        
+        # Enable/disable legend toggle button
+        self.toggle_button.setEnabled(not is_minimal)
+        
+        # Hide/show chart labels and axes
+        for plot in [self.cpu_plot, self.mem_plot]:
+            # Toggle axis labels and grid
+            plot['widget'].showAxis('left', not is_minimal)
+            plot['widget'].showAxis('bottom', not is_minimal)
+            plot['widget'].showGrid(not is_minimal, not is_minimal)
+            # Toggle title and legend
+            if is_minimal:
+                plot['widget'].setTitle('')
+                if plot['widget'].plotItem.legend is not None:
+                    plot['widget'].plotItem.legend.setVisible(False)
+            else:
+                # Restore title and legend
+                if plot == self.cpu_plot:
+                    plot['widget'].setTitle(strings.CPU_PLOT_TITLE)
+                else:
+                    plot['widget'].setTitle(self.mem_plot_title)
+                if plot['widget'].plotItem.legend is not None:
+                    plot['widget'].plotItem.legend.setVisible(True)
+        
+        # Hide chart labels and legend if in minimal mode
+        if is_minimal:
+            self.cpu_label.setVisible(False)
+            self.mem_label.setVisible(False)
+            self.guidelines_label.setVisible(False)
+            self.legend_label.setVisible(False)
+            # Force legend button to unchecked state (no legend in minimal mode)
+            self.toggle_button.setChecked(False)
+        else:
+            # Restore previous legend state
+            is_legend_visible = self.toggle_button.isChecked()
+            self.cpu_label.setVisible(True)
+            self.mem_label.setVisible(True)
+            self.guidelines_label.setVisible(is_legend_visible)
+            self.legend_label.setVisible(is_legend_visible)
+        
+        # Save settings
+        self.save_settings()
+
+    def toggle_other_users(self):
+        """Toggle visibility of other users' data (red graphs)"""
+        show_others = self.toggle_others_button.isChecked()
+        
+        # Show or hide the others' data in both plots
+        for plot in [self.cpu_plot, self.mem_plot]:
+            plot['others_fill'].setVisible(show_others)
+            plot['others_curve'].setVisible(show_others)
+        
+        # The bands of the largest users are part of the others' data
+        self.update_charts()
+        
+        # Save the new settings
+        self.save_settings()
+
+    def toggle_top_users(self):
+        """Toggle the bands of the largest other users"""
+        # The sampler only finds the largest users while their bands are shown
+        QMetaObject.invokeMethod(self.sampling_worker, 'set_top_users', Qt.QueuedConnection,
+                                 Q_ARG(bool, self.top_users_button.isChecked()))
+        # Showing the bands without the other users' area would hide them again
+        if self.top_users_button.isChecked() and not self.toggle_others_button.isChecked():
+            self.toggle_others_button.setChecked(True)
+            self.toggle_other_users()
+        else:
+            self.update_charts()
+            self.save_settings()
+
+    def restore_settings(self):
+        # Restore window geometry
+        geometry = self.settings.value('window_geometry')
+        if geometry:
+            self.restoreGeometry(geometry)
+        else:
+            # Use default geometry if no saved settings
+            self.setGeometry(100, 100, self.window_width, self.window_height)
+        
+        # Restore show legend state (default to True/visible)
+        show_legend = self.settings.value('show_legend', True, type=bool)
+        self.toggle_button.setChecked(show_legend)
+        # Apply the visibility setting
+        self.guidelines_label.setVisible(show_legend)
+        self.legend_label.setVisible(show_legend)
+        
+        # Restore minimal state
+        is_minimal = self.settings.value('minimal_view', False, type=bool)
+        if is_minimal:
+            self.minimal_button.setChecked(True)
+            self.toggle_minimal()  # Apply minimal mode settings
+        
+        # Restore show other users state (default to False/off)
+        show_others = self.settings.value('show_others', False, type=bool)
+        self.toggle_others_button.setChecked(show_others)
+        # Apply the visibility setting
+        for plot in [self.cpu_plot, self.mem_plot]:
+            plot['others_fill'].setVisible(show_others)
+            plot['others_curve'].setVisible(show_others)
+        
+        # Restore the bands of the largest other users (default to off)
+        show_top_users = self.settings.value('show_top_users', False, type=bool)
+        self.top_users_button.setChecked(show_top_users and settings.TOP_USERS_COUNT > 0)
+        
+        # Restore time window (default to the live minute)
+        time_window = self.settings.value('time_window', 0, type=int)
+        if 0 < time_window < len(TIME_WINDOWS):
+            self.time_window_combo.setCurrentIndex(time_window)
+
+    def save_settings(self):
+        # Save window geometry and view states
+        self.settings.setValue('window_geometry', self.saveGeometry())
+        self.settings.setValue('show_legend', self.toggle_button.isChecked())
+        self.settings.setValue('minimal_view', self.minimal_button.isChecked())
+        self.settings.setValue('show_others', self.toggle_others_button.isChecked())
+        self.settings.setValue('show_top_users', self.top_users_button.isChecked())
+        self.settings.setValue('time_window', self.time_window_combo.currentIndex())
+
+    def raise_window(self):
+        """Bring the window to the front, asked for by a later start of the app"""
+        if self.isMinimized():
+            self.setWindowState(self.windowState() & ~Qt.WindowMinimized)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+    def instance_snapshot(self):
+        """Return the latest sample for the windows opened with --new-view"""
+        return sampler.SharedSampler.encode(self.latest_sample or sampler.Sample(0.0, 0.0, 0.0, 0.0),
+                                            self.monitor.memory_metric)
+
+    def is_window_hidden(self):
+        """Return True if the window is hidden to the tray or minimized"""
+        return self.isHidden() or self.isMinimized()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibility_changed()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibility_changed()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.visibility_changed()
+
+    def visibility_changed(self):
+        """Suspend chart work while hidden and catch up when shown again"""
+        if self.sampling_worker is None:
+            return
+        hidden = self.is_window_hidden()
+        self.sampling_worker.hidden = hidden
+        if not hidden:
+            # Sample at the full rate again, the user is looking
+            QMetaObject.invokeMethod(self.sampling_worker, 'wake', Qt.QueuedConnection)
+            if self.charts_stale and self.latest_sample is not None:
+                self.charts_stale = False
+                self.update_plots()
+
+    def closeEvent(self, event):
+        # Save settings when window is closed
+        self.save_settings()
+        super().closeEvent(event)
+
+    def position_status_message(self):
+        """Position the floating status message at the top center of the charts area"""
+        if not hasattr(self, 'status_message'):
+            return
+            
+        # Calculate position: centered horizontally, near the top of central widget
+        margin = 15
+        y_position = margin  # Position at top of central widget with margin
+        
+        # Set width to fit content, but limit to window width - margins
+        self.status_message.adjustSize()
+        max_width = self.central_widget.width() - (2 * margin)
+        if self.status_message.width() > max_width:
+            self.status_message.setFixedWidth(max_width)
+        else:
+            self.status_message.setMaximumWidth(max_width)
+        
+        # Center horizontally within the central widget
+        x_position = (self.central_widget.width() - self.status_message.width()) // 2
+        
+        # Set the position relative to central widget (0,0 is top-left of central widget)
+        self.status_message.move(x_position, y_position)
+
+    def set_status_message(self, message, color="black"):
+        """Set a status message with specified color. Empty message hides the label."""
+        if not message:
+            if self.view_state.changed('status_visible', False):
+                self.status_message.setVisible(False)
+            return
+        
+        # Nothing to do while the same message is shown
+        text_changed = self.view_state.changed('status_text', message)
+        color_changed = self.view_state.changed('status_color', color)
+        if self.view_state.changed('status_visible', True) or text_changed or color_changed:
+            # Set text and color with semi-transparent background
+            if text_changed:
+                self.status_message.setText(message)
+            if color_changed:
+                self.status_message.setStyleSheet(
+                    f"font-size: 14px; font-weight: bold; padding: 10px; "
+                    f"color: {color}; "
+                    f"background-color: rgba(255, 255, 255, 230); "
+                    f"border: 2px solid {color}; "
+                    f"border-radius: 5px;"
+                )
+            
+            # Position and show the message
+            self.position_status_message()
+            self.status_message.setVisible(True)
+            self.status_message.raise_()  # Ensure it's on top
+        
+        # Update tray icon color to match alert color
+        self.set_tray_icon_color(color)
+
+    def clear_status_message(self):
+        """Clear the status message and hide the label."""
+        if self.view_state.changed('status_visible', False):
+            self.status_message.setVisible(False)
+        
+        # Reset tray icon to green
+        self.set_tray_icon_color("green")
+
+    def resizeEvent(self, event):
+        """Handle window resize to reposition floating message if needed."""
+        super().resizeEvent(event)
+        
+        # Reposition the status message if it exists and is visible
+        if hasattr(self, 'status_message') and self.status_message.isVisible():
+            self.position_status_message()
+
+    def show_process_dialog(self):
+        """Show the user's processes, updated with every sample while open"""
+        if self.process_dialog is None:
+            self.process_dialog = process_view.ProcessDialog(
+                strings.MEMORY_METRIC_NAMES[self.monitor.memory_metric], self)
+            self.process_dialog.finished.connect(self.close_process_dialog)
+        self.sampling_worker.want_processes = True
+        self.process_dialog.show()
+        self.process_dialog.raise_()
+        self.process_dialog.activateWindow()
+        # Sample right away instead of waiting for a stretched interval
+        QMetaObject.invokeMethod(self.sampling_worker, 'wake', Qt.QueuedConnection)
+
+    def close_process_dialog(self):
+        self.sampling_worker.want_processes = False
+
+    def on_processes_ready(self, processes):
+        if self.process_dialog is not None and self.process_dialog.isVisible():
+            self.process_dialog.update_processes(*processes)
+
+    def show_feedback_dialog(self):
+        """Show dialog for sending feedback"""
+        # Check if email is still set to default value
+        if settings.FEEDBACK_EMAIL == "your-email@your-domain.something":
+            QMessageBox.warning(
+                self,
+                "Email Not Configured",
+                "The email function needs to be configured in settings.py before you can send feedback.\n\n"
+                "Please update the FEEDBACK_EMAIL setting with a valid email address."
+            )
+            return
+        
+        # Check if mail binary exists
+        if not shutil.which('mail'):
+            QMessageBox.warning(
+                self,
+                "Mail Binary Not Found",
+                "The 'mail' command is not available on this system.\n\n"
+                "Please install a mail client (e.g., mailutils, mailx, or sendmail) to enable the feedback feature."
+            )
+            return
+        
+        dialog = FeedbackDialog(self)
+        result = dialog.exec_()
+        
+        if result == QDialog.Accepted:
+            feedback_text = dialog.feedback_text.toPlainText().strip()
+            attach_app = dialog.app_screenshot_checkbox.isChecked()
+            attach_screen = dialog.screen_screenshot_checkbox.isChecked()
+            
+            if feedback_text:
+                self.send_feedback_email(feedback_text, attach_app, attach_screen)
+            else:
+                self.show_notice(strings.FEEDBACK_EMPTY, "orange")
+    
+    def send_feedback_email(self, message, attach_app=False, attach_screen=False):
+        """Queue feedback for the background mail queue, the result arrives in on_feedback_result"""
+        # Screenshots have to be grabbed on this thread. Grabbing is quick,
+        # encoding them to PNG happens on the queue's worker thread.
+        attachments = []
+        screen = QApplication.primaryScreen()
+        if attach_app:
+            try:
+                image = screen.grabWindow(self.winId()).toImage()
+                attachments.append(('app.png', lambda path, image=image: save_image(image, path),
+                                    strings.FEEDBACK_APP_SCREENSHOT_MSG))
+            except Exception as e:
+                print(strings.ERROR_SCREENSHOT_APP.format(e))
+        if attach_screen:
+            try:
+                image = screen.grabWindow(0).toImage()  # 0 captures entire screen
+                attachments.append(('screen.png', lambda path, image=image: save_image(image, path),
+                                    strings.FEEDBACK_SCREEN_SCREENSHOT_MSG))
+            except Exception as e:
+                print(strings.ERROR_SCREENSHOT_SCREEN.format(e))
+        
+        if not self.feedback_queue.thread.is_alive():
+            self.feedback_queue.start()
+        self.feedback_queue.submit(message, attachments)
+        # Shown until the mail command has finished
+        self.show_notice(strings.FEEDBACK_SENDING, "black", None)
+
+    def on_feedback_result(self, sent, error, retrying):
+        """Show the result of a feedback send, called through FeedbackNotifier"""
+        if sent:
+            self.show_notice(strings.FEEDBACK_SUCCESS, "green")
+        elif retrying:
+            self.show_notice(strings.FEEDBACK_RETRYING, "orange")
+        else:
+            self.show_notice(strings.FEEDBACK_ERROR, "red")
+
+    def show_export_dialog(self):
+        """Ask for a file and export the shown time window to it"""
+        filters = {strings.EXPORT_FILTER_CSV: 'csv', strings.EXPORT_FILTER_COLUMNAR: 'columnar'}
+        name = strings.EXPORT_FILE_NAME.format(time.strftime('%Y%m%d-%H%M')) + export.EXTENSIONS['csv']
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, strings.EXPORT_DIALOG_TITLE, os.path.join(os.path.expanduser('~'), name), ';;'.join(filters))
+        if not path:
+            return
+        file_format = filters.get(selected_filter) or export.format_for_path(path)
+        if not os.path.splitext(path)[1]:
+            path += export.EXTENSIONS[file_format]
+        self.export_window(path, file_format)
+
+    def export_window(self, path, file_format):
+        """Export the shown time window to `path`, the result arrives in on_export_result"""
+        _, length, tier, _, _ = TIME_WINDOWS[self.time_window_combo.currentIndex()]
+        now = time.time()
+        store = self.monitor.history_store
+        if tier is None or store is None:
+            # The live minute, copied here since the history changes every tick
+            records = export.history_records(self.history, length)
+            directory = None
+        else:
+            records = None
+            directory = store.directory
+
+        def run():
+            try:
+                if records is not None:
+                    count = export.write(path, [records], history_store.RAW_DTYPE, file_format)
+                else:
+                    # A store of its own, so closing the monitor's store never pulls the files from under the export
+                    reader = history_store.HistoryStore(directory, read_only=True)
+                    try:
+                        count = export.export_store(reader, tier, path, now - length, now, file_format)
+                    finally:
+                        reader.close()
+            except (OSError, ValueError) as e:
+                print(strings.ERROR_EXPORT.format(e))
+                self.export_notifier.result.emit(0, path, str(e))
+                return
+            self.export_notifier.result.emit(count, path, '')
+
+        # One export at a time
+        self.export_button.setEnabled(False)
+        self.show_notice(strings.EXPORTING.format(path), "black", None)
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_export_result(self, count, path, error):
+        """Show the result of an export, called through ExportNotifier"""
+        self.export_button.setEnabled(True)
+        if error:
+            self.show_notice(strings.ERROR_EXPORT.format(error), "red")
+        else:
+            self.show_notice(strings.EXPORT_DONE.format(count, path), "green")
+
+    def show_notice(self, message, color, seconds=NOTICE_SECONDS):
+        """Show a message for `seconds`, or until replaced if None. Alerts take precedence."""
+        expires = None if seconds is None else time.monotonic() + seconds
+        self.notice = (message, color, expires)
+        if not self.monitor.alerts.active:
+            self.set_status_message(message, color)
+
+
+def save_image(image, path):
+    """Save a QImage as PNG, QImage (unlike QPixmap) can be used outside the GUI thread"""
+    if not image.save(path, 'PNG'):
+        raise OSError(path)
+
+
+class FeedbackNotifier(QObject):
+    """Carries results of the feedback queue from its worker thread to the GUI thread"""
+    result = pyqtSignal(bool, str, bool)
+
+
+class ExportNotifier(QObject):
+    """Carries the result of an export, records and path or an error, from its worker thread to the GUI thread"""
+    result = pyqtSignal(int, str, str)
+
+def main(qt_args=(), backend=None, record=None, replay=None, speed=1.0, burst_rate=None, new_view=False):
+    # One instance per user and display samples the node, replays are left alone
+    instance_path = single_instance.socket_path()
+    instance_lock = None
+    shared = None
+    if not replay:
+        # Held until the process exits
+        instance_lock = single_instance.acquire_lock(instance_path)
+        if instance_lock is None:
+            if new_view or record:
+                # Another window, or a recording, of the samples of the running instance
+                try:
+                    shared = sampler.SharedSampler(instance_path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(strings.WARNING_INSTANCE_UNAVAILABLE.format(instance_path, e))
+            else:
+                try:
+                    single_instance.raise_running(instance_path)
+                    print(strings.INSTANCE_RAISED)
+                    return
+                except OSError as e:
+                    print(strings.WARNING_INSTANCE_UNAVAILABLE.format(instance_path, e))
+    
+    # Create QApplication instance first
+    app = QApplication([sys.argv[0], *qt_args])
+    app.setWindowIcon(QIcon(settings.APP_ICON))  # Set application icon
+    
+    # Set white background and black foreground
+    pg.setConfigOption('background', 'w')
+    pg.setConfigOption('foreground', 'k')
+    
+    if replay:
+        # Loop the recording, the window keeps running after it ends
+        try:
+            replay = recording.ReplaySampler(replay, loop=True)
+        except (OSError, ValueError) as e:
+            print(e)
+            return
+    
+    window = SystemMonitor(backend, record=record, replay=replay, speed=speed, burst_rate=burst_rate,
+                           shared=shared)
+    if instance_lock is not None:
+        # Later starts of the app raise this window or show its samples
+        window.instance_server = single_instance.InstanceServer(instance_path, window.instance_snapshot, window)
+        window.instance_server.raise_requested.connect(window.raise_window)
+    window.show()
+    sys.exit(app.exec_())
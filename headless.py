@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+headless.py - Runs the Simple Usage Monitor without a display.
+
+Streams samples to stdout as JSON lines, or prints a one-shot table.
+With --replay, a recording is replayed instead of sampling and the
+processing cost per tick is printed at the end.
+Only the Qt-free core is used, so this works from batch scripts, cron
+and SSH sessions.
+"""
+
+import getpass
+import json
+import socket
+import sys
+import time
+
+import numpy as np
+
+import core  # Import Qt-free monitoring core
+import instrumentation  # Import per-phase timers
+import recording  # Import sample recordings
+import strings  # Import externalized strings
+
+
+def sample_record(monitor, sample, timestamp):
+    """Return a sample with its alert state as a dictionary"""
+    alert_color, alert_message = monitor.alert_state()
+    record = {
+        'timestamp': round(timestamp, 3),
+        'host': socket.gethostname(),
+        'user': getpass.getuser(),
+    }
+    record.update((name, round(float(value), 2)) for name, value in zip(sample._fields, sample[:4]))
+    record['top_others'] = [{'user': label, 'cpu': round(cpu, 2), 'mem': round(mem, 2)}
+                            for label, cpu, mem in sample.top_others]
+    if sample.burst is not None:
+        record['burst'] = {name: round(value, 2) for name, value in zip(('cpu_min', 'cpu_max', 'mem_min', 'mem_max'),
+                                                                        sample.burst)}
+    record['user_mem_gb'] = round(monitor.memory_gb(sample.user_mem), 2)
+    record['memory_metric'] = monitor.memory_metric
+    record['alert'] = alert_color
+    record['message'] = alert_message
+    record['alerts'] = [alert.rule.name for alert in monitor.alerts.active_alerts()]
+    return record
+
+
+def print_table(record):
+    print(strings.HEADLESS_TABLE_HOST.format(record['host'], record['user']))
+    print(strings.HEADLESS_TABLE_HEADER)
+    print(strings.HEADLESS_TABLE_ROW.format(strings.HEADLESS_TABLE_ME, record['user_cpu'], record['user_mem']))
+    print(strings.HEADLESS_TABLE_ROW.format(strings.HEADLESS_TABLE_OTHERS, record['others_cpu'], record['others_mem']))
+    for top_user in record['top_others']:
+        print(strings.HEADLESS_TABLE_ROW.format(strings.HEADLESS_TABLE_TOP_USER.format(top_user['user']),
+                                                top_user['cpu'], top_user['mem']))
+    print(strings.HEADLESS_TABLE_ALERT.format(record['alert'], record['message']))
+
+
+def print_replay_summary(tick_times, elapsed):
+    """Print the per-tick processing cost of a replay to stderr"""
+    if not len(tick_times):
+        return
+    tick_us = tick_times * 1000000
+    print(strings.REPLAY_SUMMARY.format(len(tick_us), elapsed, tick_us.mean(),
+                                        *np.percentile(tick_us, [50, 95, 99]), tick_us.max()),
+          file=sys.stderr)
+
+
+def run(args):
+    """Sample until interrupted (or `args.count` samples) and write each one to stdout"""
+    try:
+        replay = recording.ReplaySampler(args.replay) if args.replay else None
+    except (OSError, ValueError) as e:
+        print(e)
+        return
+    # Replayed samples must not end up in the long-term history of this node
+    monitor = core.UsageMonitor(backend=args.backend, use_history_store=not (args.no_history or replay),
+                                sample_source=replay, record_path=args.record, burst_rate=args.burst_rate)
+    if replay is not None:
+        # Replays are paced by the recorded times, speed 0 replays as fast as possible
+        interval = 0.0
+        # Processing time of every tick, from taking the sample to writing it out
+        tick_times = np.zeros(len(replay))
+    else:
+        interval = args.interval
+
+    count = 0
+    replay_start = time.perf_counter()
+    try:
+        if replay is None and (args.format == 'table' or args.once):
+            # CPU usage is measured between two samples, so take a first one to measure from
+            monitor.get_system_usage()
+            time.sleep(interval)
+
+        next_sample = time.monotonic()
+        while replay is None or replay.remaining():
+            if replay is not None and args.speed:
+                # Wait until the sample is due, gaps in the recording included
+                time.sleep(max(0.0, replay_start + replay.next_offset() / args.speed - time.perf_counter()))
+            tick_start = time.perf_counter()
+            sample = monitor.get_system_usage()
+            # Replayed samples keep the time they were recorded at
+            timestamp = time.time() if replay is None else replay.timestamp
+            monitor.record(sample, timestamp)
+            record = sample_record(monitor, sample, timestamp)
+
+            if args.format == 'table':
+                print_table(record)
+            elif args.format == 'json':
+                print(json.dumps(record))
+            sys.stdout.flush()
+
+            if replay is not None:
+                tick_times[count] = time.perf_counter() - tick_start
+            count += 1
+            if args.once or args.format == 'table' or (args.count and count >= args.count):
+                break
+            if interval:
+                next_sample += interval
+                time.sleep(max(0.0, next_sample - time.monotonic()))
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        burst_sampler = monitor.burst_sampler
+        monitor.close()
+        if burst_sampler is not None:
+            rate_hz, cpu_percent = burst_sampler.summary()
+            print(strings.BURST_SUMMARY.format(rate_hz, cpu_percent, burst_sampler.budget * 100), file=sys.stderr)
+            if cpu_percent > burst_sampler.budget * 100:
+                print(strings.WARNING_BURST_OVER_BUDGET.format(cpu_percent, burst_sampler.budget * 100),
+                      file=sys.stderr)
+        if replay is not None:
+            print_replay_summary(tick_times[:count], time.perf_counter() - replay_start)
+        if instrumentation.enabled:
+            print(instrumentation.format_summary(), file=sys.stderr)
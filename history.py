@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+history.py - Contains the in-memory usage history of the Simple Usage Monitor application.
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size ring buffer of float columns backed by a preallocated NumPy array.
+
+    Every value is written twice, at position i and i + capacity, so the last
+    `capacity` values of a column are always contiguous in memory and can be
+    returned in order as a view, without copying.
+    """
+
+    def __init__(self, capacity, columns=1, fill=0.0):
+        self.capacity = capacity
+        self.data = np.full((columns, 2 * capacity), fill, dtype=np.float64)
+        # Next position to write, also the position of the oldest value
+        self.index = 0
+
+    def append(self, row):
+        """Append one value per column"""
+        self.data[:, self.index] = row
+        self.data[:, self.index + self.capacity] = row
+        self.index = (self.index + 1) % self.capacity
+
+    def column(self, column):
+        """Return a view of one column, oldest value first"""
+        return self.data[column, self.index:self.index + self.capacity]
+
+
+class UsageHistory:
+    """The last `capacity` usage samples, one column per Sample field.
+
+    The spike band of burst sampling is kept in a second buffer. Samples
+    without a band get one of zero width, at their own values. A third
+    buffer holds the time of every sample, samples are one second apart
+    unless the sampling interval was stretched.
+    """
+
+    COLUMNS = ('user_cpu', 'others_cpu', 'user_mem', 'others_mem')
+    BAND_COLUMNS = ('cpu_min', 'cpu_max', 'mem_min', 'mem_max')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = RingBuffer(capacity, len(self.COLUMNS))
+        self.band_buffer = RingBuffer(capacity, len(self.BAND_COLUMNS))
+        self.timestamp_buffer = RingBuffer(capacity)
+        # Samples appended or restored so far, up to capacity
+        self.count = 0
+        # X values for the charts in seconds, newest sample at 0. Slots
+        # without a sample yet hold zeros, one second apart before the oldest sample.
+        self.times = np.arange(-(capacity - 1), 1, dtype=np.float64)
+        # Preallocated output for the stacked user + others series
+        self.stacked_data = {
+            'cpu': np.zeros(capacity),
+            'mem': np.zeros(capacity),
+        }
+
+    def append(self, sample, timestamp=None):
+        """Append a sample taken at `timestamp`, one second after the previous sample if None"""
+        self.buffer.append(sample[:len(self.COLUMNS)])
+        band = getattr(sample, 'burst', None)
+        if band is None:
+            band = (sample[0], sample[0], sample[2], sample[2])
+        self.band_buffer.append(band)
+        self.append_timestamp(timestamp)
+
+    def append_timestamp(self, timestamp):
+        previous = self.timestamp_buffer.column(0)[-1]
+        if timestamp is None:
+            timestamp = previous + 1.0
+        elif self.count:
+            # After the clock was set back, keep the times in order
+            timestamp = max(timestamp, previous)
+        self.timestamp_buffer.append(timestamp)
+        self.count = min(self.count + 1, self.capacity)
+
+        timestamps = self.timestamp_buffer.column(0)
+        np.subtract(timestamps, timestamps[-1], out=self.times)
+        empty = self.capacity - self.count
+        if empty:
+            self.times[:empty] = self.times[empty] - np.arange(empty, 0, -1)
+
+    def timestamps(self):
+        """Return a view of the times of the samples, oldest first, without the slots that never held one"""
+        return self.timestamp_buffer.column(0)[self.capacity - self.count:]
+
+    def restore(self, records, now):
+        """Append the stored samples of the last `capacity` seconds, at the time they were taken.
+
+        `records` needs a 'timestamp' field and one field per column.
+        """
+        records = records[records['timestamp'] > now - self.capacity][-self.capacity:]
+        for record in records:
+            values = [record[name] for name in self.COLUMNS]
+            self.buffer.append(values)
+            self.band_buffer.append((values[0], values[0], values[2], values[2]))
+            self.append_timestamp(float(record['timestamp']))
+
+    def series(self, name):
+        """Return a view of one series, oldest sample first"""
+        return self.buffer.column(self.COLUMNS.index(name))
+
+    def band(self, resource):
+        """Return views of the spike band (min, max) of 'cpu' or 'mem', oldest sample first"""
+        first = self.BAND_COLUMNS.index(f'{resource}_min')
+        return self.band_buffer.column(first), self.band_buffer.column(first + 1)
+
+    def stacked(self, resource):
+        """Return user + others for 'cpu' or 'mem', computed in place"""
+        out = self.stacked_data[resource]
+        np.add(self.series(f'user_{resource}'), self.series(f'others_{resource}'), out=out)
+        return out
+
+
+class TopUsersHistory:
+    """The largest other users of the last `capacity` samples, for the charts.
+
+    Each sample keeps at most TOP_USERS_COUNT (label, cpu, mem) entries, so
+    the history stays small however many users a node has. The users drawn
+    are the ones using the most over the whole window, so a band does not
+    switch users every time two users swap places.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.samples = deque(maxlen=capacity)
+
+    def append(self, top_others):
+        self.samples.append(top_others)
+
+    def bands(self, count):
+        """Return (labels, {'cpu': array, 'mem': array}), one row per label, oldest sample first.
+
+        Rows are cumulative: row i is the total of the first i + 1 users, so
+        it can be stacked on top of the user's own series as is.
+        """
+        totals = {}
+        for top_others in self.samples:
+            for label, cpu, mem in top_others:
+                totals[label] = totals.get(label, 0.0) + cpu + mem
+        labels = sorted(totals, key=totals.get, reverse=True)[:count]
+        rows = {label: row for row, label in enumerate(labels)}
+
+        values = {
+            'cpu': np.zeros((len(labels), self.capacity)),
+            'mem': np.zeros((len(labels), self.capacity)),
+        }
+        # The newest sample is in the last column
+        first = self.capacity - len(self.samples)
+        for column, top_others in enumerate(self.samples, first):
+            for label, cpu, mem in top_others:
+                row = rows.get(label)
+                if row is not None:
+                    values['cpu'][row, column] = cpu
+                    values['mem'][row, column] = mem
+        for resource in values:
+            np.cumsum(values[resource], axis=0, out=values[resource])
+        return labels, values
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+history_store.py - Contains the on-disk long-term usage history of the Simple Usage Monitor application.
+
+Samples are written to fixed-width binary records in memory-mapped ring
+files, one file per resolution:
+  raw     1 second samples
+  minute  1 minute min/mean/max rollups
+  hour    1 hour min/mean/max rollups
+Each file holds a fixed number of records, so the oldest records are
+overwritten once the retention configured in settings.py is reached.
+"""
+
+import fcntl
+import mmap
+import os
+import socket
+import struct
+
+import numpy as np
+
+import settings  # Import settings
+import strings  # Import externalized strings
+
+SERIES = ('user_cpu', 'others_cpu', 'user_mem', 'others_mem')
+STATISTICS = ('min', 'mean', 'max')
+
+# One raw sample
+RAW_DTYPE = np.dtype([('timestamp', '<f8')] + [(name, '<f4') for name in SERIES])
+# One rollup bucket, the timestamp is the start of the bucket
+ROLLUP_DTYPE = np.dtype([('timestamp', '<f8'), ('count', '<u4')] +
+                        [(f'{name}_{statistic}', '<f4') for name in SERIES for statistic in STATISTICS])
+
+# File header: magic, format version, record size, capacity, next write index, record count
+HEADER = struct.Struct('<4sIIIQQ')
+MAGIC = b'SUMH'
+VERSION = 1
+
+
+class Tier:
+    """A ring of fixed-width records in a memory-mapped file"""
+
+    def __init__(self, path, dtype, capacity, writable=True):
+        self.path = path
+        self.dtype = dtype
+        self.capacity = capacity
+        self.writable = writable
+        self.size = HEADER.size + dtype.itemsize * capacity
+        self.mmap = None
+        self.inode = None
+        self.records = np.zeros(0, dtype=dtype)
+        self.open()
+
+    def open(self):
+        if self.writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if not self.header_matches(fd):
+                    if os.fstat(fd).st_size:
+                        print(strings.WARNING_HISTORY_RESET.format(self.path))
+                    os.close(fd)
+                    # Not closed again below if creating the new file fails
+                    fd = None
+                    fd = self.create()
+                self.mmap = mmap.mmap(fd, self.size)
+            finally:
+                if fd is not None:
+                    os.close(fd)
+        else:
+            # Another instance owns the history, follow its writes read-only
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return
+            try:
+                if self.header_matches(fd):
+                    self.mmap = mmap.mmap(fd, self.size, access=mmap.ACCESS_READ)
+                    self.inode = os.fstat(fd).st_ino
+            finally:
+                os.close(fd)
+
+        if self.mmap is not None:
+            self.records = np.frombuffer(self.mmap, dtype=self.dtype, count=self.capacity, offset=HEADER.size)
+
+    def create(self):
+        """Replace the file with an empty ring and return a descriptor of it.
+
+        Readers may have the old file mapped, truncating it would crash them
+        with SIGBUS, so the new file is written aside and renamed over it.
+        """
+        temporary_path = self.path + '.tmp'
+        fd = os.open(temporary_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, HEADER.pack(MAGIC, VERSION, self.dtype.itemsize, self.capacity, 0, 0), 0)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            os.close(fd)
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return fd
+
+    def reopen(self):
+        """Follow the writer if it created or replaced the file since we opened it"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if self.mmap is not None and inode == self.inode:
+            return
+        # Views handed out before keep the old map alive until they are dropped
+        self.mmap = None
+        self.records = np.zeros(0, dtype=self.dtype)
+        self.open()
+
+    def header_matches(self, fd):
+        data = os.pread(fd, HEADER.size, 0)
+        if len(data) < HEADER.size:
+            return False
+        magic, version, record_size, capacity, _, _ = HEADER.unpack(data)
+        return (magic == MAGIC and version == VERSION and
+                record_size == self.dtype.itemsize and capacity == self.capacity)
+
+    def position(self):
+        """Return (next write index, record count)"""
+        if not self.writable:
+            self.reopen()
+        if self.mmap is None:
+            return 0, 0
+        return HEADER.unpack_from(self.mmap)[4:]
+
+    def __len__(self):
+        return self.position()[1]
+
+    def append(self, record):
+        index, count = self.position()
+        self.records[index] = record
+        HEADER.pack_into(self.mmap, 0, MAGIC, VERSION, self.dtype.itemsize, self.capacity,
+                         (index + 1) % self.capacity, min(count + 1, self.capacity))
+
+    def last(self):
+        """Return the newest record, or None if the tier is empty"""
+        index, count = self.position()
+        if count == 0:
+            return None
+        return self.records[index - 1]
+
+    def parts(self, since=None, until=None):
+        """Return the records from `since` to before `until` as views into the file, oldest first.
+
+        The ring is contiguous up to its write index, so these are one or two views.
+        """
+        index, count = self.position()
+        if count < self.capacity:
+            parts = [self.records[:count]]
+        else:
+            # The ring has wrapped, the oldest record is at the write index
+            parts = [self.records[index:], self.records[:index]]
+        # Timestamps are increasing, so binary search each contiguous part
+        if since is not None:
+            parts = [part[np.searchsorted(part['timestamp'], since):] for part in parts]
+        if until is not None:
+            parts = [part[:np.searchsorted(part['timestamp'], until)] for part in parts]
+        return parts
+
+    def read(self, since=None):
+        """Return the records with a timestamp at or after `since`, oldest first"""
+        return np.concatenate(self.parts(since))
+
+    def read_chunks(self, since=None, until=None, size=65536):
+        """Yield the records from `since` to before `until` in views of up to `size` records.
+
+        Nothing is copied, so any range can be streamed without holding it
+        in memory. A writer may overwrite the oldest records meanwhile, only
+        if the ring wraps around during the read.
+        """
+        for part in self.parts(since, until):
+            for start in range(0, len(part), size):
+                yield part[start:start + size]
+
+    def flush(self):
+        if self.mmap is not None and self.writable:
+            self.mmap.flush()
+
+    def close(self):
+        if self.mmap is not None:
+            self.flush()
+            # Drop our view of the map before closing it
+            self.records = np.zeros(0, dtype=self.dtype)
+            self.mmap.close()
+            self.mmap = None
+
+
+class Rollup:
+    """Accumulates min/mean/max of every series over one bucket of `resolution` seconds"""
+
+    def __init__(self, resolution):
+        self.resolution = resolution
+        self.bucket = None
+        self.count = 0
+        self.mins = [0.0] * len(SERIES)
+        self.sums = [0.0] * len(SERIES)
+        self.maxs = [0.0] * len(SERIES)
+
+    def bucket_of(self, timestamp):
+        return int(timestamp // self.resolution) * self.resolution
+
+    def add(self, mins, means, maxs, count=1):
+        for i in range(len(SERIES)):
+            if self.count == 0:
+                self.mins[i] = mins[i]
+                self.maxs[i] = maxs[i]
+            else:
+                self.mins[i] = min(self.mins[i], mins[i])
+                self.maxs[i] = max(self.maxs[i], maxs[i])
+            self.sums[i] += means[i] * count
+        self.count += count
+
+    def add_record(self, record):
+        """Add a rollup record of a finer resolution"""
+        self.add([record[f'{name}_min'] for name in SERIES],
+                 [record[f'{name}_mean'] for name in SERIES],
+                 [record[f'{name}_max'] for name in SERIES],
+                 int(record['count']))
+
+    def record(self):
+        """Return the bucket as a ROLLUP_DTYPE record"""
+        values = []
+        for i in range(len(SERIES)):
+            values.extend((self.mins[i], self.sums[i] / self.count, self.maxs[i]))
+        return (self.bucket, self.count, *values)
+
+    def reset(self, bucket):
+        self.bucket = bucket
+        self.count = 0
+        self.sums = [0.0] * len(SERIES)
+
+
+class HistoryStore:
+    """Long-term usage history of this node, stored in HISTORY_DIR.
+
+    Only one instance per user and node can write, others open the
+    history read-only and see the samples written by the owner.
+    """
+
+    RESOLUTIONS = {
+        'raw': 1,
+        'minute': 60,
+        'hour': 3600,
+    }
+
+    def __init__(self, directory=None, read_only=False):
+        # Home directories are shared between nodes, so keep one history per node
+        self.directory = directory or os.path.join(os.path.expanduser(settings.HISTORY_DIR),
+                                                   socket.gethostname())
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Readers such as an export never take the lock, the monitor keeps writing
+        self.lock_file = open(os.path.join(self.directory, 'lock'), 'a')
+        self.writable = False
+        if not read_only:
+            try:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.writable = True
+            except OSError:
+                pass
+
+        capacities = {
+            'raw': settings.HISTORY_RAW_HOURS * 3600,
+            'minute': settings.HISTORY_MINUTE_DAYS * 24 * 60,
+            'hour': settings.HISTORY_HOUR_DAYS * 24,
+        }
+        self.tiers = {}
+        for name, capacity in capacities.items():
+            dtype = RAW_DTYPE if name == 'raw' else ROLLUP_DTYPE
+            self.tiers[name] = Tier(os.path.join(self.directory, f'{name}.bin'), dtype, capacity, self.writable)
+
+        self.minute_rollup = Rollup(self.RESOLUTIONS['minute'])
+        self.hour_rollup = Rollup(self.RESOLUTIONS['hour'])
+        if self.writable:
+            self.restore_rollups()
+
+    def restore_rollups(self):
+        """Rebuild the buckets in progress from the finer tiers after a restart"""
+        last = self.tiers['minute'].last()
+        if last is not None:
+            self.hour_rollup.reset(self.hour_rollup.bucket_of(last['timestamp']))
+            for record in self.tiers['minute'].read(since=self.hour_rollup.bucket):
+                self.hour_rollup.add_record(record)
+
+        last = self.tiers['raw'].last()
+        if last is not None:
+            self.minute_rollup.reset(self.minute_rollup.bucket_of(last['timestamp']))
+            for record in self.tiers['raw'].read(since=self.minute_rollup.bucket):
+                values = [record[name] for name in SERIES]
+                self.minute_rollup.add(values, values, values)
+
+    def append(self, timestamp, sample):
+        """Store one sample and roll it up into the minute and hour tiers"""
+        if not self.writable:
+            return
+        # Keep the timestamps in order when the clock steps back, reads search them
+        last = self.tiers['raw'].last()
+        if last is not None:
+            timestamp = max(timestamp, float(last['timestamp']))
+        values = [float(value) for value in sample[:len(SERIES)]]
+        self.tiers['raw'].append((timestamp, *values))
+        # The rollups keep the spikes of burst sampling in the min and max of your usage
+        mins = maxs = values
+        band = getattr(sample, 'burst', None)
+        if band is not None:
+            mins = [band[0], values[1], band[2], values[3]]
+            maxs = [band[1], values[1], band[3], values[3]]
+
+        bucket = self.minute_rollup.bucket_of(timestamp)
+        if bucket > (self.minute_rollup.bucket or 0):
+            if self.minute_rollup.count:
+                minute_record = self.minute_rollup.record()
+                self.tiers['minute'].append(minute_record)
+                self.add_to_hour(np.array(minute_record, dtype=ROLLUP_DTYPE))
+            self.minute_rollup.reset(bucket)
+        self.minute_rollup.add(mins, values, maxs)
+
+    def add_to_hour(self, minute_record):
+        bucket = self.hour_rollup.bucket_of(minute_record['timestamp'])
+        if bucket > (self.hour_rollup.bucket or 0):
+            if self.hour_rollup.count:
+                self.tiers['hour'].append(self.hour_rollup.record())
+            self.hour_rollup.reset(bucket)
+        self.hour_rollup.add_record(minute_record)
+
+    def read(self, tier, since=None):
+        """Return the records of a tier ('raw', 'minute' or 'hour') since a timestamp"""
+        return self.tiers[tier].read(since)
+
+    def read_chunks(self, tier, since=None, until=None, size=65536):
+        """Yield the records of a tier in a time range in chunks, see Tier.read_chunks"""
+        return self.tiers[tier].read_chunks(since, until, size)
+
+    def close(self):
+        for tier in self.tiers.values():
+            tier.close()
+        self.lock_file.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+instrumentation.py - Per-phase timers of the Simple Usage Monitor application.
+
+Every tick is split into phases (taking the sample, reading and parsing
+the process table, folding it into per-user totals, recording it, the
+alert rules, drawing the charts and labels). While enabled, the duration
+of each phase goes into a fixed-size histogram, shown in the debug overlay
+of the app, written to a log file, printed by --headless and served by
+--exporter. While disabled, a phase costs one function call.
+"""
+
+import json
+import os
+import time
+
+import settings  # Import settings
+import strings  # Import externalized strings
+
+# Phases in the order they happen during a tick
+PHASES = {
+    'sample': "Whole sampler call, including the phases below it",
+    'read': "Running top, or reading /proc, cgroup files or the collector",
+    'parse': "Parsing the output of top",
+    'aggregate': "Folding processes into per-user totals",
+    'record': "Appending to the in-memory and long-term history",
+    'alert': "Evaluating the alert rules",
+    'render': "Drawing the charts",
+    'labels': "Showing the alerts and updating the usage labels",
+    'encode': "Encoding the exporter response",
+}
+
+# Bucket i counts durations below 2**i microseconds (and at or above the
+# bucket before it), the last bucket counts everything longer (about 4 s)
+BUCKETS = 24
+BUCKET_BOUNDS = [2 ** i / 1000000 for i in range(BUCKETS)]
+
+enabled = False
+
+
+class PhaseHistogram:
+    """Durations of one phase: a log2 histogram, their count, sum and maximum"""
+    __slots__ = ('counts', 'count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.counts[min(BUCKETS - 1, int(seconds * 1000000).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def copy(self):
+        histogram = PhaseHistogram()
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.max = self.max
+        histogram.last = self.last
+        return histogram
+
+    def percentile(self, fraction, since=None):
+        """Return an estimate of the `fraction` percentile in seconds.
+
+        Durations are assumed to be spread evenly within their bucket. With
+        `since`, an earlier copy of this histogram, only durations added
+        after that copy count.
+        """
+        counts = self.counts if since is None else [a - b for a, b in zip(self.counts, since.counts)]
+        target = fraction * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= target:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS[index] if index < BUCKETS - 1 else self.max
+                return min(self.max, lower + (upper - lower) * (target - seen) / count)
+            seen += count
+        return 0.0
+
+
+histograms = {name: PhaseHistogram() for name in PHASES}
+
+
+class Phase:
+    """Context manager adding the time spent inside it to a histogram"""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.add(time.perf_counter() - self.start)
+
+
+class NullPhase:
+    """Shared stand-in for Phase while timings are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+def phase(name):
+    """Time a phase: `with instrumentation.phase('parse'): ...`"""
+    if not enabled:
+        return NULL_PHASE
+    return Phase(histograms[name])
+
+
+class TimingsLog:
+    """Appends a JSON line with the timings of the last window every `interval` seconds"""
+
+    def __init__(self, path, interval=settings.TIMINGS_LOG_SECONDS):
+        self.path = os.path.expanduser(path)
+        self.interval = interval
+        self.next_write = time.monotonic() + interval
+        self.previous = {name: histogram.copy() for name, histogram in histograms.items()}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def write_if_due(self):
+        if time.monotonic() < self.next_write:
+            return
+        self.next_write += self.interval
+        current = {name: histogram.copy() for name, histogram in histograms.items()}
+        phases = {}
+        for name, histogram in current.items():
+            previous = self.previous[name]
+            count = histogram.count - previous.count
+            if count:
+                phases[name] = {
+                    'count': count,
+                    'mean_us': round((histogram.total - previous.total) / count * 1000000, 1),
+                    'p50_us': round(histogram.percentile(0.5, previous) * 1000000),
+                    'p95_us': round(histogram.percentile(0.95, previous) * 1000000),
+                    'p99_us': round(histogram.percentile(0.99, previous) * 1000000),
+                }
+        self.previous = current
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'timestamp': round(time.time(), 3), 'window_seconds': self.interval,
+                                    'phases': phases}) + '\n')
+        except OSError as e:
+            print(strings.ERROR_TIMINGS_LOG.format(self.path, e))
+
+
+log = None
+
+
+def enable(log_path=settings.TIMINGS_LOG):
+    """Start timing phases, and log them to `log_path` unless it is empty"""
+    global enabled, log
+    enabled = True
+    if log_path:
+        log = TimingsLog(log_path)
+
+
+def tick():
+    """Called once per tick, writes the log when it is due"""
+    if log is not None:
+        log.write_if_due()
+
+
+def summary_rows():
+    """Return (phase, count, mean, p50, p95, max) in microseconds for every phase timed so far"""
+    rows = []
+    for name, histogram in histograms.items():
+        if histogram.count:
+            rows.append((name, histogram.count, histogram.total / histogram.count * 1000000,
+                         histogram.percentile(0.5) * 1000000, histogram.percentile(0.95) * 1000000,
+                         histogram.max * 1000000))
+    return rows
+
+
+def format_summary():
+    """Return the timings so far as a text table"""
+    lines = [strings.TIMINGS_HEADER]
+    lines.extend(strings.TIMINGS_ROW.format(*row) for row in summary_rows())
+    return '\n'.join(lines)
+
+
+def prometheus_lines():
+    """Return the phase histograms in the Prometheus text format"""
+    name = 'simple_usage_monitor_phase_seconds'
+    lines = [f'# HELP {name} Time spent per phase of a sample',
+             f'# TYPE {name} histogram']
+    for phase_name, histogram in histograms.items():
+        # Another thread may be adding to it, count from one copy of the buckets
+        counts = list(histogram.counts)
+        count = sum(counts)
+        if not count:
+            continue
+        cumulative = 0
+        # The last bucket is open-ended, it is the +Inf bucket
+        for bound, bucket_count in zip(BUCKET_BOUNDS[:-1], counts[:-1]):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{phase="{phase_name}",le="{bound!r}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{phase="{phase_name}",le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{phase="{phase_name}"}} {histogram.total!r}')
+        lines.append(f'{name}_count{{phase="{phase_name}"}} {count}')
+    return lines
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+process_view.py - Contains the per-process view of the Simple Usage Monitor application.
+
+Lists the user's own processes with their CPU, memory and runtime, so users
+can see what is using their resources without starting top. Rows come from
+the sampler's process table and are updated in place every sample.
+"""
+
+import bisect
+
+from PyQt5.QtCore import QAbstractItemModel, QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtWidgets import QDialog, QHeaderView, QLabel, QTableView, QVBoxLayout
+
+import strings  # Import externalized strings
+
+# Columns of a row after its key: pid, name, cpu_percent, memory_bytes, start_seconds (since boot)
+COLUMN_PID, COLUMN_NAME, COLUMN_CPU, COLUMN_MEMORY, COLUMN_RUNTIME = range(5)
+
+
+def format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024:
+            return f'{value:.0f} {unit}' if unit == 'B' else f'{value:.1f} {unit}'
+        value /= 1024
+    return f'{value:.1f} TB'
+
+
+def format_runtime(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return strings.PROCESS_RUNTIME_DAYS.format(days, hours, minutes)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+class ProcessTableModel(QAbstractTableModel):
+    """The user's processes, one row each.
+
+    update() diffs the new rows against the current ones by process key and
+    only emits row insertions, removals and dataChanged for rows whose values
+    changed, so views keep their selection and scroll position. Rows store
+    the start time of a process, the runtime is computed when it is shown,
+    so a process that is only getting older does not count as changed.
+
+    The model sorts itself instead of sitting behind a QSortFilterProxyModel,
+    which calls data() for every comparison and takes most of a second to
+    sort thousands of rows. Sorting with a key function takes milliseconds.
+    Between sorts by the user, update() keeps the order by moving only the
+    rows whose values moved them and inserting new rows at their place, a
+    full relayout would remap every persistent index on every sample.
+    """
+
+    def __init__(self, memory_metric_name, parent=None):
+        super().__init__(parent)
+        self.headers = [strings.PROCESS_COLUMN_PID, strings.PROCESS_COLUMN_NAME, strings.PROCESS_COLUMN_CPU,
+                        strings.PROCESS_COLUMN_MEMORY.format(memory_metric_name), strings.PROCESS_COLUMN_RUNTIME]
+        # Process key (pid, starttime) and values of every row
+        self.keys = []
+        self.rows = []
+        # Seconds since boot at the latest update
+        self.uptime = 0.0
+        self.sort_column = COLUMN_CPU
+        self.sort_order = Qt.DescendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == COLUMN_CPU:
+                return f'{value:.1f}'
+            if column == COLUMN_MEMORY:
+                return format_bytes(value)
+            if column == COLUMN_RUNTIME:
+                return format_runtime(max(0.0, self.uptime - value))
+            return str(value) if column == COLUMN_PID else value
+        if role == Qt.TextAlignmentRole and column != COLUMN_NAME:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def update(self, uptime, process_rows):
+        """Apply rows of (key, pid, name, cpu_percent, memory_bytes, start_seconds)"""
+        new_rows = {row[0]: row[1:] for row in process_rows}
+
+        # Remove exited processes, from the bottom up so row numbers stay valid
+        removed = [row for row, key in enumerate(self.keys) if key not in new_rows]
+        for first, last in reversed(list(contiguous_ranges(removed))):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.keys[first:last + 1]
+            del self.rows[first:last + 1]
+            self.endRemoveRows()
+
+        # Update the rows of running processes in place
+        changed = []
+        for row, key in enumerate(self.keys):
+            values = new_rows.pop(key)
+            if values != self.rows[row]:
+                self.rows[row] = values
+                changed.append(row)
+        last_column = len(self.headers) - 1
+        for first, last in contiguous_ranges(changed):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+        # Every process got older
+        if uptime != self.uptime and self.rows:
+            self.uptime = uptime
+            self.dataChanged.emit(self.index(0, COLUMN_RUNTIME), self.index(len(self.rows) - 1, COLUMN_RUNTIME))
+        self.uptime = uptime
+
+        # Keep the sort order, also for new processes
+        self.move_into_order()
+        self.insert_in_order(new_rows)
+
+    def sort_order_key(self):
+        """Return (key function, descending) of the current sort order"""
+        column = self.sort_column
+        # Sorting by start time sorts by runtime, in the opposite order
+        descending = (self.sort_order == Qt.DescendingOrder) != (column == COLUMN_RUNTIME)
+        return (lambda values: values[column]), descending
+
+    def move_into_order(self):
+        """Move the rows that are out of order to their place, one beginMoveRows each"""
+        key, descending = self.sort_order_key()
+        # sorted() is stable, processes with equal values keep their places between updates
+        order = sorted(range(len(self.rows)), key=lambda row: key(self.rows[row]), reverse=descending)
+        targets = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            targets[old_row] = new_row
+        # The longest run of rows already in order stays, every other row moves
+        staying = longest_increasing(targets)
+        ordered_keys = [self.keys[row] for row in order]
+        # Placed in order, so the row before each one is always in its final place already
+        for target in sorted(targets[row] for row in range(len(targets)) if row not in staying):
+            source = self.keys.index(ordered_keys[target])
+            after = self.keys.index(ordered_keys[target - 1]) if target else -1
+            if source == after + 1:
+                continue
+            # The destination is the row the moved one goes in front of, counted before the move
+            self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), after + 1)
+            position = after + 1 if source > after else after
+            self.keys.insert(position, self.keys.pop(source))
+            self.rows.insert(position, self.rows.pop(source))
+            self.endMoveRows()
+
+    def insert_in_order(self, new_rows):
+        """Insert rows of new processes at their place, runs of rows that go to the same place at once"""
+        key, descending = self.sort_order_key()
+        runs = []
+        for row_key, values in sorted(new_rows.items(), key=lambda item: key(item[1]), reverse=descending):
+            # After the rows with equal values
+            low, high = 0, len(self.rows)
+            while low < high:
+                middle = (low + high) // 2
+                other = key(self.rows[middle])
+                if (key(values) > other) if descending else (key(values) < other):
+                    high = middle
+                else:
+                    low = middle + 1
+            if runs and runs[-1][0] == low:
+                runs[-1][1].append((row_key, values))
+            else:
+                runs.append((low, [(row_key, values)]))
+        # From the bottom up, so the places of the runs above stay valid
+        for first, run in reversed(runs):
+            self.beginInsertRows(QModelIndex(), first, first + len(run) - 1)
+            self.keys[first:first] = [row_key for row_key, _ in run]
+            self.rows[first:first] = [values for _, values in run]
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sort the rows, moving only selections and other persistent indexes along"""
+        self.sort_column = column
+        self.sort_order = order
+        key, descending = self.sort_order_key()
+        # sorted() is stable, processes with equal values keep their places between updates
+        order = sorted(range(len(self.rows)), key=lambda row: key(self.rows[row]), reverse=descending)
+        if order == list(range(len(self.rows))):
+            return
+
+        self.layoutAboutToBeChanged.emit([], QAbstractItemModel.VerticalSortHint)
+        new_positions = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            new_positions[old_row] = new_row
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            old_indexes, [self.index(new_positions[index.row()], index.column()) for index in old_indexes])
+        self.keys = [self.keys[row] for row in order]
+        self.rows = [self.rows[row] for row in order]
+        self.layoutChanged.emit([], QAbstractItemModel.VerticalSortHint)
+
+
+def longest_increasing(values):
+    """Return the positions of a longest increasing subsequence of distinct values"""
+    # Position of the smallest last value of an increasing subsequence of every length
+    tails = []
+    tail_values = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        length = bisect.bisect_left(tail_values, value)
+        if length:
+            previous[position] = tails[length - 1]
+        if length == len(tails):
+            tails.append(position)
+            tail_values.append(value)
+        else:
+            tails[length] = position
+            tail_values[length] = value
+    positions = set()
+    position = tails[-1] if tails else -1
+    while position >= 0:
+        positions.add(position)
+        position = previous[position]
+    return positions
+
+
+def contiguous_ranges(rows):
+    """Yield (first, last) for every run of consecutive numbers in a sorted list"""
+    first = previous = None
+    for row in rows:
+        if previous is not None and row == previous + 1:
+            previous = row
+            continue
+        if first is not None:
+            yield first, previous
+        first = previous = row
+    if first is not None:
+        yield first, previous
+
+
+class ProcessDialog(QDialog):
+    """Non-modal window listing the user's processes, sortable by every column"""
+
+    def __init__(self, memory_metric_name, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(strings.PROCESS_DIALOG_TITLE)
+        self.resize(700, 450)
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel(strings.PROCESS_SUMMARY.format(0, 0.0))
+        layout.addWidget(self.summary_label)
+
+        self.model = ProcessTableModel(memory_metric_name, self)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(COLUMN_CPU, Qt.DescendingOrder)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        # Fixed row heights, so updates never resize rows
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(COLUMN_NAME, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+    def update_processes(self, uptime, process_rows):
+        self.model.update(uptime, process_rows)
+        self.summary_label.setText(strings.PROCESS_SUMMARY.format(
+            len(process_rows), sum(row[3] for row in process_rows)))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+profiling.py - Profiling mode of the Simple Usage Monitor application.
+
+With --profile, every thread that samples or draws runs under cProfile and
+tracemalloc records where memory is allocated. Every PROFILE_INTERVAL_SECONDS
+the CPU profile of the last interval and a memory snapshot are written to a
+new directory per session, so growth over a days-long session can be traced
+to the code that allocates. --profile-diff compares two of these files.
+Qt is never imported here.
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import socket
+import threading
+import time
+import tracemalloc
+
+import psutil
+
+import settings  # Import settings
+import strings  # Import externalized strings
+
+
+class Profiler:
+    """Writes per-thread CPU profiles and memory snapshots to a session directory"""
+
+    def __init__(self, directory=None, interval=None):
+        self.interval = interval or settings.PROFILE_INTERVAL_SECONDS
+        base = os.path.expanduser(directory or settings.PROFILE_DIR)
+        self.directory = os.path.join(
+            base, f"{time.strftime('%Y%m%d-%H%M%S')}-{socket.gethostname()}-{os.getpid()}")
+        os.makedirs(self.directory, exist_ok=True)
+        # Label of a thread: [its cProfile.Profile, time of its next dump, the thread's ident]
+        self.profiles = {}
+        self.next_snapshot = time.monotonic() + self.interval
+        self.snapshot_count = 0
+        # Ticks of different threads may both find a snapshot due
+        self.lock = threading.Lock()
+        tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+
+    def path(self, label, extension):
+        self.snapshot_count += 1
+        return os.path.join(self.directory, f"{self.snapshot_count:04d}-{time.strftime('%H%M%S')}-{label}.{extension}")
+
+    def attach(self, label):
+        """Profile the calling thread, cProfile only sees the thread it was enabled in"""
+        profile = cProfile.Profile()
+        self.profiles[label] = [profile, time.monotonic() + self.interval, threading.get_ident()]
+        profile.enable()
+
+    def detach(self, label):
+        """Write and stop the profile of the calling thread, called by a profiled thread before it exits"""
+        entry = self.profiles.pop(label, None)
+        if entry is not None:
+            self.dump_profile(label, entry[0], disable=True)
+
+    def tick(self, label):
+        """Called by a profiled thread once per tick, writes what is due"""
+        now = time.monotonic()
+        entry = self.profiles.get(label)
+        if entry is not None and now >= entry[1]:
+            # Start a new profile, each file covers one interval
+            self.dump_profile(label, entry[0], disable=True)
+            entry[0] = cProfile.Profile()
+            entry[1] = now + self.interval
+            entry[0].enable()
+        if now >= self.next_snapshot:
+            with self.lock:
+                if now >= self.next_snapshot:
+                    self.next_snapshot = now + self.interval
+                    self.dump_memory()
+
+    def dump_profile(self, label, profile, disable):
+        """Write a profile, only its own thread may disable it.
+
+        The profile of a thread that is still running is written as it is
+        so far and keeps running, like dump_stats without create_stats.
+        """
+        if disable:
+            profile.disable()
+        profile.snapshot_stats()
+        with self.lock:
+            path = self.path(label, 'prof')
+        with open(path, 'wb') as f:
+            marshal.dump(profile.stats, f)
+
+    def dump_memory(self, wait=False):
+        """Write a tracemalloc snapshot and a text list of the top allocators.
+
+        Taking the snapshot is quick, grouping tens of thousands of traces by
+        line takes seconds, so that is done on a thread of its own instead of
+        stalling the tick (and showing up in the profile of its thread).
+        """
+        snapshot = filter_snapshot(tracemalloc.take_snapshot())
+        current, peak = tracemalloc.get_traced_memory()
+        header = strings.PROFILE_MEMORY_HEADER.format(psutil.Process().memory_info().rss / 1024 / 1024,
+                                                      current / 1024 / 1024, peak / 1024 / 1024)
+        path = self.path('memory', 'snap')
+        thread = threading.Thread(target=self.write_memory, args=(snapshot, path, header), daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+
+    @staticmethod
+    def write_memory(snapshot, path, header):
+        snapshot.dump(path)
+        lines = [header]
+        for statistic in snapshot.statistics('lineno')[:settings.PROFILE_TOP]:
+            lines.append(str(statistic))
+        with open(path[:-len('.snap')] + '.txt', 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def stop(self):
+        """Write the profiles of the last, partial interval and a final memory snapshot"""
+        # Threads that exited have written their own profile already, see detach
+        for label, (profile, _, ident) in list(self.profiles.items()):
+            self.dump_profile(label, profile, disable=ident == threading.get_ident())
+        self.profiles = {}
+        with self.lock:
+            self.dump_memory(wait=True)
+        tracemalloc.stop()
+
+
+def filter_snapshot(snapshot):
+    """Leave out the memory of tracemalloc and of this module, they would hide the growth of the app"""
+    return snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                   tracemalloc.Filter(False, __file__)))
+
+
+profiler = None
+
+
+def start(directory=None, interval=None):
+    """Start profiling and profile the calling thread as "main" """
+    global profiler
+    profiler = Profiler(directory, interval)
+    profiler.attach('main')
+    print(strings.PROFILE_SESSION.format(profiler.directory, profiler.interval))
+
+
+def attach(label):
+    if profiler is not None:
+        profiler.attach(label)
+
+
+def detach(label):
+    if profiler is not None:
+        profiler.detach(label)
+
+
+def tick(label='main'):
+    if profiler is not None:
+        profiler.tick(label)
+
+
+def stop():
+    global profiler
+    if profiler is not None:
+        profiler.stop()
+        profiler = None
+
+
+def diff(old_path, new_path, top=None):
+    """Print what changed between two memory snapshots (.snap) or two CPU profiles (.prof)"""
+    top = top or settings.PROFILE_TOP
+    if old_path.endswith('.snap') and new_path.endswith('.snap'):
+        # Snapshots of earlier versions include tracemalloc itself
+        old = filter_snapshot(tracemalloc.Snapshot.load(old_path))
+        new = filter_snapshot(tracemalloc.Snapshot.load(new_path))
+        # Largest growth first
+        for statistic in new.compare_to(old, 'lineno')[:top]:
+            print(statistic)
+    elif old_path.endswith('.prof') and new_path.endswith('.prof'):
+        old = pstats.Stats(old_path).stats
+        new = pstats.Stats(new_path).stats
+        rows = []
+        for function in old.keys() | new.keys():
+            _, old_calls, old_total, old_cumulative, _ = old.get(function, (0, 0, 0.0, 0.0, None))
+            _, new_calls, new_total, new_cumulative, _ = new.get(function, (0, 0, 0.0, 0.0, None))
+            rows.append((new_total - old_total, new_cumulative - old_cumulative, new_calls - old_calls,
+                         pstats.func_std_string(function)))
+        # Largest change of own time first, in either direction
+        rows.sort(key=lambda row: abs(row[0]), reverse=True)
+        print(strings.PROFILE_DIFF_HEADER)
+        for row in rows[:top]:
+            print(strings.PROFILE_DIFF_ROW.format(*row))
+    else:
+        raise ValueError(strings.ERROR_PROFILE_DIFF.format(old_path, new_path))
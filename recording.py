@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+recording.py - Records usage samples to a file and replays them for the Simple Usage Monitor application.
+
+A recording is a small header followed by one fixed-width binary record
+per sample, the same record the long-term history stores for raw samples
+(24 bytes). Replaying a recording in place of the sampler reproduces the
+load of a busy node, and its alerts, without the original workload.
+"""
+
+import os
+import statistics
+import struct
+
+import numpy as np
+
+import history_store  # Import the on-disk record format
+import sampler  # Import the Sample type
+import settings  # Import settings
+import strings  # Import externalized strings
+
+RECORD_DTYPE = history_store.RAW_DTYPE
+
+# File header: magic, format version, record size
+HEADER = struct.Struct('<4sII')
+MAGIC = b'SUMR'
+VERSION = 1
+
+# Longest pause between two replayed samples at real time, a suspended
+# laptop or a stopped monitor would otherwise stall a replay for hours
+MAX_GAP_SECONDS = 60.0
+
+
+class RecordingWriter:
+    """Writes samples to a new recording, replacing an existing file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize))
+        self.record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def write(self, timestamp, sample):
+        self.record[0] = (timestamp, *sample[:len(history_store.SERIES)])
+        self.file.write(self.record.tobytes())
+        # One small write per sample, flush so a crash loses at most one sample
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_recording(path):
+    """Return all records of a recording, oldest first"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(strings.ERROR_RECORDING_FORMAT.format(path))
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(strings.ERROR_RECORDING_FORMAT.format(path))
+        # A recording cut off mid-write ends in a partial record, leave it out
+        count = (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD_DTYPE.itemsize
+        return np.fromfile(f, dtype=RECORD_DTYPE, count=count)
+
+
+class ReplaySampler:
+    """Returns the samples of a recording in order, in place of a sampler backend.
+
+    Replays are paced by the recorded time of every sample, next_offset()
+    is when the next one is due after the start of the replay, at real
+    time. Gaps and changes of the interval are replayed as recorded, only
+    gaps longer than MAX_GAP_SECONDS are shortened to that. `interval` is
+    the typical time between recorded samples, a looping replay starts
+    over after it.
+    """
+
+    # The metric of a recording is not stored with it
+    memory_metric = 'replay'
+
+    def __init__(self, path, loop=False):
+        records = read_recording(path)
+        if not len(records):
+            raise ValueError(strings.ERROR_RECORDING_EMPTY.format(path))
+        # Convert once up front, so replaying a sample costs no more than taking one
+        self.samples = [sampler.Sample(*(float(record[name]) for name in history_store.SERIES))
+                        for record in records]
+        self.timestamps = records['timestamp'].tolist()
+        gaps = np.diff(records['timestamp'])
+        if len(records) > 1:
+            self.interval = statistics.median(gaps.tolist())
+        else:
+            self.interval = settings.SAMPLING_INTERVAL_MS / 1000
+        # Seconds from the first sample to every sample, at real time
+        self.offsets = np.concatenate(([0.0], np.cumsum(np.clip(gaps, 0.0, MAX_GAP_SECONDS)))).tolist()
+        self.loop = loop
+        self.index = 0
+        # Offset of the current pass through a looping replay, at real time and as recorded
+        self.loop_offset = 0.0
+        self.loop_time = 0.0
+        # Recorded time of the sample returned last, later passes of a loop follow on the first
+        self.timestamp = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def remaining(self):
+        return len(self.samples) - self.index
+
+    def next_offset(self):
+        """Return the seconds from the start of the replay until the next sample is due, at real time"""
+        if self.index >= len(self.samples):
+            # The first sample of the next pass, or the end of the replay
+            return self.loop_offset + self.offsets[-1] + self.interval
+        return self.loop_offset + self.offsets[self.index]
+
+    def sample(self):
+        if self.index >= len(self.samples):
+            if not self.loop:
+                raise EOFError(strings.ERROR_RECORDING_END)
+            self.loop_offset += self.offsets[-1] + self.interval
+            self.loop_time += self.timestamps[-1] - self.timestamps[0] + self.interval
+            self.index = 0
+        sample = self.samples[self.index]
+        self.timestamp = self.timestamps[self.index] + self.loop_time
+        self.index += 1
+        return sample
@@ -0,0 +1,725 @@
+#!/usr/bin/env python3
+"""
+sampler.py - Contains the sampler backends that collect CPU and memory usage for the Simple Usage Monitor application.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import pwd
+import secrets
+import socket
+import subprocess
+import time
+from collections import namedtuple
+
+import psutil
+
+import instrumentation  # Import per-phase timers
+import settings  # Import settings
+import strings  # Import externalized strings
+
+# One usage sample. CPU values are in percent of the whole node,
+# memory values are in percent of the total system memory.
+# top_others holds (label, cpu, mem) of the largest other users, largest first,
+# see TOP_USERS_COUNT in settings.py. With burst sampling, burst holds the
+# (cpu_min, cpu_max, mem_min, mem_max) of your usage during the sample interval,
+# see burst.py. Recordings and the history keep the first four fields only.
+Sample = namedtuple('Sample', ['user_cpu', 'others_cpu', 'user_mem', 'others_mem', 'top_others', 'burst'],
+                    defaults=((), None))
+
+
+def clamp_percent(value):
+    """Clamp a percentage to the 0-100 range"""
+    return min(100.0, max(0.0, value))
+
+
+class UserLabels:
+    """Names other users in top_others, by user name or anonymized.
+
+    Anonymized labels are a hash of the UID (or user name) with a key drawn
+    at startup, so a user keeps the same label for as long as the monitor
+    runs but the label cannot be traced back to the account.
+
+    `enabled` is whether samples include top_others at all. The app turns it
+    off while the bands of the largest users are hidden, so backends skip
+    the work of finding them.
+    """
+
+    def __init__(self, anonymize=None):
+        self.anonymize = settings.TOP_USERS_ANONYMIZE if anonymize is None else anonymize
+        self.enabled = settings.TOP_USERS_COUNT > 0
+        self.key = secrets.token_bytes(16)
+        # Labels are looked up once per user, user names rarely change
+        self.labels = {}
+
+    def label(self, user):
+        label = self.labels.get(user)
+        if label is None:
+            if self.anonymize:
+                digest = hashlib.blake2s(str(user).encode(), key=self.key, digest_size=3).hexdigest()
+                label = strings.TOP_USER_ANONYMOUS.format(digest)
+            elif isinstance(user, int):
+                try:
+                    label = pwd.getpwuid(user).pw_name
+                except KeyError:
+                    label = str(user)
+            else:
+                label = user
+            self.labels[user] = label
+        return label
+
+    def top_others(self, usage, user, count=None):
+        """Return (label, cpu, mem) of the `count` other users using the most CPU and memory together.
+
+        `usage` maps a UID or user name to (cpu, mem), the totals a backend
+        already built for its sample, so no further scan is needed. Only
+        `count` users are kept while going through it.
+        """
+        count = settings.TOP_USERS_COUNT if count is None else count
+        if count <= 0 or not self.enabled:
+            return ()
+        top = heapq.nlargest(count, ((cpu + mem, other, cpu, mem) for other, (cpu, mem) in usage.items()
+                                     if other != user))
+        return tuple((self.label(other), cpu, mem) for _, other, cpu, mem in top if cpu or mem)
+
+
+class TopSampler:
+    """Legacy backend: runs `top` once per sample and parses its text output.
+
+    Processes are matched by username, so names that `top` truncates with a
+    '+' are counted as other users.
+    """
+
+    memory_metric = 'rss'
+
+    def __init__(self):
+        # Get current user's username
+        self.current_user = os.environ.get('USER', '')
+        # Get CPU count for normalization
+        self.cpu_count = psutil.cpu_count()
+        self.user_labels = UserLabels()
+
+    def sample(self):
+        # Make a single call to top to get all processes
+        cmd = [
+            'top', '-b', '-n', '1',
+            '-o', '+%CPU', # Sort by CPU usage
+            '-w', '512'    # Set wide output to avoid truncation
+        ]
+
+        # Run command and get output
+        with instrumentation.phase('read'):
+            output = subprocess.check_output(cmd, text=True)
+        with instrumentation.phase('parse'):
+            return self.parse(output)
+
+    def parse(self, output):
+        """Return a Sample from the text output of `top -b -n 1`"""
+        # Initialize counters
+        user_cpu = 0.0
+        user_mem = 0.0
+        total_cpu = 0.0
+        total_mem = 0.0
+        # CPU and memory per user, for the largest other users
+        usage = {}
+        # Skip header lines from top output
+        lines = output.strip().split('\n')[7:]
+
+        for line in lines:
+            if line.strip():
+                parts = line.split()
+                if len(parts) >= 10:  # Ensure we have enough columns
+                    try:
+                        # Find CPU and memory values indices
+                        cpu_idx = 8
+                        mem_idx = 9
+                        user_idx = 1  # User column is typically the second column
+
+                        # Find indices by searching for % symbol
+                        for i, part in enumerate(parts):
+                            if '%CPU' in part:
+                                cpu_idx = i
+                            elif '%MEM' in part:
+                                mem_idx = i
+
+                        # Extract CPU, memory, and user values
+                        cpu_val = float(parts[cpu_idx])
+                        mem_val = float(parts[mem_idx])
+                        process_user = parts[user_idx]
+
+                        # Add to total counters
+                        total_cpu += cpu_val
+                        total_mem += mem_val
+
+                        # If this process belongs to current user, add to user counters
+                        if process_user == self.current_user:
+                            user_cpu += cpu_val
+                            user_mem += mem_val
+                        else:
+                            totals = usage.get(process_user)
+                            if totals is None:
+                                totals = usage[process_user] = [0.0, 0.0]
+                            totals[0] += cpu_val
+                            totals[1] += mem_val
+
+                    except (ValueError, IndexError):
+                        # Skip lines that don't have the expected format
+                        pass
+
+        # Calculate others' usage
+        others_cpu = total_cpu - user_cpu
+        others_mem = total_mem - user_mem
+
+        # Normalize CPU usage to 0-100% range
+        # top may show values exceeding 100% for multi-core systems
+        # Normalize them to show proper percentages
+        cpu_scale_factor = 100.0 / (100.0 * self.cpu_count)
+        user_cpu = user_cpu * cpu_scale_factor
+        others_cpu = others_cpu * cpu_scale_factor
+        for totals in usage.values():
+            totals[0] *= cpu_scale_factor
+
+        return Sample(clamp_percent(user_cpu), clamp_percent(others_cpu),
+                      clamp_percent(user_mem), clamp_percent(others_mem),
+                      self.user_labels.top_others(usage, self.current_user))
+
+
+class ProcessEntry:
+    """Last known state of a single process in the ProcessTable"""
+    __slots__ = ('pid', 'starttime', 'uid', 'name', 'cpu_ticks', 'rss_bytes', 'cpu_percent',
+                 'smaps_bytes', 'smaps_rss_bytes', 'smaps_time')
+
+    def __init__(self, pid, starttime, uid, name):
+        self.pid = pid
+        self.starttime = starttime
+        self.uid = uid
+        self.name = name
+        self.cpu_ticks = 0
+        self.rss_bytes = 0
+        self.cpu_percent = 0.0  # Percent of one CPU, like top
+        # Last PSS or USS read by the SmapsCache, the RSS and time at that read.
+        # smaps_bytes is None before the first read and False if it cannot be read.
+        self.smaps_bytes = None
+        self.smaps_rss_bytes = 0
+        self.smaps_time = 0.0
+
+
+class ProcessTable:
+    """Persistent table of all processes, keyed by (pid, starttime).
+
+    Only /proc/[pid]/stat is read for known processes. The owner of a
+    process is looked up once, when its key is first seen. Keying by the
+    start time keeps a reused PID from inheriting the CPU ticks of the
+    process that had it before.
+    """
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.entries = {}
+        # Seconds since boot at the previous update, None before the first update
+        self.previous_uptime = None
+
+    def read_uptime(self):
+        with open(f'{self.proc_root}/uptime', 'rb') as f:
+            return float(f.read().split()[0])
+
+    def read_uid(self, pid):
+        """Return the effective UID of a process, the same user top shows"""
+        with open(f'{self.proc_root}/{pid}/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'Uid:'):
+                    return int(line.split()[2])
+        raise ValueError(pid)
+
+    def update(self):
+        """Refresh all entries and return the seconds elapsed since the previous update"""
+        uptime = self.read_uptime()
+        first_update = self.previous_uptime is None
+        elapsed = 0.0 if first_update else uptime - self.previous_uptime
+        # Processes started after this many ticks since boot are new in this interval
+        interval_start = 0 if first_update else self.previous_uptime * self.clock_ticks
+        cpu_scale_factor = 100.0 / (self.clock_ticks * elapsed) if elapsed > 0 else 0.0
+
+        previous_entries = self.entries
+        entries = {}
+
+        for name in os.listdir(self.proc_root):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f'{self.proc_root}/{name}/stat', 'rb') as f:
+                    data = f.read()
+                # The command name can contain spaces and parentheses,
+                # so the remaining fields start after the last ')'.
+                # fields[0] is field 3 (state) of proc(5).
+                comm_end = data.rindex(b')')
+                fields = data[comm_end + 2:].split()
+                starttime = int(fields[19])
+                key = (int(name), starttime)
+
+                entry = previous_entries.get(key)
+                if entry is None:
+                    # Full parse only for processes we have not seen before
+                    entry = ProcessEntry(key[0], starttime, self.read_uid(name),
+                                         data[data.index(b'(') + 1:comm_end].decode(errors='replace'))
+                    # Without an earlier reading, only a process that started
+                    # during the interval can be charged for all of its ticks
+                    if not first_update and starttime >= interval_start:
+                        previous_ticks = 0
+                    else:
+                        previous_ticks = None
+                else:
+                    previous_ticks = entry.cpu_ticks
+
+                cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+            except (OSError, ValueError, IndexError):
+                # The process exited while we were reading it
+                continue
+
+            if previous_ticks is None:
+                entry.cpu_percent = 0.0
+            else:
+                entry.cpu_percent = max(0, cpu_ticks - previous_ticks) * cpu_scale_factor
+            entry.cpu_ticks = cpu_ticks
+            entry.rss_bytes = int(fields[21]) * self.page_size  # rss in pages
+            entries[key] = entry
+
+        # Exited processes are dropped by not carrying them over
+        self.entries = entries
+        self.previous_uptime = uptime
+        return elapsed
+
+
+class SmapsCache:
+    """PSS or USS of the processes in a ProcessTable, read from /proc/[pid]/smaps_rollup.
+
+    Reading smaps_rollup makes the kernel walk every mapping of a process,
+    far more expensive than reading stat, so each process keeps its last
+    value and only up to SMAPS_BUDGET_MS is spent on reads per update.
+    Large processes and processes whose RSS changed are read again first,
+    small stable ones every SMAPS_MAX_AGE_SECONDS. Between reads a value
+    follows the change of the process's RSS. Processes that cannot be read
+    are counted with their RSS.
+    """
+
+    FIELDS = {
+        'pss': (b'Pss:',),
+        'uss': (b'Private_Clean:', b'Private_Dirty:'),
+    }
+
+    def __init__(self, table, metric):
+        self.table = table
+        self.fields = self.FIELDS[metric]
+        # Only root can read the smaps_rollup of other users' processes
+        self.readable_uid = None if os.geteuid() == 0 else os.geteuid()
+        self.large_bytes = settings.SMAPS_LARGE_MB * 1024 * 1024
+
+    def read(self, pid):
+        """Return the metric of one process in bytes"""
+        total = 0
+        with open(f'{self.table.proc_root}/{pid}/smaps_rollup', 'rb') as f:
+            for line in f:
+                if line.startswith(self.fields):
+                    total += int(line.split()[1]) * 1024  # Values are in kB
+        return total
+
+    def update(self):
+        """Read the processes most in need of a refresh until the time budget is spent"""
+        now = time.monotonic()
+        due = []
+        for entry in self.table.entries.values():
+            if entry.smaps_bytes is False:
+                continue
+            if self.readable_uid is not None and entry.uid != self.readable_uid:
+                entry.smaps_bytes = False
+                continue
+            if entry.smaps_bytes is None:
+                # Never read, most urgent
+                due.append((float('inf'), entry))
+                continue
+            age = now - entry.smaps_time
+            change = abs(entry.rss_bytes - entry.smaps_rss_bytes)
+            if (entry.rss_bytes >= self.large_bytes or age >= settings.SMAPS_MAX_AGE_SECONDS or
+                    change > settings.SMAPS_CHANGE_FRACTION * entry.smaps_rss_bytes):
+                # Bytes of RSS that may have changed since the last read
+                due.append((change + entry.rss_bytes * age / settings.SMAPS_MAX_AGE_SECONDS, entry))
+
+        due.sort(key=lambda item: item[0], reverse=True)
+        deadline = now + settings.SMAPS_BUDGET_MS / 1000
+        for _, entry in due:
+            if time.monotonic() >= deadline:
+                break
+            try:
+                entry.smaps_bytes = self.read(entry.pid)
+            except (OSError, ValueError, IndexError):
+                # Not permitted, or smaps_rollup is not available on this kernel
+                entry.smaps_bytes = False
+                continue
+            entry.smaps_rss_bytes = entry.rss_bytes
+            entry.smaps_time = now
+
+    @staticmethod
+    def memory_bytes(entry):
+        """Return the cached metric of a process, adjusted by the RSS change since it was read"""
+        if entry.smaps_bytes is None or entry.smaps_bytes is False:
+            return entry.rss_bytes
+        return max(0, entry.smaps_bytes + entry.rss_bytes - entry.smaps_rss_bytes)
+
+
+class ProcSampler:
+    """Reads /proc in-process through a ProcessTable, no subprocesses are started.
+
+    Processes are matched by UID, so long usernames are never a problem.
+    CPU usage is computed from CPU tick deltas between samples, the first
+    sample therefore reports 0% CPU. Memory is RSS, or PSS or USS through a
+    SmapsCache, see MEMORY_METRIC in settings.py.
+    """
+
+    def __init__(self, uid=None, proc_root='/proc', memory_metric=None):
+        self.uid = os.getuid() if uid is None else uid
+        self.cpu_count = psutil.cpu_count()
+        self.total_memory = psutil.virtual_memory().total
+        self.table = ProcessTable(proc_root)
+        self.user_labels = UserLabels()
+        self.memory_metric = memory_metric or settings.MEMORY_METRIC
+        if self.memory_metric == 'rss':
+            self.smaps = None
+        elif self.memory_metric in SmapsCache.FIELDS:
+            self.smaps = SmapsCache(self.table, self.memory_metric)
+        else:
+            raise ValueError(strings.ERROR_UNKNOWN_MEMORY_METRIC.format(self.memory_metric))
+
+    def usage_by_uid(self):
+        """Update the process table and return {uid: [cpu_percent, mem_percent]} for every user"""
+        smaps = self.smaps
+        with instrumentation.phase('read'):
+            self.table.update()
+            if smaps is not None:
+                smaps.update()
+
+        with instrumentation.phase('aggregate'):
+            usage = {}
+            for entry in self.table.entries.values():
+                totals = usage.get(entry.uid)
+                if totals is None:
+                    totals = usage[entry.uid] = [0.0, 0]
+                totals[0] += entry.cpu_percent
+                totals[1] += entry.rss_bytes if smaps is None else smaps.memory_bytes(entry)
+
+            # Per-process CPU is in percent of one CPU, normalize to the whole node
+            cpu_scale_factor = 1.0 / self.cpu_count
+            mem_scale_factor = 100.0 / self.total_memory
+            for totals in usage.values():
+                totals[0] *= cpu_scale_factor
+                totals[1] *= mem_scale_factor
+        return usage
+
+    def sample(self):
+        return sample_from_usage(self.usage_by_uid(), self.uid, self.user_labels)
+
+
+class CollectorSampler:
+    """Reads per-UID usage published by a node-wide collector (see collector.py).
+
+    Falls back to sampling locally when no collector is running or its data
+    is stale, and tries the collector again every COLLECTOR_RETRY_SECONDS.
+    """
+
+    def __init__(self, uid=None, socket_path=None):
+        self.uid = os.getuid() if uid is None else uid
+        self.socket_path = socket_path or settings.COLLECTOR_SOCKET
+        self.local_sampler = None
+        self.next_attempt = 0.0
+        self.user_labels = UserLabels()
+        # Memory metric of the collector, or of the local scan without a collector
+        self.memory_metric = settings.MEMORY_METRIC
+
+    def read_collector(self):
+        """Return the latest snapshot published by the collector"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(settings.COLLECTOR_TIMEOUT_SECONDS)
+            client.connect(self.socket_path)
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return json.loads(b''.join(chunks))
+
+    def usage_by_uid(self):
+        """Return the per-UID usage of the collector, or of a local scan without a collector"""
+        now = time.monotonic()
+        if now >= self.next_attempt:
+            try:
+                with instrumentation.phase('read'):
+                    snapshot = self.read_collector()
+                if time.time() - snapshot['timestamp'] > 3 * snapshot['interval']:
+                    raise ValueError(strings.ERROR_COLLECTOR_STALE)
+                self.local_sampler = None
+                self.memory_metric = snapshot.get('memory_metric', 'rss')
+                # JSON object keys are always strings
+                return {int(uid): totals for uid, totals in snapshot['usage'].items()}
+            except (OSError, ValueError, KeyError) as e:
+                if self.local_sampler is None:
+                    print(strings.WARNING_COLLECTOR_UNAVAILABLE.format(self.socket_path, e))
+                self.next_attempt = now + settings.COLLECTOR_RETRY_SECONDS
+
+        if self.local_sampler is None:
+            self.local_sampler = ProcSampler(self.uid)
+            self.memory_metric = self.local_sampler.memory_metric
+        return self.local_sampler.usage_by_uid()
+
+    def sample(self):
+        return sample_from_usage(self.usage_by_uid(), self.uid, self.user_labels)
+
+
+class SharedSampler:
+    """Reads the latest sample of the instance of the app already running for this user and display.
+
+    Windows opened with --new-view show the samples of that instance instead
+    of sampling the node again, see single_instance.py. Falls back to
+    sampling locally when that instance stops answering, and tries it again
+    every INSTANCE_RETRY_SECONDS.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.fallback_sampler = None
+        self.next_attempt = 0.0
+        # The memory metric of the running instance, raises OSError if it does not answer
+        self.memory_metric = json.loads(instance_request(socket_path, INSTANCE_SAMPLE))['memory_metric']
+
+    @staticmethod
+    def encode(sample, memory_metric):
+        """Return a sample as the reply to INSTANCE_SAMPLE"""
+        return json.dumps({
+            'timestamp': time.time(),
+            'memory_metric': memory_metric,
+            'sample': [float(value) for value in sample[:4]],
+            'top_others': sample.top_others,
+            'burst': sample.burst,
+        }).encode()
+
+    def sample(self):
+        now = time.monotonic()
+        if now >= self.next_attempt:
+            try:
+                with instrumentation.phase('read'):
+                    reply = json.loads(instance_request(self.socket_path, INSTANCE_SAMPLE))
+                self.fallback_sampler = None
+                # JSON has no tuples
+                return Sample(*reply['sample'], tuple(tuple(top) for top in reply['top_others']),
+                              tuple(reply['burst']) if reply['burst'] else None)
+            except (OSError, ValueError, KeyError) as e:
+                if self.fallback_sampler is None:
+                    print(strings.WARNING_INSTANCE_UNAVAILABLE.format(self.socket_path, e))
+                self.next_attempt = now + settings.INSTANCE_RETRY_SECONDS
+
+        if self.fallback_sampler is None:
+            self.fallback_sampler = create_sampler()
+        return self.fallback_sampler.sample()
+
+
+def instance_request(socket_path, command):
+    """Send a command to the running instance of the app and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(settings.INSTANCE_TIMEOUT_SECONDS)
+        client.connect(socket_path)
+        client.sendall(command + b'\n')
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+class CgroupSampler:
+    """Reads usage from the systemd user slices in the cgroup v2 hierarchy.
+
+    Reading memory.current and cpu.stat of a slice costs the same no matter
+    how many processes a user runs. Memory is what the cgroup is charged
+    for, which includes page cache, the same number the OOM killer uses.
+    Other users are all top-level cgroups (user.slice, system.slice, ...)
+    minus our own slice. The first sample reports 0% CPU. The largest other
+    users are read from the user slices, one directory with a slice per
+    logged in user, only while user_labels.enabled is set.
+    """
+
+    memory_metric = 'cgroup'
+
+    def __init__(self, uid=None, cgroup_root=None):
+        self.uid = os.getuid() if uid is None else uid
+        self.cgroup_root = cgroup_root or settings.CGROUP_ROOT
+        self.user_slice = user_slice_path(self.uid, self.cgroup_root)
+        self.cpu_count = psutil.cpu_count()
+        self.total_memory = psutil.virtual_memory().total
+
+        # CPU usage in microseconds per cgroup at the previous sample
+        self.previous_usage = {}
+        self.previous_time = None
+        # The same per user slice, for usage_by_uid
+        self.previous_uid_usage = {}
+        self.previous_uid_time = None
+        self.user_labels = UserLabels()
+
+    @staticmethod
+    def is_available(uid=None, cgroup_root=None):
+        """Return True if the user slice exposes the files this backend reads"""
+        path = user_slice_path(os.getuid() if uid is None else uid,
+                               cgroup_root or settings.CGROUP_ROOT)
+        return (os.path.exists(f'{path}/memory.current') and
+                os.path.exists(f'{path}/cpu.stat'))
+
+    @staticmethod
+    def read_cpu_usec(path):
+        with open(f'{path}/cpu.stat', 'rb') as f:
+            for line in f:
+                if line.startswith(b'usage_usec '):
+                    return int(line.split()[1])
+        return 0
+
+    @staticmethod
+    def read_memory(path):
+        with open(f'{path}/memory.current', 'rb') as f:
+            return int(f.read())
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed = 0.0 if self.previous_time is None else now - self.previous_time
+
+        # Top-level cgroups only change when a slice is created or removed,
+        # listing them is cheap compared to walking every process
+        with instrumentation.phase('read'):
+            usage = {}
+            total_memory_used = 0
+            for entry in os.scandir(self.cgroup_root):
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    usage[entry.path] = self.read_cpu_usec(entry.path)
+                    total_memory_used += self.read_memory(entry.path)
+                except (OSError, ValueError):
+                    # Controller not enabled for this cgroup
+                    continue
+            user_usage = self.read_cpu_usec(self.user_slice)
+            user_memory_used = self.read_memory(self.user_slice)
+
+        # CPU microseconds used during the interval, new cgroups start at 0
+        total_delta = 0
+        for path, usec in usage.items():
+            total_delta += max(0, usec - self.previous_usage.get(path, usec))
+        user_delta = max(0, user_usage - self.previous_usage.get(self.user_slice, user_usage))
+
+        usage[self.user_slice] = user_usage
+        self.previous_usage = usage
+        self.previous_time = now
+
+        # Convert microseconds to percent of all CPUs over the elapsed wall time
+        if elapsed > 0:
+            cpu_scale_factor = 100.0 / (1000000 * elapsed * self.cpu_count)
+        else:
+            cpu_scale_factor = 0.0
+        mem_scale_factor = 100.0 / self.total_memory
+
+        top_others = ()
+        if self.user_labels.enabled:
+            # Scans every user slice, only while the bands are shown
+            top_others = self.user_labels.top_others(self.usage_by_uid(), self.uid)
+
+        return Sample(clamp_percent(user_delta * cpu_scale_factor),
+                      clamp_percent((total_delta - user_delta) * cpu_scale_factor),
+                      clamp_percent(user_memory_used * mem_scale_factor),
+                      clamp_percent((total_memory_used - user_memory_used) * mem_scale_factor),
+                      top_others)
+
+    def usage_by_uid(self):
+        """Return {uid: [cpu_percent, mem_percent]} for every user slice"""
+        now = time.monotonic()
+        elapsed = 0.0 if self.previous_uid_time is None else now - self.previous_uid_time
+        if elapsed > 0:
+            cpu_scale_factor = 100.0 / (1000000 * elapsed * self.cpu_count)
+        else:
+            cpu_scale_factor = 0.0
+        mem_scale_factor = 100.0 / self.total_memory
+
+        usage = {}
+        cpu_usec = {}
+        for entry in os.scandir(f'{self.cgroup_root}/user.slice'):
+            if not (entry.name.startswith('user-') and entry.name.endswith('.slice')):
+                continue
+            try:
+                uid = int(entry.name[len('user-'):-len('.slice')])
+                cpu_usec[uid] = self.read_cpu_usec(entry.path)
+                memory_used = self.read_memory(entry.path)
+            except (OSError, ValueError):
+                continue
+            delta = max(0, cpu_usec[uid] - self.previous_uid_usage.get(uid, cpu_usec[uid]))
+            usage[uid] = [delta * cpu_scale_factor, memory_used * mem_scale_factor]
+
+        self.previous_uid_usage = cpu_usec
+        self.previous_uid_time = now
+        return usage
+
+
+def user_slice_path(uid, cgroup_root):
+    """Return the path of the systemd user slice for a UID"""
+    return f'{cgroup_root}/user.slice/user-{uid}.slice'
+
+
+def read_memory_limit(uid=None, cgroup_root=None):
+    """Return the memory.max of the user slice in bytes, or None if there is no limit"""
+    path = user_slice_path(os.getuid() if uid is None else uid,
+                           cgroup_root or settings.CGROUP_ROOT)
+    try:
+        with open(f'{path}/memory.max', 'rb') as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    if value == b'max':
+        return None
+    return int(value)
+
+
+def sample_from_usage(usage, uid, user_labels=None):
+    """Fold per-UID usage into a Sample for one user, the total of everybody else and the largest other users"""
+    user_cpu, user_mem = usage.get(uid, (0.0, 0.0))
+    others_cpu = 0.0
+    others_mem = 0.0
+    for other_uid, (cpu, mem) in usage.items():
+        if other_uid != uid:
+            others_cpu += cpu
+            others_mem += mem
+    top_others = () if user_labels is None else user_labels.top_others(usage, uid)
+    return Sample(clamp_percent(user_cpu), clamp_percent(others_cpu),
+                  clamp_percent(user_mem), clamp_percent(others_mem), top_others)
+
+
+# Commands of the socket of the running instance, see single_instance.py
+INSTANCE_RAISE = b'raise'
+INSTANCE_SAMPLE = b'sample'
+
+# Available sampler backends, selected with settings.SAMPLER_BACKEND
+BACKENDS = {
+    'proc': ProcSampler,
+    'top': TopSampler,
+    'collector': CollectorSampler,
+    'cgroup': CgroupSampler,
+}
+
+
+def create_sampler(backend=None):
+    """Create the sampler backend configured in settings.py"""
+    backend = backend or settings.SAMPLER_BACKEND
+    if backend == 'auto':
+        # Reading the user slice is O(1), fall back to scanning processes
+        backend = 'cgroup' if CgroupSampler.is_available() else 'proc'
+    if backend not in BACKENDS:
+        raise ValueError(strings.ERROR_UNKNOWN_SAMPLER.format(backend))
+    return BACKENDS[backend]()
@@ -6,6 +6,13 @@ settings.py - Contains configuration settings for the Simple Usage Monitor appli
 # Email settings
 # If "mail" is configured in the system, this email will be used to send feedback to.
 FEEDBACK_EMAIL = "your-email@your-domain.something"
+# Feedback is sent in the background. Feedback that could not be sent is kept
+# here and sent again after FEEDBACK_RETRY_SECONDS, doubling after every
+# failed attempt, until FEEDBACK_MAX_ATTEMPTS attempts have failed.
+FEEDBACK_SPOOL_DIR = "~/.local/share/SimpleUsageMonitor/feedback"
+FEEDBACK_SEND_TIMEOUT_SECONDS = 60  # Give up on a mail command that takes longer
+FEEDBACK_RETRY_SECONDS = 300
+FEEDBACK_MAX_ATTEMPTS = 10
 
 # QSettings configuration
 # This is used to store user preferences and settings, it basically 
@@ -22,14 +29,145 @@ MEMORY_MEDIUM_THRESHOLD = 50.0  # Orange alert threshold
 CPU_HIGH_THRESHOLD = 40.0  # Red alert threshold
 CPU_MEDIUM_THRESHOLD = 20.0  # Orange alert threshold 
 
+# Alert rules, built from the thresholds above by default.
+# Every rule watches one metric of your own usage:
+#   metric     "cpu" (% of the node), "memory_percent" (% of the node) or "memory_gb"
+#   aggregate  "last" (latest sample), or "mean", "min" or "max" over the last `window` seconds.
+#              "min" at or above a threshold means the whole window was, e.g. "above 40% for 5 minutes".
+#              Until a window has filled (after startup), missing seconds count as 0 for "mean".
+#   threshold  the alert is raised when the aggregate reaches this value
+#   clear      the alert is cleared once the aggregate drops below this value
+#   level      "orange" or "red"
+#   priority   several alerts can be active at once, higher priorities are listed first
+# Messages for each rule name are in strings.py (ALERT_MESSAGES).
+ALERT_RULES = [
+    {'name': 'memory_high', 'metric': 'memory_gb', 'aggregate': 'last', 'window': 1,
+     'threshold': MEMORY_HIGH_THRESHOLD, 'clear': MEMORY_HIGH_THRESHOLD * 0.95, 'level': 'red', 'priority': 40},
+    {'name': 'cpu_high', 'metric': 'cpu', 'aggregate': 'mean', 'window': 60,
+     'threshold': CPU_HIGH_THRESHOLD, 'clear': CPU_HIGH_THRESHOLD * 0.9, 'level': 'red', 'priority': 30},
+    {'name': 'memory_medium', 'metric': 'memory_gb', 'aggregate': 'last', 'window': 1,
+     'threshold': MEMORY_MEDIUM_THRESHOLD, 'clear': MEMORY_MEDIUM_THRESHOLD * 0.95, 'level': 'orange', 'priority': 20},
+    {'name': 'cpu_medium', 'metric': 'cpu', 'aggregate': 'mean', 'window': 60,
+     'threshold': CPU_MEDIUM_THRESHOLD, 'clear': CPU_MEDIUM_THRESHOLD * 0.9, 'level': 'orange', 'priority': 10},
+]
+
 # System limits
 # If the system has memory limits for users, for example using cgroups,
 # you can set the MEMORY_LIMIT_GB and DRAW_MEMORY_LINE to True to draw a 
 # ine at the memory limit in the memory plot.
+# If the user's systemd slice has a memory.max limit, that limit is used
+# instead of MEMORY_LIMIT_GB.
 # If your system doesn't support cgroups, you still need MEMORY_LIMIT_GB defined
 # to avoid errors. But then set DRAW_MEMORY_LINE to False.
-MEMORY_LIMIT_GB = 100    # Memory limit in GB
+MEMORY_LIMIT_GB = 100    # Memory limit in GB, used when no cgroup limit is found
 DRAW_MEMORY_LINE = True  # Draw a line at the memory limit in the memory plot
 
+# Largest other users
+# The charts can split "Other Users" into bands for the users using the most
+# CPU and memory (toolbar button "Top Users"), the rest stays one red area.
+# Set TOP_USERS_ANONYMIZE = True where site policy does not allow showing
+# other users' names, they are then shown as "user-3fa2c1" instead.
+TOP_USERS_COUNT = 5         # Number of users shown as bands, 0 turns this off
+TOP_USERS_ANONYMIZE = False
+
+# Sampler backend used to collect CPU and memory usage
+# "auto" uses "cgroup" when the user's systemd slice is available, "proc" otherwise.
+# "cgroup" reads the cgroup v2 user slices, its cost does not grow with the number of processes.
+# "proc" reads /proc directly and matches processes by UID.
+# "top" runs the top command every second and matches processes by username.
+# "collector" reads per-user usage from a node-wide collector (collector.py),
+# and samples locally like "proc" while no collector is running.
+SAMPLER_BACKEND = "auto"
+
+# Memory metric of the "proc" and "collector" backends
+# "rss" counts shared pages once for every process that maps them, so users
+# running many MPI ranks or forked workers appear to use far more memory than
+# they do. "pss" splits shared pages between the processes sharing them and
+# "uss" counts private pages only. Both read /proc/[pid]/smaps_rollup, which is
+# expensive, so values are cached per process and refreshed within a time
+# budget per sample. Only root can read other users' smaps_rollup (run the
+# collector as root for PSS of all users), otherwise their RSS is used.
+# The "cgroup" backend always counts each page once.
+MEMORY_METRIC = "rss"
+SMAPS_BUDGET_MS = 50         # Time per sample spent reading smaps_rollup
+SMAPS_LARGE_MB = 1024        # Processes with at least this RSS are refreshed every sample
+SMAPS_CHANGE_FRACTION = 0.1  # Processes whose RSS changed by more than this are refreshed first
+SMAPS_MAX_AGE_SECONDS = 60   # Small stable processes are refreshed this often
+
+# Mount point of the cgroup v2 hierarchy, used by the "cgroup" backend and
+# to read the real memory limit (memory.max) of the user slice
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Node-wide collector
+# Run one "python3 collector.py" per node (e.g. as a systemd service) so the
+# process table is scanned once per interval instead of once per user.
+COLLECTOR_SOCKET = "/run/SimpleUsageMonitor/collector.sock"  # Unix socket the collector publishes on
+COLLECTOR_TIMEOUT_SECONDS = 0.5  # Give up on an unresponsive collector after this long
+COLLECTOR_RETRY_SECONDS = 30     # How often to look for the collector again while sampling locally
+
+# Single instance
+# One instance of the app runs per user and display, starting it again
+# (autostart, a desktop icon, a reconnected desktop) only raises its window.
+# SimpleUsageMonitor.py --new-view opens another window that shows the
+# samples of the running instance instead of sampling the node again.
+INSTANCE_TIMEOUT_SECONDS = 0.5   # Give up on an unresponsive instance after this long
+INSTANCE_STARTUP_SECONDS = 10    # How long to wait for an instance that is still starting
+INSTANCE_RETRY_SECONDS = 30      # How often a view asks the instance again while sampling locally
+
+# Prometheus exporter (SimpleUsageMonitor.py --exporter)
+EXPORTER_LISTEN = "127.0.0.1:9860"  # HOST:PORT, or unix:PATH for a Unix socket
+
+# Sampling interval in milliseconds. Samples are collected on a background
+# thread, a warning is printed when a sample takes longer than this.
+SAMPLING_INTERVAL_MS = 1000
+
+# Adaptive sampling
+# While usage is stable and well below the alert thresholds, the interval
+# doubles after every sample up to the maximum, and returns to
+# SAMPLING_INTERVAL_MS as soon as usage changes or gets close to a threshold.
+ADAPTIVE_SAMPLING = True
+ADAPTIVE_MAX_INTERVAL_MS = 5000          # Longest interval while the window is visible
+ADAPTIVE_HIDDEN_MAX_INTERVAL_MS = 15000  # Longest interval while hidden or minimized
+ADAPTIVE_STABLE_CHANGE = 2.0             # Usage counts as stable if no value moves more than this (percentage points)
+ADAPTIVE_NEAR_THRESHOLD = 0.75           # Fraction of an alert rule's threshold that counts as close to an alert
+
+# Burst sampling (SimpleUsageMonitor.py --burst)
+# Reads your own CPU and memory BURST_RATE_HZ times a second, from your
+# cgroup or the /proc files of your processes, and shows the min and max of
+# every sample interval as a band around your usage, so short bursts and
+# memory spikes stay visible. Burst sampling reads less often whenever it
+# would use more than BURST_CPU_BUDGET_PERCENT of one CPU.
+BURST_SAMPLING = False
+BURST_RATE_HZ = 20                # 1 to 50
+BURST_CPU_BUDGET_PERCENT = 1.0
+BURST_PID_REFRESH_SECONDS = 1.0   # How often new processes are looked for without a cgroup
+
+# Timings (SimpleUsageMonitor.py --timings)
+# Times every phase of a tick (sampling, parsing, alerts, drawing, ...).
+# The app shows them in an overlay (F12 hides it), --headless prints them
+# when it exits and --exporter serves them as a histogram. They are also
+# written to TIMINGS_LOG every TIMINGS_LOG_SECONDS, set it to "" for no log.
+TIMINGS = False
+TIMINGS_LOG = "~/.local/share/SimpleUsageMonitor/timings.log"
+TIMINGS_LOG_SECONDS = 60
+
+# Profiling (SimpleUsageMonitor.py --profile)
+# Runs the app under cProfile and tracemalloc and writes the CPU profile of
+# each thread and a memory snapshot every PROFILE_INTERVAL_SECONDS to a new
+# directory per session in PROFILE_DIR. Compare two of them with
+# SimpleUsageMonitor.py --profile-diff OLD NEW. Profiling slows the app down.
+PROFILE_DIR = "~/.local/share/SimpleUsageMonitor/profiles"
+PROFILE_INTERVAL_SECONDS = 600
+PROFILE_TRACEMALLOC_FRAMES = 10  # Stack frames kept per allocation
+PROFILE_TOP = 25                 # Lines in the top allocator lists and diffs
+
+# Long-term usage history
+# Samples are kept on disk so the charts can show the last hour, day and week,
+# and the last minute is restored on startup. One history is kept per node.
+HISTORY_DIR = "~/.local/share/SimpleUsageMonitor/history"
+HISTORY_RAW_HOURS = 6     # Retention of 1 second samples (24 bytes each)
+HISTORY_MINUTE_DAYS = 7   # Retention of 1 minute min/mean/max rollups (60 bytes each)
+HISTORY_HOUR_DAYS = 90    # Retention of 1 hour min/mean/max rollups (60 bytes each)
+
 # Application resources
 APP_ICON = "icon.png"
\ No newline at end of file
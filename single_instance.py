@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+single_instance.py - Keeps to one running Simple Usage Monitor per user and display.
+
+The first instance holds a lock file and listens on a local socket next to
+it. Starting the app again, from autostart, a desktop icon or after
+reconnecting to the desktop, only asks that instance to raise its window,
+so there is one sampler and one tray icon. Windows opened with --new-view
+read the samples of the running instance over the same socket.
+"""
+
+import fcntl
+import os
+import re
+import tempfile
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer
+
+import sampler  # Import sampler backends and the instance commands
+import settings  # Import settings
+import strings  # Import externalized strings
+
+
+def socket_path():
+    """Return the path of the socket of this user's instance on this display"""
+    display = os.environ.get('WAYLAND_DISPLAY') or os.environ.get('DISPLAY') or 'none'
+    # $XDG_RUNTIME_DIR is private to the user, the temporary directory is not
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', display)
+    return os.path.join(directory, f'{settings.APPLICATION_NAME}-{os.getuid()}-{name}.sock')
+
+
+def acquire_lock(path):
+    """Return the locked lock file of the instance, or None if another instance holds it.
+
+    The lock is released when the process exits, however it exits, so a
+    socket left behind by a crash is never mistaken for a running instance.
+    """
+    lock_file = open(path + '.lock', 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def raise_running(path):
+    """Ask the running instance to raise its window, waiting for it while it is still starting"""
+    deadline = time.monotonic() + settings.INSTANCE_STARTUP_SECONDS
+    while True:
+        try:
+            sampler.instance_request(path, sampler.INSTANCE_RAISE)
+            return
+        except OSError:
+            # The instance holds the lock before it listens
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
+
+
+class InstanceServer(QObject):
+    """Answers later starts of the app on the socket of the running instance.
+
+    `snapshot` returns the latest sample as encoded by SharedSampler.encode,
+    it is only called when a view asks for it.
+    """
+    # Emitted when a later start of the app asks for the window
+    raise_requested = pyqtSignal()
+
+    def __init__(self, path, snapshot, parent=None):
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.server = QLocalServer(self)
+        # Only this user may connect
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+        # We hold the lock, a socket that exists was left behind by a crashed instance
+        QLocalServer.removeServer(path)
+        if not self.server.listen(path):
+            print(strings.ERROR_INSTANCE_LISTEN.format(path, self.server.errorString()))
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda connection=connection: self.on_ready_read(connection))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def on_ready_read(self, connection):
+        if not connection.canReadLine():
+            return
+        command = bytes(connection.readLine()).strip()
+        if command == sampler.INSTANCE_RAISE:
+            self.raise_requested.emit()
+        elif command == sampler.INSTANCE_SAMPLE:
+            connection.write(self.snapshot())
+        # Pending data is written before the connection closes, the client reads until then
+        connection.disconnectFromServer()
+
+    def close(self):
+        self.server.close()
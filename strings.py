@@ -17,6 +17,9 @@ TOGGLE_LEGEND_BUTTON = "Toggle Legend"
 MINIMAL_VIEW_BUTTON = "Minimal"
 TOGGLE_OTHERS_BUTTON = "Toggle Other Users"
 SEND_FEEDBACK_BUTTON = "Send App Feedback/Bug Report"
+PROCESSES_BUTTON = "My Processes"
+EXPORT_BUTTON = "Export"
+TOP_USERS_BUTTON = "Top Users"
 CLEAR_ALERT_BUTTON = "Clear Alert"
 
 # System tray
@@ -32,15 +35,49 @@ TRAY_TOOLTIP_DEFAULT = "Simple Usage Monitor"
 # Plot labels
 CPU_PLOT_TITLE = "CPU Usage - Stacked View"
 CPU_PLOT_Y_LABEL = "Usage (%)"
-MEM_PLOT_TITLE = "Memory Usage - Stacked View"
+MEM_PLOT_TITLE = "Memory Usage ({0}) - Stacked View"
 MEM_PLOT_Y_LABEL = "Usage (%)"
 TIME_AXIS_LABEL = "Time (s)"
+TIME_AXIS_LABEL_MINUTES = "Time (min)"
+TIME_AXIS_LABEL_HOURS = "Time (h)"
+# Label of an anonymized other user, {0} is a hash of the user
+TOP_USER_ANONYMOUS = "user-{0}"
+TIME_AXIS_LABEL_DAYS = "Time (days)"
+# Legend entry of the burst sampling band, with the measured rate and CPU use
+BURST_BAND_LEGEND = "Spikes ({0:.0f} Hz, {1:.1f}% CPU)"
+
+# Chart time windows
+TIME_WINDOW_MINUTE = "Last Minute"
+TIME_WINDOW_HOUR = "Last Hour"
+TIME_WINDOW_DAY = "Last 24 Hours"
+TIME_WINDOW_WEEK = "Last 7 Days"
 
 # Status messages
-STATUS_CPU_HIGH = f"[{{0}}] CPU Usage at or above {settings.CPU_HIGH_THRESHOLD}%"
-STATUS_CPU_MEDIUM = f"[{{0}}] CPU Usage at or above {settings.CPU_MEDIUM_THRESHOLD}%"
-STATUS_MEM_HIGH = "[{0}] Memory consumption at {1} GB"
-STATUS_MEM_MEDIUM = "[{0}] Memory consumption at {1} GB"
+# Alert messages by rule name (see ALERT_RULES in settings.py). Placeholders:
+# {0} time the alert was raised, {1} current value, {2} threshold, {3} window, {4} rule name
+STATUS_CPU_HIGH = "[{0}] CPU Usage at or above {2:g}% over the last {3}"
+STATUS_CPU_MEDIUM = "[{0}] CPU Usage at or above {2:g}% over the last {3}"
+STATUS_MEM_HIGH = "[{0}] Memory consumption at {1:.0f} GB"
+STATUS_MEM_MEDIUM = "[{0}] Memory consumption at {1:.0f} GB"
+ALERT_MESSAGES = {
+    "cpu_high": STATUS_CPU_HIGH,
+    "cpu_medium": STATUS_CPU_MEDIUM,
+    "memory_high": STATUS_MEM_HIGH,
+    "memory_medium": STATUS_MEM_MEDIUM,
+}
+ALERT_MESSAGE_DEFAULT = "[{0}] {4}: {1:.1f} (threshold {2:g})"
+ALERT_WINDOW_SECONDS = "{0} s"
+ALERT_WINDOW_MINUTES = "{0} min"
+
+# Process view
+PROCESS_DIALOG_TITLE = "My Processes"
+PROCESS_SUMMARY = "{0} processes using {1:.1f}% of one CPU"
+PROCESS_COLUMN_PID = "PID"
+PROCESS_COLUMN_NAME = "Command"
+PROCESS_COLUMN_CPU = "CPU % (of one CPU)"
+PROCESS_COLUMN_MEMORY = "Memory ({0})"
+PROCESS_COLUMN_RUNTIME = "Runtime"
+PROCESS_RUNTIME_DAYS = "{0}d {1}:{2:02d}"
 
 # Feedback dialog
 FEEDBACK_INSTRUCTIONS = "Please enter your bug report, feedback or questions for Simple Usage Monitor below:"
@@ -48,9 +85,13 @@ FEEDBACK_ATTACH_APP = "Attach screenshot of SimpleUsageMonitor window"
 FEEDBACK_ATTACH_SCREEN = "Attach screenshot of entire RED desktop"
 FEEDBACK_CANCEL = "Cancel"
 FEEDBACK_SEND = "Send"
+FEEDBACK_SENDING = "Sending your feedback..."
 FEEDBACK_SUCCESS = "Thank you for your feedback!"
 FEEDBACK_EMPTY = "Feedback was empty, not sent."
 FEEDBACK_ERROR = "Error sending feedback. Please try again."
+FEEDBACK_RETRYING = "Your feedback could not be sent yet, it will be sent again later."
+FEEDBACK_EARLIER_SENT = "Sent feedback {0} of an earlier session"
+FEEDBACK_GAVE_UP = "Feedback could not be sent in {0} attempts, it is kept in {1}"
 FEEDBACK_EMAIL_SUBJECT = "SimpleUsageMonitor Feedback from {0} on {1}"
 FEEDBACK_EMAIL_CONTENT = "This is Feedback from user {0} on {1}\n\n{2}"
 FEEDBACK_APP_SCREENSHOT_MSG = "\n\n[Application screenshot attached]"
@@ -58,27 +99,97 @@ FEEDBACK_SCREEN_SCREENSHOT_MSG = "\n\n[Full screen screenshot attached]"
 
 # Error messages
 ERROR_SYSTEM_USAGE = "Error in get_system_usage: {0}"
+ERROR_HISTORY_STORE = "Error opening usage history, long time windows are not available: {0}"
+ERROR_RECORDING_FORMAT = "{0} is not a usage recording"
+ERROR_RECORDING_EMPTY = "Recording {0} contains no samples"
+ERROR_RECORDING_END = "end of recording"
+ERROR_REPLAY_SPEED = "--speed must be between 0 and 1000"
+REPLAY_SUMMARY = "Replayed {0} samples in {1:.2f} s, per tick: mean {2:.1f} us, p50 {3:.1f} us, p95 {4:.1f} us, p99 {5:.1f} us, max {6:.1f} us"
+REPLAY_SUMMARY_GUI = "Replayed {0} samples and rendered {1} frames in {2:.2f} s ({3:.1f} frames/s)"
+WARNING_HISTORY_RESET = "Usage history file {0} has a different format or size, starting a new one"
+ERROR_ALERT_RULE = "Invalid alert rule {0} in settings.py: {1}"
+ERROR_UNKNOWN_MEMORY_METRIC = "Unknown memory metric '{0}', use rss, pss or uss"
+ERROR_UNKNOWN_SAMPLER = "Unknown sampler backend: {0}"
+WARNING_COLLECTOR_UNAVAILABLE = "Collector at {0} not available ({1}), sampling locally"
+ERROR_COLLECTOR_STALE = "collector data is stale"
+ERROR_COLLECTOR_SOCKET_IN_USE = "Another collector is already running on {0}"
+COLLECTOR_LISTENING = "Collector publishing per-user usage on {0} every {1} s"
+ERROR_EXPORTER_SOCKET_IN_USE = "Another process is already listening on {0}"
+EXPORTER_LISTENING = "Exporter serving metrics on {0}, sampling every {1} s"
+ERROR_EXPORTER_BACKEND = "The {0} backend cannot sample per-user usage, use the proc, cgroup or collector backend"
+WARNING_SAMPLER_OVERRUN = "Sampling took {0:.0f} ms, longer than the {1} ms interval ({2} overruns so far)"
 ERROR_SCREENSHOT_APP = "Error capturing app screenshot: {0}"
 ERROR_SCREENSHOT_SCREEN = "Error capturing screen screenshot: {0}"
 ERROR_TEMP_FILE = "Error removing temporary file {0}: {1}"
 ERROR_SEND_FEEDBACK = "Error sending feedback: {0}"
+ERROR_SCREENSHOT_SAVE = "Error saving screenshot {0}: {1}"
+ERROR_MAIL_EXIT = "mail exited with status {0}"
+ERROR_TIMINGS_LOG = "Error writing timings to {0}: {1}"
+INSTANCE_RAISED = "Simple Usage Monitor is already running, its window was raised. Use --new-view for another window."
+WARNING_INSTANCE_UNAVAILABLE = "Running instance at {0} not available ({1}), sampling locally"
+ERROR_INSTANCE_LISTEN = "Error listening on {0}, later starts will open another instance: {1}"
+EXPORT_DONE = "Exported {0} records to {1}"
+EXPORT_DIALOG_TITLE = "Export the Shown Time Window"
+EXPORT_FILTER_CSV = "CSV (*.csv)"
+EXPORT_FILTER_COLUMNAR = "Columnar binary (*.sumc)"
+EXPORT_FILE_NAME = "usage-{0}"
+EXPORTING = "Exporting to {0}..."
+ERROR_EXPORT = "Error exporting history: {0}"
+ERROR_EXPORT_TIME = "Cannot read time '{0}', give a local date and time like 2026-10-18T14:30 or a time ago like 90m, 6h or 7d"
+ERROR_EXPORT_FORMAT = "{0} is not a columnar usage export"
+ERROR_BURST_RATE = "--burst-rate must be between 1 and 50"
+ERROR_BURST_SOURCE = "Error in burst sampling, spikes are not shown: {0}"
+WARNING_BURST_THROTTLED = "Burst sampling at {0} Hz would use more than {1:g}% of one CPU, reading at {2:.1f} Hz"
+BURST_SUMMARY = "Burst sampling: {0:.1f} reads/s, {1:.2f}% of one CPU (budget {2:g}%)"
+WARNING_BURST_OVER_BUDGET = "Burst sampling used {0:.2f}% of one CPU, over its budget of {1:g}%"
+
+# Profiling
+PROFILE_SESSION = "Profiling to {0}, writing snapshots every {1} s"
+PROFILE_MEMORY_HEADER = "RSS {0:.1f} MB, traced {1:.1f} MB, traced peak {2:.1f} MB"
+PROFILE_DIFF_HEADER = f"{'Own s':>10}{'Total s':>10}{'Calls':>10}  Function"
+PROFILE_DIFF_ROW = "{0:>+10.3f}{1:>+10.3f}{2:>+10}  {3}"
+ERROR_PROFILE_DIFF = "Cannot compare {0} and {1}, give two memory snapshots (.snap) or two profiles (.prof)"
+
+# Timings, in microseconds
+TIMINGS_HEADER = f"{'Phase':<10}{'Count':>8}{'Mean':>9}{'p50':>9}{'p95':>9}{'Max':>9}"
+TIMINGS_ROW = "{0:<10}{1:>8}{2:>9.0f}{3:>9.0f}{4:>9.0f}{5:>9.0f}"
+TIMINGS_OVERLAY_TITLE = "Timings (µs, F12 hides)"
+
+# Headless table output
+HEADLESS_TABLE_HOST = "Usage of {1} on {0}"
+HEADLESS_TABLE_HEADER = f"{'':<8}{'CPU %':>8}{'Memory %':>10}"
+HEADLESS_TABLE_ROW = "{0:<8}{1:>8.1f}{2:>10.1f}"
+HEADLESS_TABLE_ME = "Me"
+HEADLESS_TABLE_OTHERS = "Others"
+HEADLESS_TABLE_TOP_USER = "  {0}"
+HEADLESS_TABLE_ALERT = "Alert: {0} {1}"
 
 # CPU and Memory labels
 CPU_LABEL_FULL = f"My CPU Usage: {{0:.1f}}% (Should not exceed {settings.CPU_MEDIUM_THRESHOLD}%)"
 CPU_LABEL_COMPACT = "My CPU Usage: {0:.1f}%"
-MEM_LABEL_FULL = "My Memory Usage: {0:.1f}% (Cannot exceed {1:.1f}%)"
-MEM_LABEL_COMPACT = "My Memory Usage: {0:.1f}%"
+MEM_LABEL_FULL = "My Memory Usage ({0}): {{0:.1f}}% (Cannot exceed {{1:.1f}}%)"
+MEM_LABEL_COMPACT = "My Memory Usage ({0}): {{0:.1f}}%"
+
+# Names of the memory metrics, shown in the memory chart title and label
+MEMORY_METRIC_NAMES = {
+    "rss": "RSS",
+    "pss": "PSS",
+    "uss": "USS",
+    "cgroup": "cgroup",
+    "replay": "recorded",
+}
 
 # Legend text
 GUIDELINES_TEXT = f"""
 <b>Usage Guidelines:</b><br>
 • CPU: Your usage should stay under {settings.CPU_MEDIUM_THRESHOLD}% for extended periods<br>
-• Memory: Your usage cannot exceed the specified limit of {settings.MEMORY_LIMIT_GB}GB<br>
+• Memory: Your usage cannot exceed the specified limit of {{0:g}}GB<br>
 • The stacked view shows both your usage and others' usage combined
 """
 
 LEGEND_TEXT = """
 <b>Chart Legend:</b><br>
 <font color='blue'>■</font> Blue Area: Your usage (your applications)<br>
-<font color='red'>■</font> Red Area: Other users' usage (system & other users)
+<font color='red'>■</font> Red Area: Other users' usage (system & other users)<br>
+Colored bands: The largest other users, shown with the Top Users button
 """ 
\ No newline at end of file
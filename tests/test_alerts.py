@@ -0,0 +1,80 @@
+"""Tests of the rolling windows and the alert rule engine"""
+
+import random
+
+import pytest
+
+import alerts
+
+
+def rule(name='cpu_high', metric='cpu', aggregate='mean', window=60, threshold=80, clear=70, level='red',
+         priority=0):
+    return alerts.AlertRule(name, metric, aggregate, window, threshold, clear, level, priority)
+
+
+def metrics(cpu=0.0, memory_gb=0.0):
+    return {'cpu': cpu, 'memory_percent': 0.0, 'memory_gb': memory_gb}
+
+
+def test_stretched_samples_fill_their_seconds():
+    engine = alerts.AlertEngine([rule()])
+    # Four samples 15 s apart cover the 60 s window
+    for timestamp in (1000.0, 1015.0, 1030.0, 1045.0, 1060.0):
+        engine.update(metrics(cpu=100.0), timestamp)
+    assert [alert.rule.name for alert in engine.active_alerts()] == ['cpu_high']
+
+    # The window forgets after 60 s, not after 60 samples
+    for timestamp in (1075.0, 1090.0, 1105.0, 1120.0):
+        engine.update(metrics(cpu=0.0), timestamp)
+    assert engine.active_alerts() == []
+
+
+def test_rolling_window_matches_brute_force():
+    rng = random.Random(0)
+    window = alerts.RollingWindow(7)
+    values = []
+    for _ in range(500):
+        value = rng.choice((rng.uniform(0, 100), 50.0))
+        window.push(value)
+        values.append(value)
+        last = values[-7:]
+        assert window.aggregate('last') == value
+        assert window.aggregate('min') == min(last)
+        assert window.aggregate('max') == max(last)
+        # Seconds before the first sample count as 0
+        assert window.aggregate('mean') == pytest.approx(sum(last) / 7)
+        assert window.full() == (len(values) >= 7)
+
+
+def test_hysteresis_keeps_alert_until_below_clear():
+    engine = alerts.AlertEngine([rule(aggregate='last', window=1)])
+    states = []
+    for cpu in (79, 80, 75, 71, 69.9, 75):
+        engine.update(metrics(cpu=cpu))
+        states.append(bool(engine.active))
+    assert states == [False, True, True, True, False, False]
+
+
+def test_active_alerts_by_priority():
+    engine = alerts.AlertEngine(alerts.load_rules([
+        {'name': 'memory_medium', 'metric': 'memory_gb', 'threshold': 10, 'level': 'orange', 'priority': 20},
+        {'name': 'memory_high', 'metric': 'memory_gb', 'threshold': 20, 'level': 'red', 'priority': 40},
+        {'name': 'cpu_medium', 'metric': 'cpu', 'threshold': 50, 'level': 'orange', 'priority': 10},
+    ]))
+    engine.update(metrics(cpu=60, memory_gb=25), current_time='12:00')
+
+    assert [alert.rule.name for alert in engine.active_alerts()] == ['memory_high', 'memory_medium', 'cpu_medium']
+    color, message = engine.state()
+    assert color == 'red'
+    assert len(message.splitlines()) == 3
+
+
+def test_min_rule_needs_a_full_window():
+    engine = alerts.AlertEngine([rule(aggregate='min', window=3, threshold=50, clear=50)])
+    for cpu in (90, 90):
+        engine.update(metrics(cpu=cpu))
+    assert not engine.active
+    engine.update(metrics(cpu=90))
+    assert engine.active
+    engine.update(metrics(cpu=10))
+    assert not engine.active
@@ -0,0 +1,39 @@
+"""Tests of folding burst reads into fixed windows"""
+
+import pytest
+
+import burst
+
+
+@pytest.fixture
+def burst_sampler():
+    # Never started, reads are added by hand
+    return burst.BurstSampler(lambda: None, rate_hz=10, budget_percent=1)
+
+
+def test_windows_are_one_second_however_often_samples_are_taken(burst_sampler):
+    for read in range(40):
+        now = 100.0 + read * 0.1
+        # A spike in the second second, from 101.0 to 102.0
+        burst_sampler.add(now, 90.0 if read == 15 else 10.0, 5.0)
+
+    # The sample at 103.95 only gets the last full second, 102.0 to 103.0
+    assert burst_sampler.take(103.95) == pytest.approx((10.0, 10.0, 10.0, 5.0, 5.0, 5.0))
+    assert burst_sampler.complete_time == pytest.approx(103.0)
+
+
+def test_spike_of_the_last_second(burst_sampler):
+    for read in range(25):
+        burst_sampler.add(100.0 + read * 0.1, 90.0 if read == 15 else 10.0, 5.0)
+
+    cpu_min, cpu_mean, cpu_max, _, _, _ = burst_sampler.take(102.45)
+    assert (cpu_min, cpu_max) == (10.0, 90.0)
+    assert cpu_mean == pytest.approx(18.0)
+
+
+def test_no_window_after_reads_stopped(burst_sampler):
+    assert burst_sampler.take(100.0) is None
+    for read in range(15):
+        burst_sampler.add(100.0 + read * 0.1, 10.0, 5.0)
+    assert burst_sampler.take(101.5) is not None
+    assert burst_sampler.take(102.5) is None
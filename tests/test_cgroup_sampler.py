@@ -0,0 +1,129 @@
+"""Tests of the cgroup v2 sampler backend against a fake cgroupfs tree"""
+
+import time
+
+import pytest
+
+import sampler
+import settings
+
+UID = 1000
+OTHER_UID = 1001
+GB = 1024 * 1024 * 1024
+
+
+def write_cgroup(path, usage_usec, memory_bytes, memory_max=None):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'cpu.stat').write_text(f'usage_usec {usage_usec}\nuser_usec 0\nsystem_usec 0\n')
+    (path / 'memory.current').write_text(f'{memory_bytes}\n')
+    if memory_max is not None:
+        (path / 'memory.max').write_text(f'{memory_max}\n')
+
+
+@pytest.fixture
+def cgroup_root(tmp_path):
+    """A sys/fs/cgroup tree with two user slices and system.slice"""
+    root = tmp_path / 'sys' / 'fs' / 'cgroup'
+    root.mkdir(parents=True)
+    # The root cgroup has no memory.current, only statistics
+    (root / 'cpu.stat').write_text('usage_usec 0\n')
+    (root / 'memory.stat').write_text('anon 0\nfile 0\n')
+    write_cgroup(root / 'user.slice', 1000000, 300)
+    write_cgroup(root / 'user.slice' / f'user-{UID}.slice', 1000000, 200, 'max')
+    write_cgroup(root / 'user.slice' / f'user-{OTHER_UID}.slice', 0, 100, 8 * GB)
+    write_cgroup(root / 'system.slice', 0, 100)
+    return root
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when told to"""
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def create(cgroup_root):
+    cgroup_sampler = sampler.CgroupSampler(uid=UID, cgroup_root=str(cgroup_root))
+    cgroup_sampler.cpu_count = 4
+    cgroup_sampler.total_memory = 1000
+    return cgroup_sampler
+
+
+def test_splits_user_and_others(cgroup_root, clock, monkeypatch):
+    monkeypatch.setattr(settings, 'TOP_USERS_COUNT', 0)
+    cgroup_sampler = create(cgroup_root)
+    first = cgroup_sampler.sample()
+    # No interval to measure CPU over yet
+    assert (first.user_cpu, first.others_cpu) == (0.0, 0.0)
+    assert (first.user_mem, first.others_mem) == pytest.approx((20.0, 20.0))
+
+    # One second later: 1 CPU second for us, 1 for the other user and 1 for system.slice
+    clock[0] += 1.0
+    write_cgroup(cgroup_root / 'user.slice', 3000000, 500)
+    write_cgroup(cgroup_root / 'user.slice' / f'user-{UID}.slice', 2000000, 400)
+    write_cgroup(cgroup_root / 'user.slice' / f'user-{OTHER_UID}.slice', 1000000, 100)
+    write_cgroup(cgroup_root / 'system.slice', 1000000, 100)
+    second = cgroup_sampler.sample()
+    assert second.user_cpu == pytest.approx(25.0)
+    assert second.others_cpu == pytest.approx(50.0)
+    assert second.user_mem == pytest.approx(40.0)
+    assert second.others_mem == pytest.approx(20.0)
+
+
+def test_usage_by_uid_returns_every_slice(cgroup_root, clock):
+    cgroup_sampler = create(cgroup_root)
+    cgroup_sampler.usage_by_uid()
+    clock[0] += 2.0
+    write_cgroup(cgroup_root / 'user.slice' / f'user-{OTHER_UID}.slice', 4000000, 100)
+    usage = cgroup_sampler.usage_by_uid()
+    assert set(usage) == {UID, OTHER_UID}
+    assert usage[UID] == pytest.approx([0.0, 20.0])
+    assert usage[OTHER_UID] == pytest.approx([50.0, 10.0])
+
+
+def test_is_available(cgroup_root, tmp_path):
+    assert sampler.CgroupSampler.is_available(UID, str(cgroup_root))
+    # No slice for this user
+    assert not sampler.CgroupSampler.is_available(UID + 2, str(cgroup_root))
+    # Controllers not enabled for the slice
+    (cgroup_root / 'user.slice' / f'user-{UID}.slice' / 'memory.current').unlink()
+    assert not sampler.CgroupSampler.is_available(UID, str(cgroup_root))
+    assert not sampler.CgroupSampler.is_available(UID, str(tmp_path / 'missing'))
+
+
+def test_memory_limit(cgroup_root):
+    # "max" means no limit
+    assert sampler.read_memory_limit(UID, str(cgroup_root)) is None
+    assert sampler.read_memory_limit(OTHER_UID, str(cgroup_root)) / GB == 8.0
+    # No memory.max at all
+    assert sampler.read_memory_limit(UID + 2, str(cgroup_root)) is None
+
+
+def test_auto_falls_back_to_proc(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'CGROUP_ROOT', str(tmp_path))
+    assert isinstance(sampler.create_sampler('auto'), sampler.ProcSampler)
+
+
+def test_auto_prefers_cgroup(cgroup_root, monkeypatch):
+    monkeypatch.setattr(settings, 'CGROUP_ROOT', str(cgroup_root))
+    monkeypatch.setattr(sampler.os, 'getuid', lambda: UID)
+    assert isinstance(sampler.create_sampler('auto'), sampler.CgroupSampler)
+
+
+def test_user_slices_scanned_only_for_top_users(cgroup_root, clock, monkeypatch):
+    monkeypatch.setattr(settings, 'TOP_USERS_COUNT', 5)
+    cgroup_sampler = create(cgroup_root)
+    scans = []
+    usage_by_uid = cgroup_sampler.usage_by_uid
+    monkeypatch.setattr(cgroup_sampler, 'usage_by_uid', lambda: scans.append(1) or usage_by_uid())
+
+    cgroup_sampler.user_labels.enabled = False
+    assert cgroup_sampler.sample().top_others == ()
+    assert not scans
+
+    cgroup_sampler.user_labels.enabled = True
+    top_others = cgroup_sampler.sample().top_others
+    assert len(scans) == 1
+    # Only the other user, with its memory share
+    assert [(cpu, mem) for _, cpu, mem in top_others] == pytest.approx([(0.0, 10.0)])
@@ -0,0 +1,59 @@
+"""Tests of the min/max envelopes of the long chart windows"""
+
+import numpy as np
+import pytest
+
+import decimation
+
+
+def brute_force(timestamps, values, width, newest, size):
+    """Return {column: (min, max)} of the columns in the window, by going through every record"""
+    columns = {}
+    for timestamp, value in zip(timestamps, values):
+        column = int(timestamp // width) - (newest - size + 1)
+        if column < 0:
+            continue
+        low, high = columns.get(column, (np.inf, -np.inf))
+        columns[column] = (min(low, value), max(high, value))
+    return columns
+
+
+def test_columns_match_brute_force_across_chunks():
+    rng = np.random.default_rng(0)
+    # An hour in 60 columns of 60 s, with records for 90 minutes at uneven times
+    decimator = decimation.EnvelopeDecimator(3600, 60, ('cpu',))
+    timestamps = np.sort(rng.uniform(1_000_000, 1_000_000 + 5400, 3000))
+    values = rng.uniform(0, 100, len(timestamps))
+    # A spike much shorter than a column
+    values[1500] = 250.0
+
+    for chunk in np.array_split(np.arange(len(timestamps)), 17):
+        decimator.add(timestamps[chunk], [values[chunk]], [values[chunk]])
+
+    expected = brute_force(timestamps, values, decimator.width, decimator.newest, decimator.size)
+    filled = np.flatnonzero(np.isfinite(decimator.lows[0]))
+    assert list(filled) == sorted(expected)
+    for column in filled:
+        assert (decimator.lows[0, column], decimator.highs[0, column]) == expected[column]
+    assert decimator.highs[0].max() == 250.0
+
+
+def test_gap_longer_than_the_window_empties_it():
+    decimator = decimation.EnvelopeDecimator(600, 10, ('cpu',))
+    decimator.add(np.array([0.0, 30.0, 90.0]), [np.array([1.0, 2.0, 3.0])], [np.array([1.0, 2.0, 3.0])])
+    decimator.add(np.array([10_000.0]), [np.array([4.0])], [np.array([4.0])])
+
+    assert np.isfinite(decimator.lows[0]).sum() == 1
+    assert decimator.since(10_001.0) > 10_000.0
+
+
+def test_envelope_points_are_min_then_max_at_column_middles():
+    decimator = decimation.EnvelopeDecimator(600, 10, ('cpu',))
+    # Two records in the column from 540 to 600 s, one in the next, partial column
+    decimator.add(np.array([550.0, 590.0, 610.0]), [np.array([5.0, 7.0, 1.0])], [np.array([6.0, 9.0, 1.0])])
+
+    times, values = decimator.envelope(now=630.0, unit=60)
+
+    assert list(values['cpu']) == [5.0, 9.0, 1.0, 1.0]
+    # Column middles at 570 and 630 s, 1 and 0 minutes before now
+    assert times == pytest.approx([-1.0, -1.0, 0.0, 0.0])
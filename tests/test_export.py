@@ -0,0 +1,29 @@
+"""Tests of exporting the in-memory history"""
+
+import export
+import history
+import sampler
+
+
+def test_history_records_only_hold_taken_samples():
+    usage = history.UsageHistory(60)
+    usage.append(sampler.Sample(1, 2, 3, 4), 1000.0)
+    # The interval was stretched to two seconds
+    usage.append(sampler.Sample(5, 6, 7, 8), 1002.0)
+
+    records = export.history_records(usage)
+
+    assert list(records['timestamp']) == [1000.0, 1002.0]
+    assert list(records['user_cpu']) == [1, 5]
+    assert list(records['others_mem']) == [4, 8]
+
+
+def test_history_records_of_the_last_seconds():
+    usage = history.UsageHistory(60)
+    for timestamp in (1000.0, 1015.0, 1030.0, 1045.0, 1060.0, 1075.0):
+        usage.append(sampler.Sample(timestamp, 0, 0, 0), timestamp)
+
+    records = export.history_records(usage, 60)
+
+    assert list(records['timestamp']) == [1015.0, 1030.0, 1045.0, 1060.0, 1075.0]
+    assert list(records['user_cpu']) == [1015.0, 1030.0, 1045.0, 1060.0, 1075.0]
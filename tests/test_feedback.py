@@ -0,0 +1,56 @@
+"""Tests of the feedback spool with a fake mail command"""
+
+import os
+
+import pytest
+
+import feedback
+import settings
+
+
+@pytest.fixture
+def mail(tmp_path, monkeypatch):
+    """Put a mail command on PATH that fails while the file `fail` exists"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    fail = tmp_path / 'fail'
+    command = bin_dir / 'mail'
+    command.write_text(f'#!/bin/sh\ncat > /dev/null\nif [ -e {fail} ]; then echo "no relay" >&2; exit 1; fi\n')
+    command.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{bin_dir}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return fail
+
+
+def queue(spool_dir):
+    results = []
+    return feedback.FeedbackQueue(lambda *result: results.append(result), str(spool_dir)), results
+
+
+def test_earlier_session_is_sent_without_notification(tmp_path, mail):
+    earlier, earlier_results = queue(tmp_path / 'spool')
+    os.makedirs(earlier.spool_dir)
+    entry = earlier.spool('hello', ())
+
+    current, current_results = queue(tmp_path / 'spool')
+    current.send(entry)
+
+    assert not os.path.exists(entry)
+    assert current_results == []
+    assert earlier_results == []
+
+
+def test_last_failed_attempt_moves_entry_to_failed(tmp_path, mail, monkeypatch):
+    monkeypatch.setattr(settings, 'FEEDBACK_MAX_ATTEMPTS', 2)
+    mail.touch()
+    spool, results = queue(tmp_path / 'spool')
+    os.makedirs(spool.spool_dir)
+    entry = spool.spool('hello', ())
+
+    spool.send(entry)
+    assert results == [(False, 'no relay', True)]
+    spool.send(entry)
+    assert results[1:] == [(False, 'no relay', False)]
+
+    assert spool.pending() == []
+    assert os.path.isdir(os.path.join(spool.spool_dir, feedback.FAILED_DIR, os.path.basename(entry)))
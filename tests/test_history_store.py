@@ -0,0 +1,82 @@
+"""Tests of the memory-mapped history files shared between a writer and readers"""
+
+import errno
+import os
+
+import numpy as np
+import pytest
+
+import history_store
+import sampler
+import settings
+
+
+@pytest.fixture(autouse=True)
+def small_history(monkeypatch):
+    """Keep the ring files small, one hour of raw samples"""
+    monkeypatch.setattr(settings, 'HISTORY_RAW_HOURS', 1)
+    monkeypatch.setattr(settings, 'HISTORY_MINUTE_DAYS', 1)
+    monkeypatch.setattr(settings, 'HISTORY_HOUR_DAYS', 1)
+
+
+def sample(value):
+    return sampler.Sample(value, value, value, value)
+
+
+def test_reader_opened_before_writer_follows_it(tmp_path):
+    reader = history_store.HistoryStore(str(tmp_path), read_only=True)
+    assert len(reader.read('raw')) == 0
+
+    writer = history_store.HistoryStore(str(tmp_path))
+    writer.append(1000.0, sample(1))
+    writer.append(1001.0, sample(2))
+
+    assert list(reader.read('raw')['timestamp']) == [1000.0, 1001.0]
+    writer.close()
+    reader.close()
+
+
+def test_format_change_leaves_readers_mapped(tmp_path):
+    path = str(tmp_path / 'raw.bin')
+    writer = history_store.Tier(path, history_store.RAW_DTYPE, 10)
+    writer.append((1000.0, 1, 1, 1, 1))
+    reader = history_store.Tier(path, history_store.RAW_DTYPE, 10, writable=False)
+    view = reader.parts()[0]
+    writer.close()
+
+    # A writer with another capacity starts a new file
+    writer = history_store.Tier(path, history_store.RAW_DTYPE, 20)
+    writer.append((2000.0, 2, 2, 2, 2))
+
+    # The old map still reads, the mismatched new file is not followed
+    assert list(view['timestamp']) == [1000.0]
+    assert len(reader.read()) == 0
+    reader.close()
+    writer.close()
+
+
+def test_clock_step_back_keeps_timestamps_ordered(tmp_path):
+    store = history_store.HistoryStore(str(tmp_path))
+    for timestamp in (1000.0, 1001.0, 900.0, 1002.0):
+        store.append(timestamp, sample(1))
+
+    timestamps = store.read('raw')['timestamp']
+    assert np.all(np.diff(timestamps) >= 0)
+    assert len(store.read('raw', since=1001.0)) == 3
+    store.close()
+
+
+def test_failed_format_change_reports_its_error(tmp_path, monkeypatch):
+    path = str(tmp_path / 'raw.bin')
+    history_store.Tier(path, history_store.RAW_DTYPE, 10).close()
+
+    def disk_full(fd, size):
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+    monkeypatch.setattr(history_store.os, 'ftruncate', disk_full)
+
+    with pytest.raises(OSError) as error:
+        history_store.Tier(path, history_store.RAW_DTYPE, 20)
+    assert error.value.errno == errno.ENOSPC
+    # The old file is left as it was
+    assert os.listdir(tmp_path) == ['raw.bin']
+    assert os.path.getsize(path) == history_store.HEADER.size + history_store.RAW_DTYPE.itemsize * 10
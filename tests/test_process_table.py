@@ -0,0 +1,108 @@
+"""Tests of the tick-delta CPU accounting of the process table against a fake /proc tree"""
+
+import shutil
+
+import pytest
+
+import sampler
+
+UID = 1000
+OTHER_UID = 1001
+
+
+class FakeProc:
+    """A /proc tree with the stat and status files the process table reads"""
+
+    def __init__(self, root, clock_ticks):
+        self.root = root
+        self.clock_ticks = clock_ticks
+        self.uptime = 1000.0
+        # Command name and start time in clock ticks since boot of every process
+        self.names = {}
+        self.starttimes = {}
+        self.write_uptime()
+
+    def write_uptime(self):
+        (self.root / 'uptime').write_text(f'{self.uptime:.2f} 0.00\n')
+
+    def advance(self, seconds):
+        self.uptime += seconds
+        self.write_uptime()
+
+    def start(self, pid, uid, cpu_ticks=0, starttime=None, name='worker'):
+        """Start a process, by default right now"""
+        starttime = int(self.uptime * self.clock_ticks) if starttime is None else starttime
+        path = self.root / str(pid)
+        path.mkdir()
+        (path / 'status').write_text(f'Name:\t{name}\nUid:\t{uid}\t{uid}\t{uid}\t{uid}\n')
+        self.names[pid] = name
+        self.starttimes[pid] = starttime
+        self.run(pid, cpu_ticks)
+
+    def run(self, pid, cpu_ticks):
+        """Set the CPU ticks a process used so far"""
+        fields = ['S', '1', str(pid), str(pid), '0', '-1', '0', '0', '0', '0', '0',
+                  str(cpu_ticks // 2), str(cpu_ticks - cpu_ticks // 2), '0', '0', '20', '0', '1', '0',
+                  str(self.starttimes[pid]), '0', '100']
+        (self.root / str(pid) / 'stat').write_text(f'{pid} ({self.names[pid]}) {" ".join(fields)}\n')
+
+    def exit(self, pid):
+        shutil.rmtree(self.root / str(pid))
+
+
+@pytest.fixture
+def table(tmp_path):
+    return sampler.ProcessTable(str(tmp_path))
+
+
+@pytest.fixture
+def proc(tmp_path, table):
+    return FakeProc(tmp_path, table.clock_ticks)
+
+
+def cpu_by_pid(table):
+    return {entry.pid: entry.cpu_percent for entry in table.entries.values()}
+
+
+def test_cpu_is_the_tick_delta_over_the_interval(table, proc):
+    proc.start(10, UID, cpu_ticks=5000, starttime=0)
+    proc.start(11, OTHER_UID, cpu_ticks=100, starttime=0, name='name with ) in it')
+    assert table.update() == 0.0
+    # Ticks from before the first update are not charged to it
+    assert cpu_by_pid(table) == {10: 0.0, 11: 0.0}
+
+    proc.advance(2.0)
+    proc.run(10, 5000 + table.clock_ticks)
+    assert table.update() == pytest.approx(2.0)
+    # One second of CPU in two seconds
+    assert cpu_by_pid(table) == pytest.approx({10: 50.0, 11: 0.0})
+    assert table.entries[(11, 0)].name == 'name with ) in it'
+    assert table.entries[(11, 0)].uid == OTHER_UID
+
+
+def test_reused_pid_does_not_inherit_ticks(table, proc):
+    proc.start(42, UID, cpu_ticks=5000, starttime=0)
+    table.update()
+
+    # The process exits and another user's process gets its PID
+    proc.advance(1.0)
+    proc.exit(42)
+    proc.start(42, OTHER_UID, cpu_ticks=table.clock_ticks // 2)
+    table.update()
+
+    entry, = table.entries.values()
+    assert (entry.pid, entry.uid) == (42, OTHER_UID)
+    # Started during the interval, so all of its ticks are charged, not 5000 ticks less
+    assert entry.cpu_percent == pytest.approx(50.0)
+
+
+def test_exited_processes_are_dropped(table, proc):
+    proc.start(10, UID, starttime=0)
+    proc.start(11, UID, starttime=0)
+    table.update()
+
+    proc.advance(1.0)
+    proc.exit(11)
+    table.update()
+
+    assert list(table.entries) == [(10, 0)]
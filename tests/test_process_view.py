@@ -0,0 +1,59 @@
+"""Tests of the process table model keeping its order between updates"""
+
+import os
+import random
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from PyQt5.QtCore import QPersistentModelIndex, Qt
+
+import process_view
+
+
+def row(pid, cpu, name=None, start=10.0):
+    return ((pid, 1000 + pid), pid, name or f'process{pid}', cpu, 1024 * pid, start)
+
+
+@pytest.fixture
+def model():
+    model = process_view.ProcessTableModel('RSS')
+    model.signals = []
+    model.layoutChanged.connect(lambda *args: model.signals.append('layout'))
+    model.rowsMoved.connect(lambda *args: model.signals.append('move'))
+    model.rowsInserted.connect(lambda *args: model.signals.append('insert'))
+    return model
+
+
+def cpu_column(model):
+    return [values[process_view.COLUMN_CPU] for values in model.rows]
+
+
+def test_update_moves_only_rows_whose_value_changed(model):
+    model.update(100.0, [row(pid, pid) for pid in range(1, 11)])
+    assert cpu_column(model) == list(range(10, 0, -1))
+    assert model.signals == ['insert']
+    selected = QPersistentModelIndex(model.index(model.keys.index((3, 1003)), 0))
+
+    model.signals.clear()
+    # Process 3 jumps to the top, process 9 drops, process 11 starts in the middle
+    model.update(101.0, [row(pid, {3: 50, 9: 0.5}.get(pid, pid)) for pid in range(1, 11)] + [row(11, 5.5)])
+
+    assert cpu_column(model) == [50, 10, 8, 7, 6, 5.5, 5, 4, 2, 1, 0.5]
+    assert model.signals == ['move', 'move', 'insert']
+    assert selected.row() == 0
+
+
+def test_update_keeps_any_order(model):
+    rng = random.Random(0)
+    for column in (process_view.COLUMN_CPU, process_view.COLUMN_NAME, process_view.COLUMN_RUNTIME):
+        model.sort(column, Qt.AscendingOrder)
+        model.signals.clear()
+        for _ in range(20):
+            rows = [row(pid, rng.choice((0.0, 1.0, rng.uniform(0, 100))), rng.choice('abc'), rng.choice((5.0, 10.0)))
+                    for pid in rng.sample(range(100), 30)]
+            model.update(100.0, rows)
+            key, descending = model.sort_order_key()
+            assert model.rows == sorted(model.rows, key=key, reverse=descending)
+            assert sorted(model.keys) == sorted(r[0] for r in rows)
+        assert 'layout' not in model.signals
@@ -0,0 +1,56 @@
+"""Tests of the pacing of replayed recordings"""
+
+import pytest
+
+import recording
+import sampler
+
+
+def record(path, timestamps):
+    writer = recording.RecordingWriter(str(path))
+    for value, timestamp in enumerate(timestamps):
+        writer.write(timestamp, sampler.Sample(value, value, value, value))
+    writer.close()
+    return str(path)
+
+
+def replay_offsets(replay):
+    offsets = []
+    while replay.remaining():
+        offsets.append(replay.next_offset())
+        replay.sample()
+    return offsets
+
+
+def test_samples_are_due_at_their_recorded_offsets(tmp_path):
+    path = record(tmp_path / 'usage.rec', [1000.0, 1001.0, 1002.0, 1002.5, 1004.0])
+    replay = recording.ReplaySampler(path)
+
+    assert replay_offsets(replay) == pytest.approx([0.0, 1.0, 2.0, 2.5, 4.0])
+    assert replay.timestamp == 1004.0
+
+
+def test_long_gaps_are_capped(tmp_path):
+    gap = recording.MAX_GAP_SECONDS
+    # A suspend of ten hours between the second and the third sample
+    path = record(tmp_path / 'usage.rec', [1000.0, 1001.0, 37001.0, 37002.0])
+    replay = recording.ReplaySampler(path)
+
+    assert replay_offsets(replay) == pytest.approx([0.0, 1.0, 1.0 + gap, 2.0 + gap])
+    # The recorded times are kept as they were
+    assert replay.timestamp == 37002.0
+
+
+def test_loop_continues_after_the_recording(tmp_path):
+    path = record(tmp_path / 'usage.rec', [1000.0, 1002.0, 1004.0])
+    replay = recording.ReplaySampler(path, loop=True)
+
+    offsets, timestamps = [], []
+    for _ in range(5):
+        offsets.append(replay.next_offset())
+        replay.sample()
+        timestamps.append(replay.timestamp)
+
+    # The second pass starts one typical interval after the first ends
+    assert offsets == pytest.approx([0.0, 2.0, 4.0, 6.0, 8.0])
+    assert timestamps == pytest.approx([1000.0, 1002.0, 1004.0, 1006.0, 1008.0])